@@ -0,0 +1,106 @@
+"""
+Cold-start profile for server.py: per-module import cost and time until the
+UI is served, with heavy modules imported lazily (default) or eagerly.
+
+    python bench_startup.py [--top 15] [--repeat 3] [--port 5055] [--no-serve]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent
+MODES = {"lazy": "0", "eager": "1"}
+
+
+def mode_env(mode: str) -> dict:
+    env = dict(os.environ)
+    env["NOVELLICA_EAGER_IMPORTS"] = MODES[mode]
+    return env
+
+
+# ---------------------------------------------------------------------------
+# Import-time profile (python -X importtime)
+# ---------------------------------------------------------------------------
+def import_profile(mode: str) -> tuple[int, list]:
+    """Total import time of server (us) and its direct imports as (cumulative_us, name)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=APP_DIR, env=mode_env(mode), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    # Children are listed before their parent, one indent level deeper
+    pending = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        pending.append((depth, int(cumulative), name.strip()))
+        if name.strip() == "server":
+            children = []
+            for d, cum, n in reversed(pending[:-1]):
+                if d <= depth:
+                    break
+                if d == depth + 1:
+                    children.append((cum, n))
+            return int(cumulative), sorted(children, reverse=True)
+    raise RuntimeError("server did not show up in the import profile")
+
+
+# ---------------------------------------------------------------------------
+# Time until the UI is served (what control_panel.py waits on)
+# ---------------------------------------------------------------------------
+def time_to_ready(mode: str, port: int, timeout: float = 60.0) -> float:
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=mode_env(mode), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.02)
+        raise RuntimeError(f"server not ready after {timeout:.0f} s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--no-serve", action="store_true", help="only profile imports")
+    args = parser.parse_args()
+
+    for mode in MODES:
+        total, children = import_profile(mode)
+        print(f"\nimport server ({mode}): {total / 1000:.1f} ms")
+        for cumulative, name in children[:args.top]:
+            print(f"  {name:<36} {cumulative / 1000:8.1f} ms")
+
+    if args.no_serve:
+        return
+    print()
+    for mode in MODES:
+        best = min(time_to_ready(mode, args.port) for _ in range(args.repeat))
+        print(f"  serving UI ({mode}){'':<22} {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Micro-benchmark for TTS text preparation on a synthetic 100k-word manuscript.
+
+Compares the previous multi-pass cleaner + string-concatenating splitter with
+tts_kokoro.prepare_text_for_tts (single pass, chunks with source offsets).
+
+    python bench_tts_text.py [--words 100000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+import tts_kokoro
+
+
+# ---------------------------------------------------------------------------
+# Previous implementation, kept here as the baseline
+# ---------------------------------------------------------------------------
+def legacy_clean(text: str) -> str:
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+    text = re.sub(r'!\[[^\]]*\]\([^\)]+\)', '', text)
+    text = re.sub(r'[#*_~`>|-]', '', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = "".join(c for c in text if c.isprintable() or c in "\n ")
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_split(text: str, max_len: int = tts_kokoro.MAX_CHUNK_LEN) -> list:
+    raw_pieces = re.split(r'([.!?]+)', text)
+    chunks = []
+    current_chunk = ""
+    for i in range(0, len(raw_pieces), 2):
+        sentence = raw_pieces[i]
+        punct = raw_pieces[i + 1] if i + 1 < len(raw_pieces) else ""
+        full_sentence = (sentence + punct).strip()
+        if not full_sentence:
+            continue
+        if len(current_chunk) + len(full_sentence) < max_len:
+            current_chunk += (" " if current_chunk else "") + full_sentence
+        else:
+            if current_chunk:
+                chunks.append(current_chunk)
+            if len(full_sentence) > max_len:
+                for j in range(0, len(full_sentence), max_len):
+                    chunks.append(full_sentence[j:j + max_len])
+                current_chunk = ""
+            else:
+                current_chunk = full_sentence
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def legacy_request(text: str) -> list:
+    # generate_tts cleaned once, generate_full cleaned again, then split
+    cleaned = legacy_clean(text)
+    return legacy_split(legacy_clean(cleaned))
+
+
+# ---------------------------------------------------------------------------
+# Synthetic manuscript
+# ---------------------------------------------------------------------------
+WORDS = (
+    "the night was cold and the rain kept falling over the old harbour "
+    "she turned toward the window listening for footsteps that never came "
+    "café naïve rôle déjà-vu well-known twenty-one"
+).split()
+
+
+def make_manuscript(n_words: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    out = []
+    written = 0
+    chapter = 0
+    while written < n_words:
+        if written % 5000 == 0:
+            chapter += 1
+            out.append(f"\n\n# Chapter {chapter}\n\n")
+        sentence = [rng.choice(WORDS) for _ in range(rng.randint(6, 24))]
+        if rng.random() < 0.15:
+            sentence[0] = f"**{sentence[0]}**"
+        if rng.random() < 0.1:
+            sentence[-1] = f"_{sentence[-1]}_"
+        if rng.random() < 0.05:
+            sentence.insert(1, "[the map](https://example.com/map)")
+        if rng.random() < 0.2:
+            sentence = ["“"] + sentence + ["” —"]
+        out.append(" ".join(sentence).capitalize() + rng.choice([". ", "! ", "? ", "... "]))
+        if rng.random() < 0.2:
+            out.append("\n\n")
+        written += len(sentence)
+    return "".join(out)
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_manuscript(args.words)
+    print(f"Manuscript: {args.words:,} words, {len(text):,} characters")
+
+    legacy_chunks = legacy_request(text)
+    prepared = tts_kokoro.prepare_text_for_tts(text)
+    same = [c.text for c in prepared.chunks] == legacy_chunks
+    print(f"Chunks: {len(prepared.chunks)} (identical to legacy: {same})")
+
+    rows = [
+        ("legacy clean", legacy_clean, text),
+        ("legacy split", legacy_split, legacy_clean(text)),
+        ("legacy request (clean x2 + split)", legacy_request, text),
+        ("clean_text_for_tts", tts_kokoro.clean_text_for_tts, text),
+        ("prepare_text_for_tts", tts_kokoro.prepare_text_for_tts, text),
+    ]
+    for label, fn, arg in rows:
+        print(f"  {label:<36} {best_of(fn, arg, args.repeat) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,10 @@ import re
 import asyncio
 import time
 import random
+import difflib
+import hashlib
+import threading
+from datetime import datetime
 from pathlib import Path
 from pydantic import BaseModel
 
@@ -21,40 +25,90 @@ except ImportError:
 
 
 # =============================================================
-# Global Rate Limiter for ALL Notion API calls
+# Rate Limiter for ALL Notion API calls (token bucket per integration)
 # =============================================================
-# Notion allows ~3 requests/sec per integration. We enforce a conservative
-# gap and a global cooldown to avoid the "Hard Penalty Box" (900s).
-
-MIN_REQUEST_GAP = 0.6          # 600 ms → 1.6 req/s (50% safety margin)
+# Notion allows ~3 requests/sec on average per integration, with short bursts.
+# Each integration token gets its own bucket, so independent integrations do
+# not queue behind each other. A 429 halves that token's rate and opens a
+# cooldown (the "Hard Penalty Box" guard); successes slowly restore the rate.
+
+NOTION_RATE     = 2.7          # sustained req/s per token (override: NOTION_RATE env var)
+NOTION_BURST    = 3            # requests allowed back-to-back (override: NOTION_BURST env var)
+MIN_RATE        = 0.3          # floor after repeated 429s
+RECOVERY_STREAK = 20           # successful calls before the rate steps back up
+RECOVERY_STEP   = 0.25         # req/s regained per streak
 MAX_RETRIES     = 6            # retries on 429
 JITTER_MAX      = 0.1          # subtle jitter
 MAX_RETRY_AFTER = 300          # cap wait at 5 mins even if Notion asks for more
 
-_last_request_ts = 0.0         # timestamp of last API start
-_global_cooldown_until = 0.0   # if hit 429, total block until this time
-_rate_lock = asyncio.Lock()    # serialise access
 
+class _TokenBucket:
+    """Async token bucket with adaptive rate and a 429 cooldown."""
 
-async def _throttle():
-    """Wait until global cooldown and MIN_REQUEST_GAP have elapsed."""
-    global _last_request_ts, _global_cooldown_until
-    async with _rate_lock:
-        now = time.monotonic()
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.successes = 0
+        self.lock = asyncio.Lock()   # FIFO among waiters of this token only
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                # 1. Respect the "Penalty Box" if active
+                if now < self.cooldown_until:
+                    await asyncio.sleep(self.cooldown_until - now + random.uniform(0.1, 0.3))
+                    continue
+
+                # 2. Refill and take a token, or wait for the next one
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate + random.uniform(0, JITTER_MAX))
+
+    def on_success(self):
+        if self.rate >= self.max_rate:
+            return
+        self.successes += 1
+        if self.successes >= RECOVERY_STREAK:
+            self.rate = min(self.max_rate, self.rate + RECOVERY_STEP)
+            self.successes = 0
+
+    def on_rate_limited(self, delay: float):
+        self.rate = max(MIN_RATE, self.rate * 0.5)
+        self.tokens = 0.0
+        self.successes = 0
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
 
-        # 1. Respect the "Penalty Box" if active
-        if now < _global_cooldown_until:
-            wait_cooldown = _global_cooldown_until - now
-            await asyncio.sleep(wait_cooldown + random.uniform(0.1, 0.3))
-            now = time.monotonic()
 
-        # 2. Enforce the polite gap between requests
-        elapsed = now - _last_request_ts
-        if elapsed < MIN_REQUEST_GAP:
-            wait_gap = MIN_REQUEST_GAP - elapsed + random.uniform(0, JITTER_MAX)
-            await asyncio.sleep(wait_gap)
+_buckets: dict[str, _TokenBucket] = {}
 
-        _last_request_ts = time.monotonic()
+
+def _resolve_token(api_key: str = None) -> str:
+    return api_key or os.environ.get("NOTION_INTEGRATION_TOKEN") or os.environ.get("NOTION_TOKEN")
+
+
+def _token_key(token: str = None) -> str:
+    """Digest used to key per-token state, so raw tokens are never kept as keys."""
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _get_bucket(token: str = None) -> _TokenBucket:
+    """Bucket for an integration token."""
+    key = _token_key(token)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        # Read overrides lazily: server.py loads .env after importing this module
+        rate = float(os.environ.get("NOTION_RATE") or NOTION_RATE)
+        burst = int(os.environ.get("NOTION_BURST") or NOTION_BURST)
+        bucket = _buckets[key] = _TokenBucket(rate, burst)
+    return bucket
 
 
 def _get_retry_after(exc) -> float:
@@ -70,14 +124,16 @@ def _get_retry_after(exc) -> float:
     return 0.0
 
 
-async def _notion_call_with_retry(coro_factory, *, on_rate_limit=None):
-    """Execute Notion API call with global throttling, cooldowns, and retry."""
-    global _global_cooldown_until
+async def _notion_call_with_retry(coro_factory, *, on_rate_limit=None, token: str = None):
+    """Execute Notion API call under the token's rate limiter, with adaptive retry."""
+    bucket = _get_bucket(_resolve_token(token))
 
     for attempt in range(1, MAX_RETRIES + 1):
-        await _throttle()
+        await bucket.acquire()
         try:
-            return await coro_factory()
+            result = await coro_factory()
+            bucket.on_success()
+            return result
         except Exception as e:
             is_rate_limit = False
             retry_after = 0.0
@@ -95,10 +151,6 @@ async def _notion_call_with_retry(coro_factory, *, on_rate_limit=None):
                     is_rate_limit = True
 
             if is_rate_limit and attempt < MAX_RETRIES:
-                # Print raw headers for debugging if possible
-                if hasattr(e, 'headers'):
-                    print(f"[Notion/Debug] 429 Headers: {getattr(e, 'headers')}")
-
                 # Calculate required sleep
                 if retry_after > 0:
                     delay = min(retry_after, MAX_RETRY_AFTER) + random.uniform(0.1, 0.5)
@@ -106,18 +158,16 @@ async def _notion_call_with_retry(coro_factory, *, on_rate_limit=None):
                     # Exponential backoff: 2s, 4s, 8s, 16s...
                     delay = min(2.0 * (2 ** (attempt - 1)), 60) + random.uniform(0.5, 1.5)
 
-                # CRITICAL: Update the Global Cooldown so NO other requests fire
-                now = time.monotonic()
-                async with _rate_lock:
-                    _global_cooldown_until = max(_global_cooldown_until, now + delay)
+                # CRITICAL: Cool down this token's bucket so none of its requests fire
+                bucket.on_rate_limited(delay)
 
-                print(f"[Notion] Rate Limit Hit! Global Cooldown for {delay:.1f}s (header={retry_after})")
+                print(f"[Notion] Rate Limit Hit! Cooldown for {delay:.1f}s "
+                      f"(header={retry_after}, rate now {bucket.rate:.2f} req/s)")
 
                 if on_rate_limit:
                     await on_rate_limit(delay, attempt)
 
-                # This specific task waits, but _throttle will now also block others
-                await asyncio.sleep(delay)
+                # Re-queue behind the cooldown
                 continue
 
             # If not a rate limit, or we gave up
@@ -132,12 +182,34 @@ async def _notion_call_with_retry(coro_factory, *, on_rate_limit=None):
 
 PROJECTS_DIR = Path(__file__).parent / "projects"
 
+_clients: dict = {}            # token key -> AsyncClient (one keep-alive pool per token)
+
 def get_notion_client(api_key: str = None):
-    # Try passed key, then env var
-    token = api_key or os.environ.get("NOTION_INTEGRATION_TOKEN")
+    """Shared client for a token (passed key, then env vars), created on first use."""
+    token = _resolve_token(api_key)
     if not token or not AsyncClient:
         return None
-    return AsyncClient(auth=token)
+    key = _token_key(token)
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = AsyncClient(auth=token)
+    return client
+
+async def close_notion_client(api_key: str):
+    """Close and forget the client of one token (e.g. when the token is replaced)."""
+    client = _clients.pop(_token_key(api_key), None) if api_key else None
+    if client is not None:
+        await client.aclose()
+
+async def close_notion_clients():
+    """Close every pooled client (server shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"[Notion] Error closing client: {e}")
 
 def get_notion_map_path(project_name: str) -> Path:
     p = PROJECTS_DIR / project_name / ".notion_map.json"
@@ -172,6 +244,39 @@ def get_page_mapping(project_name: str, file_rel_path: str) -> str:
     m = load_notion_map(project_name)
     return m.get(file_rel_path)
 
+def get_block_cache_path(project_name: str) -> Path:
+    return PROJECTS_DIR / project_name / ".notion_blocks.json"
+
+def load_block_cache(project_name: str) -> dict:
+    """Per-project pull cache: {page_id: {last_edited_time, pulled_at, markdown, blocks}}"""
+    p = get_block_cache_path(project_name)
+    if not p.exists():
+        return {}
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+def save_block_cache(project_name: str, cache: dict):
+    _write_json_atomic(get_block_cache_path(project_name), cache)
+
+def _write_json_atomic(p: Path, data):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, p)
+
+def _read_json(p: Path, default):
+    if not p.exists():
+        return default
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return default
+
 
 # ---------------------------------------------------------
 # Pulling (Notion -> Markdown)
@@ -180,56 +285,326 @@ def get_page_mapping(project_name: str, file_rel_path: str) -> str:
 BLOCKS_PER_PAGE = 100          # Notion page_size for blocks.children.list
 
 
+PULL_CONCURRENCY = 4           # parallel children.list calls while walking nested blocks
+MAX_PULL_DEPTH   = 8           # guard against runaway child-page nesting
+
+# Children of these blocks are indented under them; other containers
+# (columns, synced blocks, child pages) render their children flat.
+_INDENTED_PARENTS = {"bulleted_list_item", "numbered_list_item", "to_do", "toggle", "paragraph"}
+_QUOTED_PARENTS = {"quote", "callout"}
+_SKIP_CHILDREN = {"child_database"}
+
+
+def _plain(r: dict) -> str:
+    """Text of a rich_text item, fetched (plain_text) or locally built (text.content)."""
+    text = r.get("plain_text")
+    if text is None:
+        text = (r.get("text") or {}).get("content", "")
+    return text
+
+
+def _rich_text_to_markdown(rich: list) -> str:
+    """Render rich_text with bold/italic/strikethrough/code and links as Markdown."""
+    # Notion splits runs arbitrarily (and at 2,000 chars); join equal neighbours
+    runs = []
+    for r in rich:
+        ann = {k: True for k in ("bold", "italic", "strikethrough", "code")
+               if (r.get("annotations") or {}).get(k)}
+        url = ((r.get("text") or {}).get("link") or {}).get("url") or r.get("href")
+        if runs and runs[-1][1:] == [ann, url]:
+            runs[-1][0] += _plain(r)
+        else:
+            runs.append([_plain(r), ann, url])
+
+    out = []
+    for text, ann, url in runs:
+        core = text if ann.get("code") else text.strip()
+        if not core:
+            out.append(text)
+            continue
+        if ann.get("code"):
+            core = f"`{core}`"
+        else:
+            if ann.get("strikethrough"):
+                core = f"~~{core}~~"
+            if ann.get("italic"):
+                core = f"*{core}*"
+            if ann.get("bold"):
+                core = f"**{core}**"
+        if url:
+            core = f"[{core}]({url})"
+        # Keep surrounding spaces outside the markers
+        lead = "" if ann.get("code") else text[:len(text) - len(text.lstrip())]
+        trail = "" if ann.get("code") else text[len(text.rstrip()):]
+        out.append(f"{lead}{core}{trail}")
+    return "".join(out)
+
+
+def _block_lines(block: dict) -> list:
+    """Markdown lines for a single block, without its children."""
+    btype = block.get("type", "")
+    data = block.get(btype, {})
+    rich = data.get("rich_text", [])
+    text = _rich_text_to_markdown(rich)
+
+    if btype == "heading_1":
+        return [f"# {text}"]
+    if btype == "heading_2":
+        return [f"## {text}"]
+    if btype == "heading_3":
+        return [f"### {text}"]
+    if btype in ("bulleted_list_item", "toggle"):
+        return [f"- {text}"]
+    if btype == "numbered_list_item":
+        return [f"1. {text}"]
+    if btype == "to_do":
+        checked = "x" if data.get("checked") else " "
+        return [f"- [{checked}] {text}"]
+    if btype == "code":
+        lang = data.get("language", "")
+        if lang == "plain text":
+            lang = ""
+        return [f"```{lang}", *"".join(_plain(r) for r in rich).split("\n"), "```"]
+    if btype in _QUOTED_PARENTS:
+        return [f"> {line}" if line else ">" for line in text.split("\n")]
+    if btype == "divider":
+        return ["---"]
+    if btype == "paragraph":
+        return [text if text else ""]
+    if btype == "child_page":
+        return [f"## {data.get('title', 'Untitled')}"]
+    if btype == "table_row":
+        cells = [_rich_text_to_markdown(cell) for cell in data.get("cells", [])]
+        return ["| " + " | ".join(cells) + " |"]
+    # Skip unsupported types silently
+    return []
+
+
 def blocks_to_markdown(blocks: list) -> str:
-    """Convert a list of Notion block objects to plain Markdown."""
+    """
+    Convert a list of Notion block objects to plain Markdown. Nested blocks
+    fetched by the recursive pull are read from each block's "children" key.
+    """
     lines = []
-    for block in blocks:
-        btype = block.get("type", "")
-        data = block.get(btype, {})
-        rich = data.get("rich_text", [])
-        text = "".join(r.get("plain_text", "") for r in rich)
-
-        if btype == "heading_1":
-            lines.append(f"# {text}")
-        elif btype == "heading_2":
-            lines.append(f"## {text}")
-        elif btype == "heading_3":
-            lines.append(f"### {text}")
-        elif btype == "bulleted_list_item":
-            lines.append(f"- {text}")
-        elif btype == "numbered_list_item":
-            lines.append(f"1. {text}")
-        elif btype == "to_do":
-            checked = "x" if data.get("checked") else " "
-            lines.append(f"- [{checked}] {text}")
-        elif btype == "code":
-            lang = data.get("language", "")
-            lines.append(f"```{lang}\n{text}\n```")
-        elif btype == "quote":
-            lines.append(f"> {text}")
-        elif btype == "divider":
-            lines.append("---")
-        elif btype == "paragraph":
-            lines.append(text if text else "")
-        # Skip unsupported types silently
 
+    def render(items: list, prefix: str):
+        for block in items:
+            btype = block.get("type", "")
+            lines.extend(prefix + line if line else prefix.rstrip() for line in _block_lines(block))
+            if "children_markdown" in block:
+                # Subtree reused from the pull cache (already rendered)
+                if block["children_markdown"]:
+                    lines.extend(prefix + line if line else prefix.rstrip()
+                                 for line in block["children_markdown"].split("\n"))
+                continue
+            children = block.get("children")
+            if not children:
+                continue
+            if btype == "table":
+                start = len(lines)
+                render(children, prefix)
+                if block.get("table", {}).get("has_column_header") and len(lines) > start:
+                    cols = len(children[0].get("table_row", {}).get("cells", []))
+                    lines.insert(start + 1, prefix + "|" + " --- |" * cols)
+            elif btype in _INDENTED_PARENTS:
+                render(children, prefix + "  ")
+            elif btype in _QUOTED_PARENTS:
+                render(children, prefix + "> ")
+            else:
+                render(children, prefix)
+
+    render(blocks, "")
     return "\n".join(lines)
 
 
+EDIT_TIME_GRANULARITY = 60     # Notion reports last_edited_time rounded to the minute
+
+
+def _edited_ts(iso: str) -> float:
+    try:
+        return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+_block_cache_locks: dict[str, threading.Lock] = {}
+
+
+def _subpage_ids(blocks: list) -> list:
+    """Child pages in a page's own block tree (not inside those child pages)."""
+    ids = []
+    for b in blocks:
+        if b.get("type") == "child_page":
+            ids.append(b["id"])
+        else:
+            ids.extend(_subpage_ids(b.get("children", [])))
+    return ids
+
+
+class _PullCache:
+    """
+    Page-level view of the project's block cache used during one pull.
+    A page is reused when its last_edited_time is unchanged and the cached
+    copy was taken at least a minute after that edit (timestamps are rounded
+    to the minute, so a same-minute pull could have missed later edits).
+    Page timestamps cover edits anywhere in the page, unlike block
+    timestamps, which do not change when nested children are edited; they
+    do not cover child pages, so those are checked as well (``fresh``).
+
+    Several pulls of one project can run at once (sync workers), so
+    ``save`` merges this pull's entries into the file under a lock instead
+    of overwriting it with the snapshot loaded at the start.
+    """
+
+    def __init__(self, project_name: str):
+        self.project_name = project_name
+        self.pages = load_block_cache(project_name)
+        self.recorded = set()
+        self.reused = 0
+
+    def lookup(self, page_id: str, edited: str):
+        entry = self.pages.get(page_id)
+        if not entry or not edited or entry.get("last_edited_time") != edited:
+            return None
+        if entry.get("pulled_at", 0) < _edited_ts(edited) + EDIT_TIME_GRANULARITY:
+            return None
+        if "subpages" not in entry:    # written before child pages were tracked
+            return None
+        return entry
+
+    async def fresh(self, notion, page_id: str, edited: str, token: str,
+                    sem: asyncio.Semaphore, on_rate_limit=None, depth: int = 0):
+        """The cached entry for a page if neither it nor any child page below it changed."""
+        entry = self.lookup(page_id, edited)
+        if entry is None or depth >= MAX_PULL_DEPTH:
+            return None
+
+        async def check(sub_id):
+            sub_edited = await _page_edited_time(notion, sub_id, token, sem, on_rate_limit)
+            return await self.fresh(notion, sub_id, sub_edited, token, sem,
+                                    on_rate_limit, depth + 1) is not None
+
+        results = await asyncio.gather(*(check(sub_id) for sub_id in entry["subpages"]))
+        return entry if all(results) else None
+
+    def changed_blocks(self, page_id: str, blocks: list) -> int:
+        old = (self.pages.get(page_id) or {}).get("blocks", {})
+        return sum(1 for b in blocks if old.get(b["id"]) != b.get("last_edited_time"))
+
+    def record(self, page_id: str, edited: str, blocks: list, markdown: str, pulled_at: float):
+        if not edited:
+            return
+        self.pages[page_id] = {
+            "last_edited_time": edited,
+            "pulled_at": pulled_at,
+            "markdown": markdown,
+            "blocks": {b["id"]: b.get("last_edited_time") for b in blocks},
+            "subpages": _subpage_ids(blocks),
+        }
+        self.recorded.add(page_id)
+
+    def save(self):
+        lock = _block_cache_locks.setdefault(self.project_name, threading.Lock())
+        with lock:
+            pages = load_block_cache(self.project_name)
+            pages.update({pid: self.pages[pid] for pid in self.recorded})
+            save_block_cache(self.project_name, pages)
+
+
+async def _page_edited_time(notion, page_id: str, token: str, sem: asyncio.Semaphore,
+                            on_rate_limit=None) -> str:
+    """last_edited_time of a page, or None if the id is not a page."""
+    try:
+        async with sem:
+            meta = await _notion_call_with_retry(
+                lambda: notion.pages.retrieve(page_id=page_id),
+                on_rate_limit=on_rate_limit,
+                token=token,
+            )
+        return meta.get("last_edited_time")
+    except Exception as e:
+        print(f"[Notion] Could not read page metadata for {page_id}: {e}")
+        return None
+
+
+async def _list_all_children(notion, block_id: str, token: str, sem: asyncio.Semaphore,
+                             on_rate_limit=None) -> list:
+    """All children of one block, following pagination cursors."""
+    children = []
+    cursor = None
+    while True:
+        async with sem:
+            resp = await _notion_call_with_retry(
+                lambda c=cursor: notion.blocks.children.list(
+                    block_id=block_id, start_cursor=c, page_size=BLOCKS_PER_PAGE
+                ),
+                on_rate_limit=on_rate_limit,
+                token=token,
+            )
+        children.extend(resp.get("results", []))
+        if not resp.get("has_more"):
+            return children
+        cursor = resp.get("next_cursor")
+
+
+async def _expand_children(notion, blocks: list, token: str, sem: asyncio.Semaphore,
+                           counter: list, on_rate_limit=None, depth: int = 0,
+                           cache: _PullCache = None):
+    """
+    Fetch nested children for every ``has_children`` block, concurrently and
+    recursively, storing them under block["children"] in document order.
+    With a cache, unchanged child pages are filled from it instead
+    (block["children_markdown"]) and refetched ones are recorded.
+    """
+    if depth >= MAX_PULL_DEPTH:
+        return
+
+    async def expand(block):
+        edited = None
+        if cache is not None and block.get("type") == "child_page":
+            pulled_at = time.time()
+            edited = await _page_edited_time(notion, block["id"], token, sem, on_rate_limit)
+            entry = await cache.fresh(notion, block["id"], edited, token, sem, on_rate_limit,
+                                      depth + 1)
+            if entry is not None:
+                block["children_markdown"] = entry["markdown"]
+                cache.reused += 1
+                return
+
+        children = await _list_all_children(notion, block["id"], token, sem, on_rate_limit)
+        counter[0] += len(children)
+        block["children"] = children
+        await _expand_children(notion, children, token, sem, counter, on_rate_limit,
+                               depth + 1, cache)
+        if edited:
+            cache.record(block["id"], edited, children, blocks_to_markdown(children), pulled_at)
+
+    await asyncio.gather(*(
+        expand(b) for b in blocks
+        if b.get("has_children") and b.get("type") not in _SKIP_CHILDREN
+    ))
+
+
 async def pull_page_markdown_chunked(page_id: str, api_key: str = None,
-                                      on_progress=None):
+                                      on_progress=None, project_name: str = None):
     """
     Download a Notion page in paginated chunks with:
-      - Global rate limiting (≤2.5 req/s with jitter)
+      - Nested children (toggles, sub-lists, columns, tables, child pages)
+        fetched recursively with bounded concurrency
+      - Per-token rate limiting (token bucket, adaptive on 429)
       - Retry-After header support on 429
       - Exponential backoff with jitter
-      - Progress reporting via async callback
+      - Progress reporting via async callback, in document order
+      - With ``project_name``: the project's block cache, so unchanged pages
+        and child pages are served from it after one metadata request
 
     Args:
-        page_id:     The Notion page / block ID.
-        api_key:     Integration token (falls back to env vars).
+        page_id:      The Notion page / block ID.
+        api_key:      Integration token (falls back to env vars).
+        project_name: Project whose .notion_blocks.json cache to use/update.
         on_progress: An async callback ``async fn(info: dict)`` called after
-                     each chunk is fetched.  The dict contains:
+                     each top-level chunk (with all of its nested blocks) is
+                     fetched.  The dict contains:
                        chunk_index (int)
                        blocks_so_far (int)
                        has_more (bool)
@@ -237,6 +612,7 @@ async def pull_page_markdown_chunked(page_id: str, api_key: str = None,
                        status (str) – 'chunk' | 'done' | 'rate_limited'
                        retry_after (float) – only on rate_limited
                        retry_num (int) – only on rate_limited
+                       cached (bool) – on 'done', whether the cache was used
 
     Returns:
         Full markdown string of all blocks joined together.
@@ -244,250 +620,931 @@ async def pull_page_markdown_chunked(page_id: str, api_key: str = None,
     if not AsyncClient:
         raise RuntimeError("Notion dependencies not installed. Please run: pip install notion-client")
 
-    token = api_key or os.environ.get("NOTION_INTEGRATION_TOKEN") or os.environ.get("NOTION_TOKEN")
+    token = _resolve_token(api_key)
     if not token:
         raise ValueError("Notion Integration Token is not set.")
 
-    notion = AsyncClient(auth=token)
+    notion = get_notion_client(token)
 
+    sem = asyncio.Semaphore(PULL_CONCURRENCY)
+    cache = _PullCache(project_name) if project_name else None
+    pulled_at = time.time()
+    edited = None
+    counter = [0]                  # blocks fetched so far, nested included
     all_blocks = []
+    pending = []                   # (blocks, expand task) per top-level page, in order
     has_more = True
     cursor = None
     chunk_index = 0
 
-    while has_more:
-        # Rate-limit progress callback
-        async def _on_rl(delay, retry_num, _ci=chunk_index):
-            if on_progress:
-                await on_progress({
-                    "chunk_index": _ci,
-                    "blocks_so_far": len(all_blocks),
-                    "has_more": True,
-                    "markdown_chunk": "",
-                    "status": "rate_limited",
-                    "retry_after": delay,
-                    "retry_num": retry_num,
-                })
-
-        # Use the global throttled call
-        resp = await _notion_call_with_retry(
-            lambda c=cursor: notion.blocks.children.list(
-                block_id=page_id,
-                start_cursor=c,
-                page_size=BLOCKS_PER_PAGE,
-            ),
-            on_rate_limit=_on_rl,
-        )
-
-        # Process the page
-        page_blocks = resp.get("results", [])
-        all_blocks.extend(page_blocks)
-        has_more = resp.get("has_more", False)
-        cursor = resp.get("next_cursor")
-
-        chunk_md = blocks_to_markdown(page_blocks)
+    # Rate-limit progress callback
+    async def _on_rl(delay, retry_num):
+        if on_progress:
+            await on_progress({
+                "chunk_index": chunk_index,
+                "blocks_so_far": counter[0],
+                "has_more": True,
+                "markdown_chunk": "",
+                "status": "rate_limited",
+                "retry_after": delay,
+                "retry_num": retry_num,
+            })
 
+    async def _emit(page_blocks, more):
+        nonlocal chunk_index
         if on_progress:
             await on_progress({
                 "chunk_index": chunk_index,
-                "blocks_so_far": len(all_blocks),
-                "has_more": has_more,
-                "markdown_chunk": chunk_md,
+                "blocks_so_far": counter[0],
+                "has_more": more,
+                "markdown_chunk": blocks_to_markdown(page_blocks),
                 "status": "chunk",
             })
-
         chunk_index += 1
 
-    # Final "done" progress event
+    if cache is not None:
+        edited = await _page_edited_time(notion, page_id, token, sem, _on_rl)
+        entry = await cache.fresh(notion, page_id, edited, token, sem, _on_rl)
+        if entry is not None:
+            total = len(entry.get("blocks", {}))
+            print(f"[Notion] Page {page_id} unchanged since last pull; using cache")
+            if on_progress:
+                await on_progress({
+                    "chunk_index": 0,
+                    "blocks_so_far": total,
+                    "has_more": False,
+                    "markdown_chunk": entry["markdown"],
+                    "status": "chunk",
+                })
+                await on_progress({
+                    "chunk_index": 1,
+                    "blocks_so_far": total,
+                    "has_more": False,
+                    "markdown_chunk": "",
+                    "status": "done",
+                    "total_blocks": total,
+                    "cached": True,
+                })
+            return entry["markdown"]
+
+    try:
+        while has_more:
+            # Top-level pagination stays sequential (cursor-driven); nested
+            # children of each page are fetched in the background meanwhile.
+            async with sem:
+                resp = await _notion_call_with_retry(
+                    lambda c=cursor: notion.blocks.children.list(
+                        block_id=page_id,
+                        start_cursor=c,
+                        page_size=BLOCKS_PER_PAGE,
+                    ),
+                    on_rate_limit=_on_rl,
+                    token=token,
+                )
+
+            page_blocks = resp.get("results", [])
+            all_blocks.extend(page_blocks)
+            counter[0] += len(page_blocks)
+            has_more = resp.get("has_more", False)
+            cursor = resp.get("next_cursor")
+            pending.append((page_blocks, asyncio.create_task(
+                _expand_children(notion, page_blocks, token, sem, counter, _on_rl, cache=cache)
+            )))
+
+            # Stream every page whose subtree is complete, without reordering
+            while pending and pending[0][1].done():
+                blocks, task = pending.pop(0)
+                task.result()
+                await _emit(blocks, has_more or bool(pending))
+
+        while pending:
+            blocks, task = pending[0]
+            await task
+            pending.pop(0)
+            await _emit(blocks, bool(pending))
+    finally:
+        for _, task in pending:
+            task.cancel()
+
     full_md = blocks_to_markdown(all_blocks)
+    if cache is not None:
+        changed = cache.changed_blocks(page_id, all_blocks)
+        cache.record(page_id, edited, all_blocks, full_md, pulled_at)
+        cache.save()
+        print(f"[Notion] Pulled {page_id}: {changed}/{len(all_blocks)} top-level blocks changed, "
+              f"{cache.reused} child page(s) from cache")
+
+    # Final "done" progress event
     if on_progress:
         await on_progress({
             "chunk_index": chunk_index,
-            "blocks_so_far": len(all_blocks),
+            "blocks_so_far": counter[0],
             "has_more": False,
             "markdown_chunk": "",
             "status": "done",
-            "total_blocks": len(all_blocks),
+            "total_blocks": counter[0],
+            "cached": False,
         })
 
     return full_md
 
 
-async def pull_page_markdown(page_id: str, api_key: str = None) -> str:
+async def pull_page_markdown(page_id: str, api_key: str = None, project_name: str = None) -> str:
     """Download a Notion page and convert it to plain Markdown (simple wrapper)."""
-    return await pull_page_markdown_chunked(page_id, api_key=api_key)
+    return await pull_page_markdown_chunked(page_id, api_key=api_key, project_name=project_name)
 
 
 # ---------------------------------------------------------
 # Pushing (Markdown -> Notion Blocks)
 # ---------------------------------------------------------
 
+MAX_RICH_TEXT_LEN   = 2000     # Notion limit per rich_text item
+MAX_RICH_TEXT_ITEMS = 100      # Notion limit per rich_text array
+
+# Block-level tokens, tried in order on each line
+_MD_BLOCK_RE = re.compile(r"""
+    (?P<fence>```\s*(?P<lang>[\w+#.-]*)\s*$)
+  | (?P<heading>\#{1,6})\s+(?P<htext>.*)
+  | [-*+]\s+\[(?P<check>[ xX])\](?:\s+|$)(?P<todo>.*)
+  | (?P<divider>(?:-\s*){3,}|(?:\*\s*){3,}|(?:_\s*){3,})$
+  | [-*+]\s+(?P<bullet>.*)
+  | \d{1,3}[.)]\s+(?P<number>.*)
+  | >\s?(?P<quote>.*)
+""", re.VERBOSE)
+
+# Inline tokens; emphasis bodies are parsed recursively
+_MD_INLINE_RE = re.compile(r"""
+    `(?P<code>[^`]+)`
+  | \[(?P<ltext>[^\]]+)\]\((?P<url>[^)\s]+)\)
+  | \*\*\*(?P<bi>.+?)\*\*\*
+  | \*\*(?P<b>.+?)\*\*
+  | (?<!\w)__(?P<b2>.+?)__(?!\w)
+  | ~~(?P<s>.+?)~~
+  | \*(?P<i>[^*\s](?:[^*]*[^*\s])?)\*
+  | (?<!\w)_(?P<i2>[^_\s](?:[^_]*[^_\s])?)_(?!\w)
+""", re.VERBOSE)
+
+# Languages Notion accepts for code blocks, plus common Markdown aliases
+_CODE_LANG_ALIASES = {
+    "": "plain text", "text": "plain text", "txt": "plain text", "plaintext": "plain text",
+    "js": "javascript", "ts": "typescript", "py": "python", "sh": "shell", "bash": "bash",
+    "zsh": "shell", "md": "markdown", "yml": "yaml", "rb": "ruby", "rs": "rust",
+    "c++": "c++", "cpp": "c++", "cs": "c#", "csharp": "c#", "golang": "go", "kt": "kotlin",
+    "html": "html", "css": "css", "json": "json", "sql": "sql", "java": "java",
+}
+_CODE_LANGS = {
+    "abap", "arduino", "bash", "basic", "c", "clojure", "coffeescript", "c++", "c#", "css",
+    "dart", "diff", "docker", "elixir", "elm", "erlang", "flow", "fortran", "f#", "gherkin",
+    "glsl", "go", "graphql", "groovy", "haskell", "html", "java", "javascript", "json",
+    "julia", "kotlin", "latex", "less", "lisp", "livescript", "lua", "makefile", "markdown",
+    "markup", "matlab", "mermaid", "nix", "objective-c", "ocaml", "pascal", "perl", "php",
+    "plain text", "powershell", "prolog", "protobuf", "python", "r", "reason", "ruby", "rust",
+    "sass", "scala", "scheme", "scss", "shell", "sql", "swift", "typescript", "vb.net",
+    "verilog", "vhdl", "visual basic", "webassembly", "xml", "yaml",
+}
+
+
+def _parse_inline(text: str, ann: tuple = (), url: str = None, out: list = None) -> list:
+    """Split inline Markdown into [(content, annotations, url)] runs."""
+    if out is None:
+        out = []
+    pos = 0
+    for m in _MD_INLINE_RE.finditer(text):
+        if m.start() > pos:
+            out.append((text[pos:m.start()], ann, url))
+        kind = m.lastgroup
+        if kind == "code":
+            out.append((m.group("code"), ann + ("code",), url))
+        elif kind == "url":
+            _parse_inline(m.group("ltext"), ann, m.group("url"), out)
+        elif kind == "bi":
+            _parse_inline(m.group("bi"), ann + ("bold", "italic"), url, out)
+        elif kind in ("b", "b2"):
+            _parse_inline(m.group(kind), ann + ("bold",), url, out)
+        elif kind == "s":
+            _parse_inline(m.group("s"), ann + ("strikethrough",), url, out)
+        else:
+            _parse_inline(m.group(kind), ann + ("italic",), url, out)
+        pos = m.end()
+    if pos < len(text):
+        out.append((text[pos:], ann, url))
+    return out
+
+
+def _rich_text(runs: list) -> list:
+    """Notion rich_text items for runs, merged where styles match and split at 2,000 chars."""
+    canonical = []
+    for content, ann, url in runs:
+        # Whitespace at the edge of styled/linked text is kept plain, so that
+        # rendering back to Markdown ("**bold** ") parses to the same runs
+        if (ann or url) and "code" not in ann:
+            core = content.strip()
+            lead = content[:len(content) - len(content.lstrip())]
+            trail = content[len(content.rstrip()):] if core else ""
+            canonical += [(lead, (), None), (core, ann, url), (trail, (), None)]
+        else:
+            canonical.append((content, ann, url))
+
+    merged = []
+    for content, ann, url in canonical:
+        key = (tuple(sorted(set(ann))), url)
+        if merged and merged[-1][1] == key:
+            merged[-1][0] += content
+        elif content:
+            merged.append([content, key])
+
+    items = []
+    for content, (ann, url) in merged:
+        for i in range(0, len(content), MAX_RICH_TEXT_LEN):
+            item = {"type": "text", "text": {"content": content[i:i + MAX_RICH_TEXT_LEN]}}
+            if url:
+                item["text"]["link"] = {"url": url}
+            if ann:
+                item["annotations"] = {a: True for a in ann}
+            items.append(item)
+    return items
+
+
+def _text_blocks(btype: str, rich: list, **extra) -> list:
+    """One block per 100 rich_text items (Notion's array limit)."""
+    chunks = [rich[i:i + MAX_RICH_TEXT_ITEMS] for i in range(0, len(rich), MAX_RICH_TEXT_ITEMS)] or [[]]
+    return [
+        {"object": "block", "type": btype, btype: {"rich_text": chunk, **extra}}
+        for chunk in chunks
+    ]
+
+
 def _markdown_to_notion_blocks(markdown_text: str):
     """
-    Very loose, naive parser to convert standard markdown into Notion Block objects.
-    Handles: Paragraphs, H1, H2, H3, Bulleted Lists, Checkboxes.
+    Convert Markdown into Notion block objects in a single pass.
+    Handles: headings (H4+ become H3), paragraphs, bulleted/numbered lists,
+    to-dos, dividers, fenced code (language mapped to Notion's list), block
+    quotes (consecutive lines merged) and inline bold/italic/strikethrough/
+    code/links as rich-text annotations. Every rich_text item stays within
+    Notion's 2,000-character limit. Blank lines separate blocks; indentation
+    is not preserved (nested items are pushed flat).
     """
     blocks = []
-    lines = markdown_text.split('\n')
-
-    for line in lines:
-        line_stripped = line.strip()
-        if not line_stripped:
-            continue # Skip empty lines entirely for now, or insert empty paragraph
-
-        # Headers
-        if line_stripped.startswith('# '):
-            blocks.append({
-                "object": "block",
-                "type": "heading_1",
-                "heading_1": {"rich_text": [{"type": "text", "text": {"content": line_stripped[2:].strip()}}]}
-            })
-        elif line_stripped.startswith('## '):
-            blocks.append({
-                "object": "block",
-                "type": "heading_2",
-                "heading_2": {"rich_text": [{"type": "text", "text": {"content": line_stripped[3:].strip()}}]}
-            })
-        elif line_stripped.startswith('### '):
-            blocks.append({
-                "object": "block",
-                "type": "heading_3",
-                "heading_3": {"rich_text": [{"type": "text", "text": {"content": line_stripped[4:].strip()}}]}
-            })
-        # Bullet list
-        elif line_stripped.startswith('- ') or line_stripped.startswith('* '):
-            blocks.append({
-                "object": "block",
-                "type": "bulleted_list_item",
-                "bulleted_list_item": {"rich_text": [{"type": "text", "text": {"content": line_stripped[2:].strip()}}]}
-            })
-        # To do list
-        elif line_stripped.startswith('- [ ] ') or line_stripped.startswith('- [x] '):
-            checked = '[x]' in line_stripped[:6].lower()
-            blocks.append({
-                "object": "block",
-                "type": "to_do",
-                "to_do": {
-                    "rich_text": [{"type": "text", "text": {"content": line_stripped[6:].strip()}}],
-                    "checked": checked
-                }
-            })
-        # standard paragraph
+    quote = None                   # lines of the block quote being collected
+    code = None                    # (language, lines) of the open code fence
+
+    def flush_quote():
+        nonlocal quote
+        if quote is not None:
+            blocks.extend(_text_blocks("quote", _rich_text(_parse_inline("\n".join(quote)))))
+            quote = None
+
+    for line in markdown_text.split("\n"):
+        if code is not None:
+            if line.strip().startswith("```"):
+                lang, body = code
+                blocks.extend(_text_blocks("code", _rich_text([("\n".join(body), (), None)]),
+                                           language=lang))
+                code = None
+            else:
+                code[1].append(line)
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            flush_quote()
+            continue
+
+        m = _MD_BLOCK_RE.match(stripped)
+        if m and m.group("quote") is not None:
+            if quote is None:
+                quote = []
+            quote.append(m.group("quote"))
+            continue
+        flush_quote()
+
+        if m and m.group("fence") is not None:
+            lang = m.group("lang").lower()
+            lang = _CODE_LANG_ALIASES.get(lang, lang)
+            code = (lang if lang in _CODE_LANGS else "plain text", [])
+        elif m and m.group("heading"):
+            level = min(len(m.group("heading")), 3)
+            blocks.extend(_text_blocks(f"heading_{level}", _rich_text(_parse_inline(m.group("htext").strip()))))
+        elif m and m.group("check") is not None:
+            blocks.extend(_text_blocks("to_do", _rich_text(_parse_inline(m.group("todo"))),
+                                       checked=m.group("check").lower() == "x"))
+        elif m and m.group("divider"):
+            blocks.append({"object": "block", "type": "divider", "divider": {}})
+        elif m and m.group("bullet") is not None:
+            blocks.extend(_text_blocks("bulleted_list_item", _rich_text(_parse_inline(m.group("bullet")))))
+        elif m and m.group("number") is not None:
+            blocks.extend(_text_blocks("numbered_list_item", _rich_text(_parse_inline(m.group("number")))))
         else:
-            blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [{"type": "text", "text": {"content": line_stripped}}]
-                }
-            })
+            blocks.extend(_text_blocks("paragraph", _rich_text(_parse_inline(stripped))))
+
+    flush_quote()
+    if code is not None:
+        # Unclosed fence: keep what was collected
+        lang, body = code
+        blocks.extend(_text_blocks("code", _rich_text([("\n".join(body), (), None)]), language=lang))
 
     return blocks
 
 
+PUSH_BATCH_SIZE  = 100        # Notion's max children per append request
+PUSH_CONCURRENCY = 3          # parallel update/delete calls (still rate limited)
+
+
+def _rich_text_signature(rich: list) -> list:
+    """Normalise rich_text so local and fetched blocks compare equal."""
+    segments = []
+    for r in rich:
+        content = r.get("plain_text")
+        if content is None:
+            content = (r.get("text") or {}).get("content", "")
+        ann = r.get("annotations") or {}
+        style = sorted(k for k, v in ann.items() if v is True)
+        if ann.get("color", "default") != "default":
+            style.append(f"color:{ann['color']}")
+        link = (r.get("text") or {}).get("link") or {}
+        key = (style, link.get("url"))
+        # Notion may split one run into several segments; merge them back
+        if segments and segments[-1][1:] == [*key]:
+            segments[-1][0] += content
+        else:
+            segments.append([content, *key])
+    return segments
+
+
+def _block_signature(block: dict) -> str:
+    """Content hash of a block: type, text, styling and type-specific flags."""
+    btype = block.get("type", "")
+    data = block.get(btype, {}) or {}
+    sig = {
+        "type": btype,
+        "text": _rich_text_signature(data.get("rich_text", [])),
+        "checked": data.get("checked"),
+        "language": data.get("language"),
+        # Existing blocks with nested content never match a flat local block
+        "children": bool(block.get("has_children")),
+    }
+    if btype == "child_page":
+        # Pulled as "## Title"; line it up with that heading so it stays put
+        sig.update(type="heading_2", text=[[data.get("title", "Untitled"), [], None]], children=False)
+    elif _is_fixed_block(block):
+        sig["id"] = block.get("id")  # Never equal to a local block
+    return hashlib.md5(json.dumps(sig, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _is_fixed_block(block: dict) -> bool:
+    """
+    Blocks the Markdown converter cannot produce (child pages, databases,
+    images, embeds, tables...). A push never deletes or rewrites them:
+    deleting a child_page would send the sub-page to the trash.
+    """
+    btype = block.get("type", "")
+    return "rich_text" not in (block.get(btype) or {}) and btype != "divider"
+
+
+def _pulled_subtree(block: dict):
+    """
+    Signatures of the local blocks that a fetched block *with its nested
+    content* turns into after a pull (its own line plus the indented, quoted
+    or flattened lines of its children, child page bodies and table rows).
+    None for blocks whose children were not fetched.
+    """
+    if not block.get("children"):
+        return None
+    return [_block_signature(b) for b in _markdown_to_notion_blocks(blocks_to_markdown([block]))]
+
+
+def _plan_push(old_blocks: list, new_blocks: list) -> tuple[list, list, list]:
+    """
+    Diff fetched blocks against converted Markdown by content hash.
+    Returns (updates, inserts, deletes):
+      updates: [(block_id, new_block)] for same-type blocks whose text changed
+      inserts: [(after_block_id | None, [new_blocks...])] in document order
+      deletes: [block_id]
+
+    Old blocks fetched with their children (block["children"]) stand for
+    every line the pull wrote for them. Where those lines still appear, in
+    order, among the new blocks they are matched as one unit, so an
+    unchanged nested list, table or child page is left alone instead of
+    being flattened into (or copied into) the top level.
+    """
+    old_sigs = [_block_signature(b) for b in old_blocks]
+    new_sigs = [_block_signature(b) for b in new_blocks]
+
+    # Collapse the pulled subtree of each nested old block into one unit
+    units = []                     # (signature, [new blocks]) in document order
+    pos = 0
+    for k, block in enumerate(old_blocks):
+        subtree = _pulled_subtree(block)
+        if not subtree:
+            continue
+        n = len(subtree)
+        at = next((p for p in range(pos, len(new_sigs) - n + 1) if new_sigs[p:p + n] == subtree), None)
+        if at is None:
+            continue               # edited: falls back to the block's own signature
+        old_sigs[k] = "tree:" + block["id"]
+        units.extend((new_sigs[p], [new_blocks[p]]) for p in range(pos, at))
+        units.append((old_sigs[k], new_blocks[at:at + n]))
+        pos = at + n
+    units.extend((new_sigs[p], [new_blocks[p]]) for p in range(pos, len(new_sigs)))
+
+    opcodes = difflib.SequenceMatcher(None, old_sigs, [sig for sig, _ in units],
+                                      autojunk=False).get_opcodes()
+
+    # Notion can only insert *after* an existing block. A run inserted at the
+    # very top is anchored to the first old block, which is then recreated
+    # (a fixed first block can't be, so the run goes right after it instead).
+    if opcodes and opcodes[0][0] == "insert" and old_blocks and not _is_fixed_block(old_blocks[0]):
+        _, _, _, j1, j2 = opcodes[0]
+        rest = opcodes[1:]
+        if rest and rest[0][0] == "equal":
+            _, i1b, i2b, j1b, j2b = rest[0]
+            rest = ([("equal", i1b + 1, i2b, j1b + 1, j2b)] if i2b - i1b > 1 else []) + rest[1:]
+        opcodes = [("replace", 0, 1, j1, j2 + 1)] + rest
+
+    updates, inserts, deletes = [], [], []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            continue
+        old_run, new_units = old_blocks[i1:i2], [blocks for _, blocks in units[j1:j2]]
+        if tag == "replace" and len(old_run) == len(new_units) and all(
+            len(u) == 1 and o.get("type") == u[0]["type"] and not o.get("has_children")
+            and "rich_text" in o.get(o.get("type"), {})
+            for o, u in zip(old_run, new_units)
+        ):
+            updates.extend((o["id"], u[0]) for o, u in zip(old_run, new_units))
+            continue
+        deletes.extend(b["id"] for b in old_run if not _is_fixed_block(b))
+        new_run = [b for u in new_units for b in u]
+        if new_run:
+            # Anchor after the last old block of this run (it is deleted
+            # afterwards) or, for pure inserts, after the preceding block.
+            anchor = old_blocks[max(i2, 1) - 1]["id"] if old_blocks else None
+            if inserts and inserts[-1][0] == anchor:
+                # No surviving block between the two runs: one run keeps
+                # them in order (a second append after the same anchor
+                # would land in front of the first)
+                inserts[-1][1].extend(new_run)
+            else:
+                inserts.append((anchor, list(new_run)))
+    return updates, inserts, deletes
+
+
+async def _gather_limited(coro_factories: list, limit: int = PUSH_CONCURRENCY) -> list:
+    """Run coroutine factories with bounded concurrency; returns results/exceptions."""
+    sem = asyncio.Semaphore(limit)
+
+    async def _run(factory):
+        async with sem:
+            return await factory()
+
+    return await asyncio.gather(*(_run(f) for f in coro_factories), return_exceptions=True)
+
+
 async def push_markdown_to_page(page_id: str, markdown_text: str, api_key: str = None) -> bool:
-    """Overwrite the content of a Notion page with converted Markdown blocks."""
-    notion = get_notion_client(api_key)
+    """
+    Make a Notion page match the converted Markdown blocks. Only blocks whose
+    content hash changed are updated, inserted or deleted, so push time scales
+    with the size of the edit rather than the size of the page.
+    """
+    token = _resolve_token(api_key)
+    notion = get_notion_client(token)
     if not notion:
         raise ValueError("Notion client not configured. Set your token via the Notion button.")
 
     # 1. Fetch existing blocks (rate-limited)
-    blocks_to_delete = []
+    old_blocks = []
     has_more = True
     next_cursor = None
     while has_more:
         resp = await _notion_call_with_retry(
             lambda c=next_cursor: notion.blocks.children.list(
-                block_id=page_id, start_cursor=c
-            )
+                block_id=page_id, start_cursor=c, page_size=BLOCKS_PER_PAGE
+            ),
+            token=token,
         )
-        blocks_to_delete.extend(resp.get("results", []))
+        old_blocks.extend(resp.get("results", []))
         has_more = resp.get("has_more", False)
         next_cursor = resp.get("next_cursor")
 
-    # 2. Delete existing blocks (rate-limited, one by one)
-    delete_failures = 0
-    for b in blocks_to_delete:
-        try:
-            await _notion_call_with_retry(
-                lambda bid=b["id"]: notion.blocks.delete(block_id=bid)
-            )
-        except Exception as e:
-            delete_failures += 1
-            print(f"[Notion] Warning: Could not delete block {b['id']}: {e}")
-
-    if delete_failures and delete_failures == len(blocks_to_delete) and blocks_to_delete:
-        raise PermissionError(
-            f"Notion integration lacks 'Delete content' permission on this page "
-            f"({delete_failures}/{len(blocks_to_delete)} blocks could not be deleted). "
-            "In Notion: open the page → ··· menu → Connections → your integration → ensure 'Can edit content' is enabled."
-        )
+    # Nested content (lists, tables, child pages) was pulled into the
+    # Markdown; fetch it too so the plan can recognise it as unchanged
+    await _expand_children(notion, old_blocks, token, asyncio.Semaphore(PULL_CONCURRENCY), [0])
 
-    # 3. Parse Markdown → Notion blocks
+    # 2. Parse Markdown → Notion blocks and diff against the page
     new_blocks = _markdown_to_notion_blocks(markdown_text)
-    if not new_blocks:
-        return True  # Nothing to push
+    updates, inserts, deletes = _plan_push(old_blocks, new_blocks)
+    print(f"[Notion] Push plan for {page_id}: {len(updates)} update, "
+          f"{sum(len(run) for _, run in inserts)} insert, {len(deletes)} delete "
+          f"({len(old_blocks)} existing, {len(new_blocks)} local)")
 
-    # 4. Append new blocks (max 100 per request, rate-limited)
-    chunk_size = 100
     try:
-        for i in range(0, len(new_blocks), chunk_size):
-            chunk = new_blocks[i:i + chunk_size]
-            await _notion_call_with_retry(
-                lambda ch=chunk: notion.blocks.children.append(
-                    block_id=page_id, children=ch
+        # 3. Insert new runs in document order (max 100 per request)
+        for anchor, run in inserts:
+            for i in range(0, len(run), PUSH_BATCH_SIZE):
+                batch = run[i:i + PUSH_BATCH_SIZE]
+                kwargs = {"block_id": page_id, "children": batch}
+                if anchor:
+                    kwargs["after"] = anchor
+                resp = await _notion_call_with_retry(
+                    lambda kw=kwargs: notion.blocks.children.append(**kw), token=token
                 )
-            )
+                created = resp.get("results", [])
+                if anchor and created:
+                    anchor = created[-1]["id"]
+
+        # 4. Update changed blocks in place
+        results = await _gather_limited([
+            (lambda bid=bid, b=b: _notion_call_with_retry(
+                lambda: notion.blocks.update(block_id=bid, **{b["type"]: b[b["type"]]}),
+                token=token,
+            ))
+            for bid, b in updates
+        ])
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            raise failed[0]
     except Exception as e:
         raise PermissionError(
             f"Notion push failed: {e}. "
             "Ensure your integration has 'Can edit content' permission on this page."
         )
 
+    # 5. Delete blocks that are gone (rate-limited, in parallel)
+    results = await _gather_limited([
+        (lambda bid=bid: _notion_call_with_retry(
+            lambda: notion.blocks.delete(block_id=bid), token=token
+        ))
+        for bid in deletes
+    ])
+    delete_failures = 0
+    for bid, r in zip(deletes, results):
+        if isinstance(r, Exception):
+            delete_failures += 1
+            print(f"[Notion] Warning: Could not delete block {bid}: {r}")
+
+    if delete_failures and delete_failures == len(deletes):
+        raise PermissionError(
+            f"Notion integration lacks 'Delete content' permission on this page "
+            f"({delete_failures}/{len(deletes)} blocks could not be deleted). "
+            "In Notion: open the page → ··· menu → Connections → your integration → ensure 'Can edit content' is enabled."
+        )
+
     return True
 
 
+# ---------------------------------------------------------
+# Project Sync (every mapped file, persistent resumable queue)
+# ---------------------------------------------------------
+
+SYNC_WORKERS = 2               # files processed at once (API calls stay rate limited)
+
+
+def get_sync_state_path(project_name: str) -> Path:
+    return PROJECTS_DIR / project_name / ".notion_sync_state.json"
+
+def get_sync_queue_path(project_name: str) -> Path:
+    return PROJECTS_DIR / project_name / ".notion_sync_queue.json"
+
+def load_sync_state(project_name: str) -> dict:
+    """{file: {local_hash, remote_edited}} as of the last successful sync of each file."""
+    return _read_json(get_sync_state_path(project_name), {})
+
+_sync_state_locks: dict[str, threading.Lock] = {}
+
+def update_sync_state(project_name: str, entries: dict):
+    """
+    Merge {file: entry} into the sync state file. Manual pulls/pushes and a
+    running sync job both record files, so each re-reads the file under a
+    per-project lock instead of writing back a copy loaded earlier.
+    """
+    if not entries:
+        return
+    lock = _sync_state_locks.setdefault(project_name, threading.Lock())
+    with lock:
+        state = load_sync_state(project_name)
+        state.update(entries)
+        _write_json_atomic(get_sync_state_path(project_name), state)
+
+def load_sync_queue(project_name: str) -> dict:
+    return _read_json(get_sync_queue_path(project_name), {})
+
+def _content_hash(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+def sync_queue_summary(queue: dict) -> dict:
+    items = queue.get("items", [])
+    counts = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return {
+        "job_id": queue.get("job_id"),
+        "total": len(items),
+        "done": sum(1 for i in items if i["status"] != "pending"),
+        "counts": counts,
+    }
+
+
+async def mark_synced(project_name: str, file_rel_path: str, page_id: str, content: str,
+                      api_key: str = None):
+    """Record that a file and its page now match (after a manual pull or push)."""
+    token = _resolve_token(api_key)
+    notion = get_notion_client(token)
+    if not notion:
+        return
+    edited = await _page_edited_time(notion, page_id, token, asyncio.Semaphore(1))
+    update_sync_state(project_name, {
+        file_rel_path: {"local_hash": _content_hash(content), "remote_edited": edited},
+    })
+
+
+async def sync_project(project_name: str, resolve_path, api_key: str = None,
+                       on_progress=None, restart: bool = False) -> dict:
+    """
+    Sync every file in the project's Notion mapping.
+
+    Per file, the local content hash and the page's last_edited_time are
+    compared with the values recorded at the last sync:
+      local changed only  → push      remote changed only → pull
+      both changed        → conflict  (left untouched, reported)
+      neither             → skip
+    Files never synced before are pulled if missing locally, otherwise the
+    page is pulled once and compared (equal → skip, different → conflict).
+
+    The work queue is persisted to .notion_sync_queue.json after every file,
+    so an interrupted job resumes where it stopped unless ``restart``.
+
+    Args:
+        resolve_path: ``fn(rel_path) -> Path`` mapping mapped file paths to disk.
+        on_progress:  Async callback ``async fn(info: dict)``; info["status"]
+                      is 'queued' | 'item' | 'complete'.
+    Returns:
+        Summary dict from ``sync_queue_summary``.
+    """
+    token = _resolve_token(api_key)
+    notion = get_notion_client(token)
+    if not notion:
+        raise ValueError("Notion client not configured. Set your token via the Notion button.")
+
+    queue_path = get_sync_queue_path(project_name)
+    queue = load_sync_queue(project_name)
+    resumed = bool(queue) and not restart and any(i["status"] == "pending" for i in queue.get("items", []))
+    if not resumed:
+        mapping = load_notion_map(project_name)
+        queue = {
+            "job_id": f"{int(time.time())}",
+            "created": time.time(),
+            "items": [
+                {"file": rel, "page_id": pid, "status": "pending"}
+                for rel, pid in sorted(mapping.items()) if pid
+            ],
+        }
+        _write_json_atomic(queue_path, queue)
+
+    state = {}                     # entries this job recorded, merged into the file per item
+    sem = asyncio.Semaphore(PULL_CONCURRENCY)
+    save_lock = asyncio.Lock()
+
+    async def _report(info: dict):
+        if on_progress:
+            await on_progress({**info, **sync_queue_summary(queue)})
+
+    async def _pull(item: dict, edited: str) -> str:
+        content = await pull_page_markdown_chunked(item["page_id"], api_key=token,
+                                                   project_name=project_name)
+        target = resolve_path(item["file"])
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+        state[item["file"]] = {"local_hash": _content_hash(content), "remote_edited": edited}
+        return "pulled"
+
+    async def _push(item: dict, local: str) -> str:
+        await push_markdown_to_page(item["page_id"], local, api_key=token)
+        edited = await _page_edited_time(notion, item["page_id"], token, sem)
+        state[item["file"]] = {"local_hash": _content_hash(local), "remote_edited": edited}
+        return "pushed"
+
+    async def _sync_item(item: dict) -> str:
+        path = resolve_path(item["file"])
+        local = path.read_text(encoding="utf-8") if path.exists() else None
+        edited = await _page_edited_time(notion, item["page_id"], token, sem)
+        if edited is None:
+            raise ValueError("Page not accessible to this integration")
+
+        # Read fresh: a manual pull/push may have recorded this file meanwhile
+        entry = load_sync_state(project_name).get(item["file"])
+        if local is None:
+            return await _pull(item, edited)
+        if entry is None:
+            remote = await pull_page_markdown_chunked(item["page_id"], api_key=token,
+                                                      project_name=project_name)
+            if _content_hash(remote) != _content_hash(local):
+                return "conflict"
+            state[item["file"]] = {"local_hash": _content_hash(local), "remote_edited": edited}
+            return "skipped"
+
+        local_changed = _content_hash(local) != entry.get("local_hash")
+        remote_changed = edited != entry.get("remote_edited")
+        if local_changed and remote_changed:
+            return "conflict"
+        if local_changed:
+            return await _push(item, local)
+        if remote_changed:
+            return await _pull(item, edited)
+        return "skipped"
+
+    pending = [i for i in queue["items"] if i["status"] == "pending"]
+    work: asyncio.Queue = asyncio.Queue()
+    for item in pending:
+        work.put_nowait(item)
+
+    await _report({"status": "queued", "resumed": resumed})
+    print(f"[Notion/Sync] {project_name}: {len(pending)} file(s) queued"
+          f"{' (resumed)' if resumed else ''}")
+
+    async def _worker():
+        while True:
+            try:
+                item = work.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                item["status"] = await _sync_item(item)
+                item.pop("error", None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                item["status"] = "error"
+                item["error"] = str(e)
+                print(f"[Notion/Sync] {item['file']}: {e}")
+            async with save_lock:
+                update_sync_state(project_name, state)
+                state.clear()
+                _write_json_atomic(queue_path, queue)
+            await _report({"status": "item", "file": item["file"],
+                           "result": item["status"], "error": item.get("error")})
+
+    await asyncio.gather(*(_worker() for _ in range(SYNC_WORKERS)))
+
+    summary = sync_queue_summary(queue)
+    await _report({"status": "complete"})
+    return summary
+
+
 # ---------------------------------------------------------
 # Tree Exploration API (For UI Modal)
 # ---------------------------------------------------------
 
-async def fetch_notion_tree(api_key: str = None):
+TREE_PAGE_SIZE    = 100        # Notion search page size (API maximum)
+TREE_TTL          = 60         # seconds before the index is refreshed incrementally
+TREE_FULL_REFRESH = 900        # seconds before a full rebuild (drops unshared/deleted pages)
+TREE_LIMIT_MAX    = 500
+
+_tree_caches: dict[str, dict] = {}   # token key -> {"pages", "newest", "built", "checked"}
+_tree_locks: dict[str, asyncio.Lock] = {}
+
+
+def _page_title(item: dict) -> str:
+    # Extract title (sometimes nested weirdly)
+    for prop_data in (item.get("properties") or {}).values():
+        if prop_data.get("type") == "title":
+            title_arr = prop_data.get("title", [])
+            if title_arr:
+                return "".join(t.get("plain_text", "") for t in title_arr)
+            break
+    return "Untitled"
+
+
+def _tree_entry(item: dict) -> dict:
+    parent = item.get("parent") or {}
+    return {
+        "id": item["id"],
+        "title": _page_title(item),
+        "url": item.get("url", ""),
+        "last_edited": item.get("last_edited_time", ""),
+        "parent_id": parent.get("page_id"),
+    }
+
+
+async def _search_pages(notion, token: str, stop_before: str = None) -> list:
+    """
+    All pages visible to the integration, newest edit first. With
+    ``stop_before``, stop paginating once results are older than that time.
+    """
+    results = []
+    cursor = None
+    while True:
+        kwargs = {
+            "query": "",
+            "filter": {"value": "page", "property": "object"},
+            "sort": {"direction": "descending", "timestamp": "last_edited_time"},
+            "page_size": TREE_PAGE_SIZE,
+        }
+        if cursor:
+            kwargs["start_cursor"] = cursor
+        resp = await _notion_call_with_retry(lambda kw=kwargs: notion.search(**kw), token=token)
+        batch = resp.get("results", [])
+        results.extend(batch)
+        if stop_before and batch and batch[-1].get("last_edited_time", "") < stop_before:
+            break
+        if not resp.get("has_more"):
+            break
+        cursor = resp.get("next_cursor")
+    return results
+
+
+async def _get_page_index(notion, token: str, refresh: bool = False) -> dict:
+    """Cached {page_id: entry} for a token, refreshed by last_edited_time."""
+    key = _token_key(token)
+    lock = _tree_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        cache = _tree_caches.get(key)
+        now = time.monotonic()
+
+        if cache is None or refresh or now - cache["built"] > TREE_FULL_REFRESH:
+            items = await _search_pages(notion, token)
+            pages = {i["id"]: _tree_entry(i) for i in items if not i.get("archived")}
+            cache = _tree_caches[key] = {"pages": pages, "built": now, "checked": now}
+            print(f"[Notion] Page index built: {len(pages)} page(s)")
+        elif now - cache["checked"] > TREE_TTL:
+            # Only pages edited since the newest one we know about
+            items = await _search_pages(notion, token, stop_before=cache["newest"])
+            for item in items:
+                if item.get("archived"):
+                    cache["pages"].pop(item["id"], None)
+                else:
+                    cache["pages"][item["id"]] = _tree_entry(item)
+            cache["checked"] = now
+
+        cache["newest"] = max((p["last_edited"] for p in cache["pages"].values()), default="")
+        return cache["pages"]
+
+
+def _order_tree(pages: dict, query: str = "") -> list:
+    """
+    Depth-first order (parents before children, newest edit first among
+    siblings) with depth/has_children. With a query, the flat list of
+    matching titles, each with the titles of its ancestors as "path".
     """
-    Fetch accessible pages out of the Notion workspace
-    so the user can pick which one to link.
-    Uses the global rate limiter.
+    children = {}
+    for p in pages.values():
+        parent = p["parent_id"] if p["parent_id"] in pages else None
+        children.setdefault(parent, []).append(p)
+    for siblings in children.values():
+        siblings.sort(key=lambda p: p["last_edited"], reverse=True)
+
+    if query:
+        q = query.lower()
+        out = []
+        for p in sorted(pages.values(), key=lambda p: p["last_edited"], reverse=True):
+            if q not in p["title"].lower():
+                continue
+            path, parent, seen = [], p["parent_id"], set()
+            while parent in pages and parent not in seen:
+                seen.add(parent)
+                path.insert(0, pages[parent]["title"])
+                parent = pages[parent]["parent_id"]
+            out.append({**p, "depth": 0, "path": path, "has_children": p["id"] in children})
+        return out
+
+    out = []
+    visited = set()
+    stack = [(p, 0) for p in reversed(children.get(None, []))]
+    while stack:
+        page, depth = stack.pop()
+        if page["id"] in visited:
+            continue
+        visited.add(page["id"])
+        kids = children.get(page["id"], [])
+        out.append({**page, "depth": depth, "has_children": bool(kids)})
+        stack.extend((k, depth + 1) for k in reversed(kids))
+    return out
+
+
+async def fetch_notion_tree(api_key: str = None, query: str = "", cursor: str = None,
+                            limit: int = TREE_PAGE_SIZE, refresh: bool = False) -> dict:
     """
-    notion = get_notion_client(api_key)
+    Pages accessible to the integration, so the user can pick which one to
+    link. Served from a per-token index (see _get_page_index) and paginated
+    with an opaque offset cursor.
+
+    Returns:
+        {"pages": [...], "next_cursor": str | None, "total": int}
+        Each page: id, title, url, last_edited, parent_id, depth, has_children
+        (plus "path" when filtering by query).
+    """
+    token = _resolve_token(api_key)
+    notion = get_notion_client(token)
     if not notion:
         raise ValueError("Notion client not configured.")
 
-    # Rate-limited search call
-    resp = await _notion_call_with_retry(
-        lambda: notion.search(
-            query="",
-            filter={"value": "page", "property": "object"},
-            sort={"direction": "descending", "timestamp": "last_edited_time"},
-            page_size=50
-        )
-    )
-
-    tree = []
-    for item in resp.get("results", []):
-        # Extract title (sometimes nested weirdly)
-        title = "Untitled"
-        if "properties" in item:
-            for prop_name, prop_data in item["properties"].items():
-                if prop_data.get("type") == "title":
-                    title_arr = prop_data.get("title", [])
-                    if title_arr:
-                        title = "".join([t.get("plain_text", "") for t in title_arr])
-                    break
-
-        tree.append({
-            "id": item["id"],
-            "title": title,
-            "url": item.get("url", ""),
-            "last_edited": item.get("last_edited_time", "")
-        })
-
-    return tree
+    pages = await _get_page_index(notion, token, refresh=refresh)
+    ordered = _order_tree(pages, (query or "").strip())
+
+    start = int(cursor) if cursor and str(cursor).isdigit() else 0
+    limit = max(1, min(int(limit or TREE_PAGE_SIZE), TREE_LIMIT_MAX))
+    end = start + limit
+    return {
+        "pages": ordered[start:end],
+        "next_cursor": str(end) if end < len(ordered) else None,
+        "total": len(ordered),
+    }
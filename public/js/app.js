@@ -665,12 +665,25 @@ const App = (() => {
     }
 
     async function fetchModelsOnInit() {
+        // Fill the dropdown from the last known catalog, then reconcile with the server
+        let cached = null;
+        try {
+            cached = localStorage.getItem('storyforge_models');
+            if (cached) populateModelDropdown(JSON.parse(cached));
+        } catch (err) {
+            cached = null;
+        }
+
         try {
             const res = await fetch('/api/models');
             if (res.ok) {
                 const data = await res.json();
                 if (data.models && data.models.length > 0) {
-                    populateModelDropdown(data.models);
+                    const fresh = JSON.stringify(data.models);
+                    if (fresh !== cached) {
+                        populateModelDropdown(data.models);
+                        localStorage.setItem('storyforge_models', fresh);
+                    }
                 }
             }
         } catch (err) {
@@ -831,6 +844,7 @@ const App = (() => {
         const select = document.getElementById('model-select');
         if (!select || !models) return;
 
+        const previous = select.value;
         select.innerHTML = '';
 
         // Always add Gemini 2.0 Flash as default if it exists, otherwise first model
@@ -847,6 +861,9 @@ const App = (() => {
             }
             select.appendChild(option);
         });
+
+        // Keep the user's choice when the list is refreshed underneath them
+        if (previous && models.some(m => m.id === previous)) select.value = previous;
     }
 
     function updateKeyDisplay(masked) {
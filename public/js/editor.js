@@ -74,6 +74,9 @@ const Editor = (() => {
             _textarea.value = scratchpad;
         }
 
+        // Follow TTS playback
+        document.addEventListener('tts-position', followReading);
+
         // Save before page unload
         window.addEventListener('beforeunload', () => {
             if (_dirty) saveToFile();
@@ -95,14 +98,19 @@ const Editor = (() => {
             _fileNameEl.value = 'Untitled';
         }
         _dirty = false;
+        clearReadingHighlight();
         updateFileNameWidth();
         updateWordCount();
         setStatus('Ready');
+
+        // First document opened: get the TTS model loading before Read is pressed
+        if (file && typeof Speech !== 'undefined') Speech.warmUp();
     }
 
     function onInput() {
         updateWordCount();
         markDirty();
+        clearReadingHighlight();
     }
 
     function onKeyDown(e) {
@@ -309,12 +317,96 @@ const Editor = (() => {
 
         _textarea.focus();
         _textarea.setSelectionRange(targetPos, targetPos + selectionLength);
+        scrollToLine(lineNumber);
+    }
 
+    function scrollToLine(lineNumber) {
         const lineHeight = 1.8 * 16;
         const scrollFactor = 0.5;
         const visibleLines = _textarea.clientHeight / lineHeight;
         _textarea.scrollTop = Math.max(0, (lineNumber - (visibleLines * scrollFactor)) * lineHeight);
     }
 
+    // ─── Read-along ──────────────────────────────────────────────────────────────
+
+    /**
+     * Highlight the sentence TTS is currently reading (offsets come from the
+     * server's timing track). Drawn on a mirror behind the textarea, so the
+     * selection and focus are never touched. Skipped while there are unsaved
+     * edits, since the offsets then no longer match the text.
+     */
+    function followReading(e) {
+        const { path, sentence } = e.detail || {};
+        const currentPath = _currentFile ? _currentFile.path : '__scratchpad__.md';
+        if (!path || path !== currentPath || !sentence || _dirty) {
+            clearReadingHighlight();
+            return;
+        }
+
+        const text = _textarea.value;
+        const start = _toUtf16(text, sentence[0]);
+        const end = _toUtf16(text, sentence[1]);
+        if (end > text.length) return;
+
+        const backdrop = _readingBackdrop();
+        const mark = document.createElement('mark');
+        mark.textContent = text.slice(start, end);
+        backdrop.replaceChildren(document.createTextNode(text.slice(0, start)), mark,
+            document.createTextNode(text.slice(end) + '\n'));
+        _textarea.classList.add('reading');
+
+        _textarea.scrollTop = Math.max(0, mark.offsetTop - _textarea.clientHeight / 2);
+        backdrop.scrollTop = _textarea.scrollTop;
+    }
+
+    function clearReadingHighlight() {
+        if (!_backdrop || !_textarea.classList.contains('reading')) return;
+        _textarea.classList.remove('reading');
+        _backdrop.replaceChildren();
+    }
+
+    // Mirror element with the textarea's box and font, placed behind it
+    let _backdrop = null;
+    function _readingBackdrop() {
+        if (!_backdrop) {
+            _backdrop = document.createElement('div');
+            _backdrop.className = 'reading-backdrop';
+            _textarea.parentNode.insertBefore(_backdrop, _textarea);
+            _textarea.addEventListener('scroll', () => { _backdrop.scrollTop = _textarea.scrollTop; });
+        }
+        const style = getComputedStyle(_textarea);
+        for (const prop of ['fontFamily', 'fontSize', 'lineHeight', 'letterSpacing', 'padding']) {
+            _backdrop.style[prop] = style[prop];
+        }
+        _backdrop.style.top = _textarea.offsetTop + 'px';
+        _backdrop.style.left = _textarea.offsetLeft + 'px';
+        _backdrop.style.width = _textarea.clientWidth + 'px';   // excludes the scrollbar
+        _backdrop.style.height = _textarea.clientHeight + 'px';
+        return _backdrop;
+    }
+
+    // Timing offsets count code points (Python); the textarea counts UTF-16 units
+    let _astralText = null;
+    let _astralAt = [];     // code-point indices of characters outside the BMP
+    function _toUtf16(text, cp) {
+        if (text !== _astralText) {
+            _astralText = text;
+            _astralAt = [];
+            if (/[\uD800-\uDBFF]/.test(text)) {
+                let i = 0;
+                for (const ch of text) {
+                    if (ch.length === 2) _astralAt.push(i);
+                    i++;
+                }
+            }
+        }
+        let lo = 0, hi = _astralAt.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (_astralAt[mid] < cp) lo = mid + 1; else hi = mid;
+        }
+        return cp + lo;
+    }
+
     return { init, loadFile, getContent, setContent, forceSave, setFontSize, setAutosaveInterval, getCurrentFile, jumpToLine };
 })();
@@ -354,11 +354,11 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             const res = await fetch('/api/notion/tree', {
                 method: 'POST', headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ token: t })
+                body: JSON.stringify({ token: t, limit: 1, refresh: true })
             });
             const data = await res.json();
             if (data.error) throw new Error(data.error);
-            showTokenStatus(`✔ Connected — ${data.length} page(s) accessible.`, true);
+            showTokenStatus(`✔ Connected — ${data.total} page(s) accessible.`, true);
         } catch (e) {
             showTokenStatus(`✖ ${e.message}`, false);
         } finally {
@@ -398,15 +398,20 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function renderPages(pages) {
-        sidebarPageList.innerHTML = '';
-        if (!pages.length) {
+    let nextCursor = null;
+    let currentQuery = '';
+
+    function renderPages(pages, append = false) {
+        if (!append) sidebarPageList.innerHTML = '';
+        sidebarPageList.querySelector('.notion-load-more')?.remove();
+        if (!append && !pages.length) {
             sidebarPageList.innerHTML = '<div style="text-align:center;color:var(--text-muted);padding:12px;font-size:0.8rem;">No pages found.</div>';
             return;
         }
         pages.forEach(p => {
             const row = document.createElement('label');
             row.style.cssText = 'display:flex;align-items:center;gap:7px;padding:5px 6px;border-radius:4px;cursor:pointer;font-size:0.8rem;color:var(--text-primary);transition:background .15s;';
+            row.style.paddingLeft = `${6 + (p.depth || 0) * 14}px`;
             row.addEventListener('pointerenter', () => row.style.background = 'var(--bg-hover)');
             row.addEventListener('pointerleave', () => row.style.background = '');
             const cb = document.createElement('input');
@@ -419,29 +424,44 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             const txt = document.createElement('span');
             txt.textContent = p.title;
+            txt.title = p.path?.length ? `${p.path.join(' / ')} / ${p.title}` : p.title;
             txt.style.cssText = 'overflow:hidden;text-overflow:ellipsis;white-space:nowrap;';
             row.appendChild(cb); row.appendChild(txt);
             sidebarPageList.appendChild(row);
         });
+        if (nextCursor) {
+            const more = document.createElement('button');
+            more.className = 'btn btn-secondary notion-load-more';
+            more.textContent = 'Load more…';
+            more.style.cssText = 'margin:6px auto;display:block;font-size:0.75rem;';
+            more.addEventListener('click', () => fetchAndRenderPages({ append: true }));
+            sidebarPageList.appendChild(more);
+        }
         updateActionBar();
     }
 
-    async function fetchAndRenderPages() {
+    async function fetchAndRenderPages({ append = false, refresh = false } = {}) {
         const token = getToken();
         if (!token) {
             sidebarPageList.innerHTML = '<div style="text-align:center;color:var(--text-muted);padding:12px;font-size:0.8rem;">Configure token via 🔗 Notion first.</div>';
             return;
         }
-        sidebarPageList.innerHTML = '<div style="text-align:center;color:var(--text-muted);padding:12px;font-size:0.8rem;">Fetching…</div>';
+        if (!append) sidebarPageList.innerHTML = '<div style="text-align:center;color:var(--text-muted);padding:12px;font-size:0.8rem;">Fetching…</div>';
+        const query = currentQuery;
         try {
             const res = await fetch('/api/notion/tree', {
                 method: 'POST', headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ token })
+                body: JSON.stringify({ token, query, refresh, cursor: append ? nextCursor : null })
             });
             const data = await res.json();
             if (data.error) throw new Error(data.error);
-            allPages = data;
-            renderPages(allPages);
+            if (query !== currentQuery) return; // a newer search superseded this one
+            // Keep every page seen so far: pulls look titles up by id
+            for (const p of data.pages) {
+                if (!allPages.some(x => x.id === p.id)) allPages.push(p);
+            }
+            nextCursor = data.next_cursor;
+            renderPages(data.pages, append);
         } catch (e) {
             sidebarPageList.innerHTML = `<div style="color:var(--error);padding:8px;font-size:0.8rem;">Error: ${e.message}</div>`;
         }
@@ -463,9 +483,13 @@ document.addEventListener('DOMContentLoaded', () => {
         browserPanel.style.display = 'none';
         updateUnifiedVisibility();
     });
+    let _searchTimer = null;
     searchInput?.addEventListener('input', () => {
-        const q = searchInput.value.toLowerCase();
-        renderPages(allPages.filter(p => p.title.toLowerCase().includes(q)));
+        clearTimeout(_searchTimer);
+        _searchTimer = setTimeout(() => {
+            currentQuery = searchInput.value.trim();
+            fetchAndRenderPages();
+        }, 200);
     });
 
     // --------------------------------------------------------
@@ -845,4 +869,97 @@ document.addEventListener('DOMContentLoaded', () => {
             toast(`Push error: ${e.message}`, 'error');
         } finally { btn.innerHTML = '⬆️ Push Selected'; btn.disabled = selectedIds.size > 1; }
     });
+
+    // --------------------------------------------------------
+    // PROJECT SYNC: every linked file, one background job on the server
+    // (pull / push / skip per file; survives reloads and restarts)
+    // --------------------------------------------------------
+    const SYNC_RESULT_LABELS = {
+        pulled: ['⬇️ pulled', 'success'],
+        pushed: ['⬆️ pushed', 'success'],
+        skipped: ['✔ up to date', 'info'],
+        conflict: ['⚠ changed on both sides — resolve manually', 'error'],
+        error: ['✖ failed', 'error'],
+    };
+
+    function syncProgress(info) {
+        if (!progressBar || !progressText) return;
+        const pct = info.total ? Math.round(info.done / info.total * 100) : 100;
+        progressBar.classList.toggle('complete', info.done >= info.total);
+        progressBar.style.width = pct + '%';
+        progressText.textContent = `Sync: ${info.done}/${info.total} files`;
+        if (progressETA) progressETA.textContent = '';
+    }
+
+    async function syncProject() {
+        const token = getToken();
+        if (!token) { toast('Set Notion token via 🔗 Notion button.', 'warning'); return; }
+        const btn = document.getElementById('notion-sync-project-btn');
+        btn.disabled = true;
+        clearLog();
+        logLine(`Syncing project "${getCurrentProject()}"…`);
+        showProgress();
+
+        try {
+            const response = await fetch('/api/notion/sync', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ token, project_name: getCurrentProject() }),
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '', currentEvent = '', currentData = '', finished = false;
+
+            const handle = (event, info) => {
+                if (event === 'progress') {
+                    if (info.status === 'queued') {
+                        logLine(`${info.total - info.done} file(s) to check${info.resumed ? ' (resumed)' : ''}`);
+                    } else if (info.status === 'item') {
+                        const [label, type] = SYNC_RESULT_LABELS[info.result] || [info.result, 'info'];
+                        logLine(`${info.file}: ${label}${info.error ? ` — ${info.error}` : ''}`, type);
+                    }
+                    if (info.total !== undefined) syncProgress(info);
+                } else if (event === 'complete') {
+                    finished = true;
+                    syncProgress(info);
+                    const c = info.counts || {};
+                    logLine(`Sync complete: ${c.pulled || 0} pulled, ${c.pushed || 0} pushed, ` +
+                        `${c.skipped || 0} unchanged, ${c.conflict || 0} conflicts, ${c.error || 0} errors`, 'success');
+                    toast('✔ Project sync complete', 'success');
+                    loadMapping();
+                } else if (event === 'error') {
+                    finished = true;
+                    throw new Error(info.error || 'Sync failed');
+                }
+            };
+
+            while (!finished) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                for (const rawLine of lines) {
+                    const line = rawLine.replace(/\r$/, '');
+                    if (line.startsWith('event:')) currentEvent = line.slice(6).trim();
+                    else if (line.startsWith('data:')) currentData = line.slice(5).trim();
+                    else if (line === '' && currentData) {
+                        handle(currentEvent, JSON.parse(currentData));
+                        currentEvent = ''; currentData = '';
+                    }
+                }
+            }
+            setTimeout(hideProgress, 2500);
+        } catch (e) {
+            hideProgress();
+            logLine(`Sync error: ${e.message}`, 'error');
+            toast(`Sync error: ${e.message}`, 'error');
+        } finally {
+            btn.disabled = false;
+        }
+    }
+
+    document.getElementById('notion-sync-project-btn')?.addEventListener('click', syncProject);
 });
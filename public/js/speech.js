@@ -7,10 +7,15 @@ const Speech = (() => {
     let _isLoading = false;
     let _isPaused = false;
     let _abortController = null;
-    let _audioQueue = [];       // Queue of audio blobs for streaming
+    let _audioQueue = [];       // Queue of { blob, timing } for streaming
     let _isStreamPlaying = false;
     let _streamStartTime = 0;
 
+    // Read-along timing (entries are [startSample, endSample, srcStart, srcEnd])
+    let _sampleRate = 24000;
+    let _timing = null;         // Track for the current audio element
+    let _lastPosition = '';
+
     // Cache variables (Path-aware map)
     let _pathMap = JSON.parse(localStorage.getItem('storyforge_tts_path_map') || '{}');
     let _cachedUrl = null;
@@ -32,6 +37,10 @@ const Speech = (() => {
     let _isStreamAborted = false;
     let _confirmDropdown = null;
 
+    // Model warm-up (once per session, triggered by the editor)
+    let _warmupRequested = false;
+    let _modelState = 'cold';
+
     /**
      * Initialize UI listeners
      */
@@ -118,8 +127,54 @@ const Speech = (() => {
         return `${mins}:${secs.toString().padStart(2, '0')}`;
     }
 
+    function _findEntry(entries, sample) {
+        let lo = 0, hi = (entries || []).length - 1;
+        while (lo <= hi) {
+            const mid = (lo + hi) >> 1;
+            const e = entries[mid];
+            if (sample < e[0]) hi = mid - 1;
+            else if (sample >= e[1]) lo = mid + 1;
+            else return e;
+        }
+        return null;
+    }
+
+    /**
+     * Tell listeners (the editor) which part of the document is being read.
+     * Source offsets index into the text that was sent for synthesis.
+     */
+    function _followReading() {
+        if (!_audio || !_timing || !_activePath) return;
+        const sample = Math.floor(_audio.currentTime * _sampleRate);
+        const sentence = _findEntry(_timing.sentences, sample);
+        const word = _findEntry(_timing.words, sample);
+        const key = `${sentence && sentence[2]}|${word && word[2]}`;
+        if (key === _lastPosition) return;
+        _lastPosition = key;
+        document.dispatchEvent(new CustomEvent('tts-position', {
+            detail: {
+                path: _activePath,
+                sentence: sentence ? [sentence[2], sentence[3]] : null,
+                word: word ? [word[2], word[3]] : null,
+            }
+        }));
+    }
+
+    async function _loadTiming(path) {
+        try {
+            const res = await fetch(`/api/tts/timing?path=${encodeURIComponent(path)}`);
+            if (!res.ok) return null;
+            const timing = await res.json();
+            if (timing.sample_rate) _sampleRate = timing.sample_rate;
+            return timing;
+        } catch (err) {
+            return null;
+        }
+    }
+
     function _updateProgress() {
         if (!_audio) return;
+        _followReading();
         if (_isStreamPlaying) {
             const elapsed = (Date.now() - _streamStartTime) / 1000;
             _currentTimeEl.textContent = _formatTime(elapsed);
@@ -138,13 +193,14 @@ const Speech = (() => {
         }
     }
 
+    // Same single-pass order as the server's clean_text_for_tts:
+    // images dropped, links -> text, HTML tags and markdown punctuation dropped.
+    const _CLEAN_RE = /!\[[^\]]*\]\([^)]+\)|\[([^\]]+)\]\([^)]+\)|<\/?[A-Za-z!][^>]*>|[#*_~`>|-]+/g;
+
     function _cleanText(text) {
         if (!text) return "";
         return text
-            .replace(/\[([^\]]+)\]\([^\)]+\)/g, '$1')
-            .replace(/!\[[^\]]*\]\([^\)]+\)/g, '')
-            .replace(/[#*_~`>|-]/g, '')
-            .replace(/<[^>]+>/g, '')
+            .replace(_CLEAN_RE, (match, label) => label !== undefined ? label : '')
             .replace(/\s+/g, ' ')
             .trim();
     }
@@ -178,6 +234,9 @@ const Speech = (() => {
         _isModifiedWarningShown = false;
         _audioQueue = [];
         _activePath = null;
+        _timing = null;
+        _lastPosition = '';
+        document.dispatchEvent(new CustomEvent('tts-position', { detail: { path: null } }));
     }
 
     function setLoading(btnEl) {
@@ -202,6 +261,32 @@ const Speech = (() => {
         return true;
     }
 
+    /**
+     * Pick up audio the server rendered on its own (background pre-rendering),
+     * but only if the server confirms it was rendered from this exact text.
+     * Voice and speed are taken from the server's metadata, so a render in
+     * another voice still shows up as changed.
+     */
+    async function _adoptServerCache(text, path) {
+        const cleanText = _cleanText(text);
+        if (!path || !cleanText) return;
+        try {
+            const res = await fetch(`/api/tts/cache?path=${encodeURIComponent(path)}`);
+            if (!res.ok) return;
+            const info = await res.json();
+            if (!info.exists) return;
+            const voice = info.voice || _currentVoice;
+            if (!await _isCacheFresh(text, path, voice, info.speed || 1.0)) return;
+            _pathMap[path] = {
+                hash: _calculateHash(cleanText, voice, _currentSpeed),
+                voice,
+                speed: _currentSpeed,
+                mode: cleanText.length > 500 ? 'stream' : 'full'
+            };
+            localStorage.setItem('storyforge_tts_path_map', JSON.stringify(_pathMap));
+        } catch (err) { }
+    }
+
     function _calculateHash(text, voice, speed) {
         // Simple hash for client-side comparison
         let hash = 0;
@@ -247,6 +332,7 @@ const Speech = (() => {
 
         // 2. Starting playback for a new button/file
         const cleanText = _cleanText(text);
+        if (!isAudioAvailable(text, path)) await _adoptServerCache(text, path);
         if (!isAudioAvailable(text, path)) {
             if (typeof App !== 'undefined') {
                 App.toast('No audio available for this content. Please "Generate Audio" first.', 'info');
@@ -275,10 +361,11 @@ const Speech = (() => {
 
         // Fetch the file as a Blob or Stream
         const mode = (cached && cached.mode) || (cleanText.length > 500 ? 'stream' : 'full');
+        // Raw text is sent (the server cleans it) so timing offsets match the document
         if (mode === 'stream') {
-            await _playStreamingInternal(cleanText, _activeBtn, path, false);
+            await _playStreamingInternal(text, _activeBtn, path, false);
         } else {
-            await _playFullInternal(cleanText, _activeBtn, path, false);
+            await _playFullInternal(text, _activeBtn, path, false);
         }
     }
 
@@ -319,7 +406,7 @@ const Speech = (() => {
         try {
             // ALWAYS force generation when explicitly requested via Mic button
             const body = {
-                text: cleanText,
+                text,
                 path: path,
                 force: true,
                 voice: _currentVoice,
@@ -352,6 +439,10 @@ const Speech = (() => {
     }
 
     async function _playFullInternal(text, btnEl, path, force) {
+        // Cached audio is served with byte-range support, so the audio element
+        // can start, seek and resume without downloading the whole file.
+        if (path && !force && await _isCacheFresh(text, path) && await _playCachedInternal(btnEl, path)) return;
+
         _abortController = new AbortController();
         try {
             const body = {
@@ -370,6 +461,7 @@ const Speech = (() => {
             if (!res.ok) throw new Error('Failed to load audio');
 
             const blob = await res.blob();
+            if (path) _loadTiming(path).then(timing => { if (_activePath === path) _timing = timing; });
             _cachedUrl = URL.createObjectURL(blob);
             _audio = new Audio(_cachedUrl);
             _audio.playbackRate = _currentSpeed;
@@ -389,6 +481,50 @@ const Speech = (() => {
         }
     }
 
+    // /api/tts/audio serves whatever is cached, so check it still matches
+    // the document (an edited chapter would play stale audio and timing)
+    async function _isCacheFresh(text, path, voice = _currentVoice, speed = 1.0) {
+        try {
+            const res = await fetch('/api/tts/fresh', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ text, path, voice, speed })
+            });
+            return res.ok && (await res.json()).fresh === true;
+        } catch (err) {
+            return false;
+        }
+    }
+
+    async function _playCachedInternal(btnEl, path) {
+        const url = `/api/tts/audio?path=${encodeURIComponent(path)}`;
+        try {
+            _audio = new Audio(url);
+            _audio.preload = 'auto';
+            _audio.playbackRate = _currentSpeed;
+            _controlBar.classList.add('active');
+            if (_progressBar) _progressBar.disabled = false;
+
+            _audio.onplay = () => {
+                btnEl.textContent = '⏸';
+                btnEl.classList.remove('pulse-animation');
+                _isLoading = false;
+                _updateProgress();
+            };
+            _audio.onended = () => stop(false);
+            _loadTiming(path).then(timing => { if (_activePath === path) _timing = timing; });
+            await _audio.play();
+            return true;
+        } catch (err) {
+            // No cached file (404) or unsupported source: fall back to /api/tts
+            if (_audio) {
+                _audio.pause();
+                _audio = null;
+            }
+            return false;
+        }
+    }
+
     async function _playStreamingInternal(text, btnEl, path, force) {
         _abortController = new AbortController();
         _isStreamPlaying = true;
@@ -419,8 +555,11 @@ const Speech = (() => {
                 signal: _abortController.signal,
             });
             if (!res.ok) throw new Error('Streaming failed');
+            _sampleRate = parseInt(res.headers.get('X-TTS-Sample-Rate'), 10) || _sampleRate;
 
             const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let pendingTiming = null;
             let buffer = new Uint8Array(0);
             _playNextInQueue(btnEl);
 
@@ -437,9 +576,15 @@ const Speech = (() => {
                 while (buffer.length >= 4) {
                     const chunkLen = new DataView(buffer.buffer, buffer.byteOffset, 4).getUint32(0);
                     if (buffer.length < 4 + chunkLen) break;
-                    const wavData = buffer.slice(4, 4 + chunkLen);
+                    const payload = buffer.slice(4, 4 + chunkLen);
                     buffer = buffer.slice(4 + chunkLen);
-                    _audioQueue.push(new Blob([wavData], { type: 'audio/wav' }));
+                    if (payload[0] === 0x7B) {
+                        // '{' — timing frame for the WAV frame that follows
+                        try { pendingTiming = JSON.parse(decoder.decode(payload)); } catch (e) { pendingTiming = null; }
+                        continue;
+                    }
+                    _audioQueue.push({ blob: new Blob([payload], { type: 'audio/wav' }), timing: pendingTiming });
+                    pendingTiming = null;
                 }
             }
         } catch (err) {
@@ -455,9 +600,10 @@ const Speech = (() => {
             return;
         }
 
-        const blob = _audioQueue.shift();
-        const url = URL.createObjectURL(blob);
+        const item = _audioQueue.shift();
+        const url = URL.createObjectURL(item.blob);
         _audio = new Audio(url);
+        _timing = item.timing;
         _audio.playbackRate = _currentSpeed;
         _audio.onplay = () => {
             btnEl.textContent = '⏸';
@@ -542,8 +688,40 @@ const Speech = (() => {
         return [];
     }
 
+    /**
+     * Ask the server to load the TTS model (it honours TTS_WARMUP) and poll
+     * until it is ready, so the first Read press doesn't wait on the load.
+     */
+    async function warmUp() {
+        if (_warmupRequested) return;
+        _warmupRequested = true;
+        try {
+            const res = await fetch('/api/tts/warmup', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ voice: _currentVoice || null })
+            });
+            if (!res.ok) return;
+            let status = await res.json();
+            while (status.state === 'loading') {
+                _setModelState(status.state);
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const poll = await fetch('/api/tts/status');
+                if (!poll.ok) return;
+                status = await poll.json();
+            }
+            _setModelState(status.state);
+        } catch (err) { }
+    }
+
+    function _setModelState(state) {
+        _modelState = state;
+        document.dispatchEvent(new CustomEvent('tts-status', { detail: { state } }));
+    }
+
     return {
-        play, generate, stop, setVoice, setSpeed, loadVoices,
-        getVoice: () => _currentVoice, getSpeed: () => _currentSpeed, getVoices: () => _voices
+        play, generate, stop, setVoice, setSpeed, loadVoices, warmUp,
+        getVoice: () => _currentVoice, getSpeed: () => _currentSpeed, getVoices: () => _voices,
+        getModelState: () => _modelState
     };
 })();
@@ -5,58 +5,128 @@ API key persistence, prompt editing, and hourly backups.
 """
 
 import os
-import io
 import json
 import asyncio
+import importlib
+import importlib.util
+import re
+import gzip
+import zipfile
 import shutil
 import hashlib
-from datetime import datetime
+import mimetypes
+import time
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sse_starlette.sse import EventSourceResponse
-from google import genai
-from google.genai import types
-import openai
 from pydantic import BaseModel
 from typing import List, Optional
-try:
-    import web_automation
-    HAS_WEB_AUTO = True
-except ImportError:
-    HAS_WEB_AUTO = False
-
-import notion_sync
 
 import tempfile
 import os
 
-try:
-    import tts_kokoro
-    HAS_TTS = True
-except ImportError:
-    HAS_TTS = False
 
 ENV_FILE = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=ENV_FILE)
 
+# ---------------------------------------------------------------------------
+# Heavy provider / integration modules — imported on first use so the UI is
+# served as soon as FastAPI is up. NOVELLICA_EAGER_IMPORTS=1 imports them here.
+# ---------------------------------------------------------------------------
+EAGER_IMPORTS = os.getenv("NOVELLICA_EAGER_IMPORTS", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class _LazyModule:
+    """Stand-in for a module that imports the real one on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            print(f"[Startup] Imported {self._name} on first use ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+def _lazy_import(name: str):
+    return importlib.import_module(name) if EAGER_IMPORTS else _LazyModule(name)
+
+
+def _optional_import(name: str, *requires: str):
+    """Like _lazy_import, but None when `name` or a package in `requires` is missing."""
+    if EAGER_IMPORTS:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            return None
+    for package in (name, *requires):
+        if importlib.util.find_spec(package) is None:
+            return None
+    return _LazyModule(name)
+
+
+def _is_imported(module) -> bool:
+    return module is not None and (not isinstance(module, _LazyModule) or module._module is not None)
+
+
+genai = _lazy_import("google.genai")
+types = _lazy_import("google.genai.types")
+openai = _lazy_import("openai")
+notion_sync = _lazy_import("notion_sync")
+
+web_automation = _optional_import("web_automation", "playwright")
+HAS_WEB_AUTO = web_automation is not None
+
+tts_kokoro = _optional_import("tts_kokoro", "numpy")
+HAS_TTS = tts_kokoro is not None
+
 app = FastAPI(title="Novellica")
 
 # Prevent browser caching of JS/CSS during development
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 
-class NoCacheMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        path = request.url.path
-        if path.endswith(('.js', '.css', '.html')):
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        return response
+class NoCacheMiddleware:
+    """
+    Pure ASGI middleware: adds no-cache headers to .js/.css/.html responses
+    and passes everything else (SSE, TTS streams, audio) through untouched.
+    Project files under /projects/ keep the validators serve_project_file sets.
+    """
+    NO_CACHE_EXTS = ('.js', '.css', '.html')
+    SKIP_PREFIXES = ('/projects/',)
+    NO_CACHE_HEADERS = [
+        (b"cache-control", b"no-cache, no-store, must-revalidate"),
+        (b"pragma", b"no-cache"),
+        (b"expires", b"0"),
+    ]
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not scope["path"].endswith(self.NO_CACHE_EXTS)
+                or scope["path"].startswith(self.SKIP_PREFIXES)):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_no_cache(message):
+            if message["type"] == "http.response.start":
+                replaced = {name for name, _ in self.NO_CACHE_HEADERS}
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() not in replaced]
+                message = {**message, "headers": headers + self.NO_CACHE_HEADERS}
+            await send(message)
+
+        await self.app(scope, receive, send_no_cache)
 
 app.add_middleware(NoCacheMiddleware)
 
@@ -67,22 +137,64 @@ _client = None
 _client_key = ""
 
 
-def _read_env_var(var_name: str) -> str:
-    """Read a variable directly from the .env file (not cached os.environ)."""
-    if not ENV_FILE.exists():
-        return ""
-    prefix = f"{var_name}="
-    for line in ENV_FILE.read_text(encoding="utf-8").splitlines():
+# ---------------------------------------------------------------------------
+# Config files (.env, keys.json) — parsed once, reloaded when the file changes
+# ---------------------------------------------------------------------------
+CONFIG_STAT_INTERVAL = 1.0      # seconds between mtime checks for outside edits
+
+_config_cache: dict[Path, dict] = {}   # path -> {"sig", "checked", "value"}
+
+
+def _file_signature(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached_config(path: Path, parse):
+    """Parsed contents of a config file; re-parsed only if its mtime/size changed."""
+    entry = _config_cache.get(path)
+    now = time.monotonic()
+    if entry and now - entry["checked"] < CONFIG_STAT_INTERVAL:
+        return entry["value"]
+    sig = _file_signature(path)
+    if not entry or sig != entry["sig"]:
+        text = path.read_text(encoding="utf-8") if sig else None
+        entry = {"sig": sig, "value": parse(text)}
+        _config_cache[path] = entry
+    entry["checked"] = now
+    return entry["value"]
+
+
+def _write_config(path: Path, text: str, value):
+    """Atomically replace a config file and prime the cache with its new contents."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+    _config_cache[path] = {"sig": _file_signature(path), "checked": time.monotonic(), "value": value}
+
+
+def _parse_env(text: str | None) -> dict[str, str]:
+    values = {}
+    for line in (text or "").splitlines():
         stripped = line.strip()
-        if stripped.startswith(prefix):
-            return stripped.split("=", 1)[1].strip()
-    return ""
+        if "=" in stripped:
+            name, value = stripped.split("=", 1)
+            values.setdefault(name, value.strip())
+    return values
+
+
+def _read_env_var(var_name: str) -> str:
+    """Read a variable from the .env file (cached; picks up outside edits within a second)."""
+    return _cached_config(ENV_FILE, _parse_env).get(var_name, "")
 
 def _read_env_key() -> str:
     return _read_env_var("GEMINI_API_KEY")
 
 
-def get_client(api_key: str | None = None) -> genai.Client:
+def get_client(api_key: str | None = None) -> "genai.Client":
     global _client, _client_key
     key = api_key or _read_env_key() or os.getenv("GEMINI_API_KEY", "")
     if not key:
@@ -96,7 +208,7 @@ def get_client(api_key: str | None = None) -> genai.Client:
 _openai_client = None
 _openai_client_key = ""
 
-def get_openai_client(api_key: str | None = None, base_url: str | None = None) -> openai.Client:
+def get_openai_client(api_key: str | None = None, base_url: str | None = None) -> "openai.Client":
     global _openai_client, _openai_client_key
     key = api_key or _read_env_key() or os.getenv("GEMINI_API_KEY", "")
     url = base_url or _read_env_var("API_BASE_URL") or os.getenv("API_BASE_URL", "")
@@ -119,22 +231,30 @@ PROMPTS_DIR.mkdir(parents=True, exist_ok=True)
 BACKUP_DIR = PROMPTS_DIR / "_backups"
 BACKUP_DIR.mkdir(exist_ok=True)
 
-# Track file hashes for change detection
-_last_prompt_hashes: dict[str, str] = {}
+# Parsed prompts, invalidated by file mtime/size: slug -> {mtime, size, digest, prompt}
+_prompt_cache: dict[str, dict] = {}
+_prompt_slugs: list[str] = []
+_prompt_dir_mtime = None
+
+
+def _prompt_digest(text: str) -> str:
+    """Stable content digest (unlike hash(), the same across restarts)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
 def _prompt_hash(path: Path) -> str:
-    """Simple hash of file contents for change detection."""
+    """Content digest of a prompt file for change detection."""
+    entry = _cached_prompt(path.stem) if path.parent == PROMPTS_DIR else None
+    if entry:
+        return entry["digest"]
     try:
-        return str(hash(path.read_text(encoding="utf-8")))
+        return _prompt_digest(path.read_text(encoding="utf-8"))
     except Exception:
         return ""
 
 
-def _parse_prompt_file(f: Path) -> dict:
-    """Parse a single .md prompt file into slug/name/description/body."""
-    slug = f.stem
-    text = f.read_text(encoding="utf-8")
+def _parse_prompt_text(slug: str, text: str) -> dict:
+    """Parse prompt file text into slug/name/description/body."""
     lines = text.strip().splitlines()
     name = lines[0].lstrip("# ").strip() if lines else slug
     description = ""
@@ -151,11 +271,54 @@ def _parse_prompt_file(f: Path) -> dict:
     }
 
 
+def _parse_prompt_file(f: Path) -> dict:
+    """Parse a single .md prompt file into slug/name/description/body."""
+    return _parse_prompt_text(f.stem, f.read_text(encoding="utf-8"))
+
+
+def _cached_prompt(slug: str) -> dict | None:
+    """Cache entry for one prompt, re-parsed only when its mtime or size changed."""
+    f = PROMPTS_DIR / f"{slug}.md"
+    try:
+        st = f.stat()
+    except OSError:
+        _prompt_cache.pop(slug, None)
+        return None
+    entry = _prompt_cache.get(slug)
+    if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+        return entry
+    text = f.read_text(encoding="utf-8")
+    entry = {
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+        "digest": _prompt_digest(text),
+        "prompt": _parse_prompt_text(slug, text),
+    }
+    _prompt_cache[slug] = entry
+    return entry
+
+
+def get_prompt_by_slug(slug: str) -> dict | None:
+    """Single prompt lookup without scanning the directory."""
+    entry = _cached_prompt(slug)
+    return entry["prompt"] if entry else None
+
+
 def load_prompts(force: bool = False) -> dict[str, dict]:
-    """Load all .md prompt files from the prompts directory."""
+    """Load all .md prompt files from the prompts directory (cached)."""
+    global _prompt_slugs, _prompt_dir_mtime
+    # The directory mtime changes when prompts are added, removed or renamed
+    dir_mtime = PROMPTS_DIR.stat().st_mtime_ns
+    if force or dir_mtime != _prompt_dir_mtime:
+        _prompt_slugs = sorted(f.stem for f in PROMPTS_DIR.glob("*.md"))
+        _prompt_dir_mtime = dir_mtime
+        if force:
+            _prompt_cache.clear()
     result = {}
-    for f in sorted(PROMPTS_DIR.glob("*.md")):
-        result[f.stem] = _parse_prompt_file(f)
+    for slug in _prompt_slugs:
+        entry = _cached_prompt(slug)
+        if entry:
+            result[slug] = entry["prompt"]
     return result
 
 
@@ -175,33 +338,162 @@ async def _backup_loop():
             print(f"Backup error: {exc}")
 
 
+# Content-addressed store: each distinct revision is one gzip object,
+# and each prompt has an index of its revisions (oldest first).
+BACKUP_OBJECTS_DIR = BACKUP_DIR / "objects"
+BACKUP_INDEX_DIR = BACKUP_DIR / "index"
+BACKUP_KEEP_HOURLY_HOURS = 24   # keep one revision per hour for this long
+BACKUP_KEEP_DAILY_DAYS = 30     # then one per day for this long, then drop
+_LEGACY_BACKUP_RE = re.compile(r"^(?P<slug>.+)_(?P<ts>\d{8}_\d{6})\.md$")
+
+
+def _backup_object_path(digest: str) -> Path:
+    return BACKUP_OBJECTS_DIR / digest[:2] / f"{digest}.md.gz"
+
+
+def _backup_index_path(slug: str) -> Path:
+    return BACKUP_INDEX_DIR / f"{slug}.json"
+
+
+def _load_backup_index(slug: str) -> list[dict]:
+    path = _backup_index_path(slug)
+    if not path.exists():
+        return []
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return []
+
+
+def _save_backup_index(slug: str, revisions: list[dict]):
+    path = _backup_index_path(slug)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(revisions, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_backup_object(digest: str) -> str:
+    return gzip.decompress(_backup_object_path(digest).read_bytes()).decode("utf-8")
+
+
+def _prune_backup_revisions(revisions: list[dict], now: datetime) -> list[dict]:
+    """Retention: newest revision, then one per hour for a day, one per day for a month."""
+    kept, buckets = [], set()
+    for rev in reversed(revisions):
+        when = datetime.strptime(rev["timestamp"], "%Y%m%d_%H%M%S")
+        age = now - when
+        if not kept:
+            bucket = "latest"
+        elif age <= timedelta(hours=BACKUP_KEEP_HOURLY_HOURS):
+            bucket = when.strftime("h%Y%m%d%H")
+        elif age <= timedelta(days=BACKUP_KEEP_DAILY_DAYS):
+            bucket = when.strftime("d%Y%m%d")
+        else:
+            continue
+        if bucket in buckets:
+            continue
+        buckets.add(bucket)
+        kept.append(rev)
+    kept.reverse()
+    return kept
+
+
+def _store_backup(slug: str, text: str, when: datetime | None = None) -> dict | None:
+    """Record a revision of a prompt unless it equals the latest one stored."""
+    digest = _prompt_digest(text)
+    revisions = _load_backup_index(slug)
+    if revisions and revisions[-1]["digest"] == digest:
+        return None
+
+    obj = _backup_object_path(digest)
+    if not obj.exists():
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = obj.with_suffix(".tmp")
+        tmp.write_bytes(gzip.compress(text.encode("utf-8"), mtime=0))
+        os.replace(tmp, obj)
+
+    when = when or datetime.now()
+    ts = when.strftime("%Y%m%d_%H%M%S")
+    rev = {"id": f"{ts}_{digest[:8]}", "timestamp": ts, "digest": digest, "size": len(text)}
+    revisions.append(rev)
+    revisions.sort(key=lambda r: r["timestamp"])
+    _save_backup_index(slug, _prune_backup_revisions(revisions, datetime.now()))
+    return rev
+
+
+def _gc_backup_objects():
+    """Delete objects no longer referenced by any prompt's index."""
+    referenced = set()
+    for index in BACKUP_INDEX_DIR.glob("*.json"):
+        referenced.update(r["digest"] for r in _load_backup_index(index.stem))
+    for obj in BACKUP_OBJECTS_DIR.glob("*/*.md.gz"):
+        if obj.name[:-len(".md.gz")] not in referenced:
+            obj.unlink()
+
+
+def _migrate_legacy_backups():
+    """Move old {slug}_{timestamp}.md copies into the store (oldest first)."""
+    legacy = []
+    for f in BACKUP_DIR.glob("*.md"):
+        m = _LEGACY_BACKUP_RE.match(f.name)
+        if m:
+            legacy.append((m.group("slug"), m.group("ts"), f))
+    if not legacy:
+        return
+    for slug, ts, f in sorted(legacy, key=lambda x: (x[0], x[1])):
+        _store_backup(slug, f.read_text(encoding="utf-8"), datetime.strptime(ts, "%Y%m%d_%H%M%S"))
+        f.unlink()
+    _gc_backup_objects()
+    print(f"  📦 Migrated {len(legacy)} prompt backup file(s) into the backup store")
+
+
 def _do_backup():
-    """Back up prompt files that changed since last check."""
-    global _last_prompt_hashes
-    now = datetime.now().strftime("%Y%m%d_%H%M%S")
-    for f in PROMPTS_DIR.glob("*.md"):
-        h = _prompt_hash(f)
-        if f.stem in _last_prompt_hashes and _last_prompt_hashes[f.stem] == h:
+    """Back up prompt files that changed since their latest stored revision."""
+    for slug in load_prompts():
+        entry = _cached_prompt(slug)
+        revisions = _load_backup_index(slug)
+        if not entry or (revisions and revisions[-1]["digest"] == entry["digest"]):
             continue
         # Changed — create backup
-        backup_file = BACKUP_DIR / f"{f.stem}_{now}.md"
-        shutil.copy2(f, backup_file)
-        _last_prompt_hashes[f.stem] = h
-        print(f"  📦 Backed up {f.name} → {backup_file.name}")
+        text = (PROMPTS_DIR / f"{slug}.md").read_text(encoding="utf-8")
+        rev = _store_backup(slug, text)
+        if rev:
+            print(f"  📦 Backed up {slug}.md → {rev['id']}")
+    _gc_backup_objects()
 
 
 @app.on_event("startup")
 async def startup():
-    global _backup_task
+    global _backup_task, _prerender_task
     # Sync existing .env key into keys.json so it appears in the key list
     env_key = _read_env_key()
     if env_key:
         _add_key_to_store(env_key)
-    # Initialize prompt hashes
-    for f in PROMPTS_DIR.glob("*.md"):
-        _last_prompt_hashes[f.stem] = _prompt_hash(f)
+    # Model catalogs from the previous run
+    _load_models_cache()
+    # Convert old one-file-per-backup copies into the backup store
+    try:
+        _migrate_legacy_backups()
+    except Exception as exc:
+        print(f"Backup migration error: {exc}")
     # Start hourly backup loop
     _backup_task = asyncio.create_task(_backup_loop())
+    # Background TTS renderer (idles unless TTS_PRERENDER is enabled)
+    if HAS_TTS:
+        _prerender_task = asyncio.create_task(_prerender_loop())
+    # Load the TTS model in the background if TTS_WARMUP=startup
+    if HAS_TTS and _tts_warmup_policy() == "startup":
+        _start_tts_warmup()
+    # Pick up Notion project syncs interrupted by a restart
+    asyncio.create_task(_resume_notion_syncs())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Release pooled Notion connections (nothing to do if Notion was never used)
+    if _is_imported(notion_sync):
+        await notion_sync.close_notion_clients()
 
 
 # ---------------------------------------------------------------------------
@@ -212,7 +504,7 @@ async def startup():
 @app.get("/api/key")
 async def get_key():
     """Return the stored API key (masked) and whether one exists.
-    Reads directly from .env file so edits are picked up immediately."""
+    Reads the cached .env, which picks up outside edits within a second."""
     key = _read_env_key()
     if not key:
         return {"exists": False, "masked": "", "key": ""}
@@ -244,8 +536,7 @@ async def save_key(request: Request):
     models = []
     if provider == "google":
         try:
-            client = get_client(key)
-            models = _list_models(client)
+            models = await get_cached_models("google", key)
         except Exception as exc:
             return JSONResponse({"error": f"Invalid API key or validation failed: {str(exc)}"}, status_code=400)
     else:
@@ -255,9 +546,11 @@ async def save_key(request: Request):
     os.environ["GEMINI_API_KEY"] = key
     os.environ["API_PROVIDER"] = provider
     os.environ["API_BASE_URL"] = base_url
-    _write_env("GEMINI_API_KEY", key)
-    _write_env("API_PROVIDER", provider)
-    _write_env("API_BASE_URL", base_url)
+    _write_env_vars({
+        "GEMINI_API_KEY": key,
+        "API_PROVIDER": provider,
+        "API_BASE_URL": base_url,
+    })
 
     _add_key_to_store(key, label=label, provider=provider, base_url=base_url, custom_models=custom_models)
 
@@ -271,10 +564,10 @@ async def list_models():
 
     if provider == "google":
         try:
-            client = get_client()
+            key = _read_env_key() or os.getenv("GEMINI_API_KEY", "")
+            models = await get_cached_models("google", key)
         except Exception as exc:
             return JSONResponse({"error": str(exc)}, status_code=400)
-        models = _list_models(client)
         return {"models": models}
     else:
         active_key = _read_env_key()
@@ -313,22 +606,91 @@ def _list_models(client) -> list[dict]:
     return models
 
 
+# Model catalogs per (provider, key), persisted so the dropdown fills instantly
+# after a restart; stale entries are served while a background refresh runs.
+MODELS_CACHE_FILE = Path(__file__).parent / ".models_cache.json"
+MODELS_CACHE_TTL = 6 * 3600     # seconds before a catalog is refreshed
+
+_models_cache: dict[str, dict] = {}    # "provider:key digest" -> {"models", "fetched"}
+_models_refreshing: set[str] = set()
+
+
+def _models_cache_key(provider: str, key: str) -> str:
+    return f"{provider}:{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _load_models_cache():
+    try:
+        data = json.loads(MODELS_CACHE_FILE.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            _models_cache.update(data)
+    except Exception:
+        pass
+
+
+def _save_models_cache():
+    tmp = MODELS_CACHE_FILE.with_name(MODELS_CACHE_FILE.name + ".tmp")
+    tmp.write_text(json.dumps(_models_cache), encoding="utf-8")
+    os.replace(tmp, MODELS_CACHE_FILE)
+
+
+async def _refresh_models(provider: str, key: str) -> list[dict]:
+    client = get_client(key)
+    models = await asyncio.to_thread(_list_models, client)
+    if models:  # _list_models returns [] on errors; keep the old catalog then
+        _models_cache[_models_cache_key(provider, key)] = {"models": models, "fetched": time.time()}
+        _save_models_cache()
+    return models
+
+
+async def get_cached_models(provider: str, key: str, force: bool = False) -> list[dict]:
+    """Model catalog for a key: cached, refreshed in the background once stale."""
+    if not key:
+        raise ValueError("No Gemini API key configured.")
+    cache_key = _models_cache_key(provider, key)
+    entry = _models_cache.get(cache_key)
+    if entry is None or force:
+        return await _refresh_models(provider, key)
+
+    if time.time() - entry["fetched"] > MODELS_CACHE_TTL and cache_key not in _models_refreshing:
+        _models_refreshing.add(cache_key)
+
+        async def _revalidate():
+            try:
+                await _refresh_models(provider, key)
+            except Exception as exc:
+                print(f"[models] Background refresh failed: {exc}")
+            finally:
+                _models_refreshing.discard(cache_key)
+
+        asyncio.create_task(_revalidate())
+    return entry["models"]
+
+
 def _write_env(var_name: str, value: str):
     """Write or update a variable in the .env file."""
+    _write_env_vars({var_name: value})
+
+
+def _write_env_vars(updates: dict[str, str]):
+    """Write or update several .env variables in one atomic write."""
     lines = []
-    found = False
     if ENV_FILE.exists():
         lines = ENV_FILE.read_text(encoding="utf-8").splitlines()
     new_lines = []
+    found = set()
     for line in lines:
-        if line.startswith(f"{var_name}="):
-            new_lines.append(f"{var_name}={value}")
-            found = True
+        name = next((n for n in updates if line.startswith(f"{n}=")), None)
+        if name is not None:
+            new_lines.append(f"{name}={updates[name]}")
+            found.add(name)
         else:
             new_lines.append(line)
-    if not found:
-        new_lines.append(f"{var_name}={value}")
-    ENV_FILE.write_text("\n".join(new_lines) + "\n", encoding="utf-8")
+    for name, value in updates.items():
+        if name not in found:
+            new_lines.append(f"{name}={value}")
+    text = "\n".join(new_lines) + "\n"
+    _write_config(ENV_FILE, text, _parse_env(text))
 
 
 # ---------------------------------------------------------------------------
@@ -337,20 +699,24 @@ def _write_env(var_name: str, value: str):
 KEYS_FILE = Path(__file__).parent / "keys.json"
 
 
-def _load_keys() -> list[dict]:
-    """Load all stored keys from keys.json."""
-    if not KEYS_FILE.exists():
+def _parse_keys(text: str | None) -> list[dict]:
+    if not text:
         return []
     try:
-        data = json.loads(KEYS_FILE.read_text(encoding="utf-8"))
+        data = json.loads(text)
         return data if isinstance(data, list) else []
     except Exception:
         return []
 
 
+def _load_keys() -> list[dict]:
+    """Load all stored keys from keys.json (cached; callers get their own copies)."""
+    return [dict(k) for k in _cached_config(KEYS_FILE, _parse_keys)]
+
+
 def _save_keys(keys: list[dict]):
     """Save keys list to keys.json."""
-    KEYS_FILE.write_text(json.dumps(keys, indent=2), encoding="utf-8")
+    _write_config(KEYS_FILE, json.dumps(keys, indent=2), [dict(k) for k in keys])
 
 
 def _add_key_to_store(key: str, label: str = "", provider: str = "openrouter", base_url: str = "", custom_models: Optional[list] = None):
@@ -425,9 +791,11 @@ async def select_key(request: Request):
     base_url = k_obj.get("baseUrl", "")
 
     # Set as active in .env
-    _write_env("GEMINI_API_KEY", key)
-    _write_env("API_PROVIDER", provider)
-    _write_env("API_BASE_URL", base_url)
+    _write_env_vars({
+        "GEMINI_API_KEY": key,
+        "API_PROVIDER": provider,
+        "API_BASE_URL": base_url,
+    })
     os.environ["GEMINI_API_KEY"] = key
     os.environ["API_PROVIDER"] = provider
     os.environ["API_BASE_URL"] = base_url
@@ -476,10 +844,10 @@ async def list_prompts_endpoint():
 @app.get("/api/prompts/{slug}")
 async def get_prompt(slug: str):
     """Return full body of a single prompt."""
-    prompts = load_prompts()
-    if slug not in prompts:
+    prompt = get_prompt_by_slug(slug)
+    if prompt is None:
         return JSONResponse({"error": "Prompt not found"}, status_code=404)
-    return prompts[slug]
+    return prompt
 
 
 @app.put("/api/prompts/{slug}")
@@ -498,36 +866,32 @@ async def update_prompt(slug: str, request: Request):
         content += f"> {description}\n"
     content += f"\n{new_body}\n"
 
-    # Backup before overwrite if content changed
+    # Backup before overwrite if content changed (identical revisions are deduplicated)
     if filepath.exists():
         old_hash = _prompt_hash(filepath)
-        new_hash = str(hash(content))
+        new_hash = _prompt_digest(content)
         if old_hash != new_hash:
-            now = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = BACKUP_DIR / f"{slug}_{now}.md"
-            shutil.copy2(filepath, backup_file)
+            _store_backup(slug, filepath.read_text(encoding="utf-8"))
 
     filepath.write_text(content, encoding="utf-8")
-    _last_prompt_hashes[slug] = _prompt_hash(filepath)
+    _prompt_cache.pop(slug, None)  # same-tick rewrites can keep mtime and size
 
     return {"status": "ok"}
 
 
 @app.get("/api/prompts/{slug}/backups")
 async def list_backups(slug: str):
-    """List all hourly backups for a prompt."""
+    """List all stored backups for a prompt (newest first)."""
     backups = []
-    for f in sorted(BACKUP_DIR.glob(f"{slug}_*.md"), reverse=True):
-        name = f.stem
-        # Extract timestamp from filename
-        ts_part = name.replace(f"{slug}_", "")
+    for rev in reversed(_load_backup_index(slug)):
+        ts_part = rev["timestamp"]
         try:
             dt = datetime.strptime(ts_part, "%Y%m%d_%H%M%S")
             label = dt.strftime("%b %d, %Y %I:%M %p")
         except ValueError:
             label = ts_part
         backups.append({
-            "filename": f.name,
+            "filename": rev["id"],
             "label": label,
             "timestamp": ts_part,
         })
@@ -536,11 +900,11 @@ async def list_backups(slug: str):
 
 @app.get("/api/prompts/{slug}/backups/{filename}")
 async def get_backup(slug: str, filename: str):
-    """Return the content of a specific backup file."""
-    filepath = BACKUP_DIR / filename
-    if not filepath.exists():
+    """Return the content of a specific backup revision."""
+    rev = next((r for r in _load_backup_index(slug) if r["id"] == filename), None)
+    if rev is None or not _backup_object_path(rev["digest"]).exists():
         return JSONResponse({"error": "Backup not found"}, status_code=404)
-    return {"content": filepath.read_text(encoding="utf-8")}
+    return {"content": _read_backup_object(rev["digest"])}
 
 
 @app.delete("/api/prompts/{slug}")
@@ -549,10 +913,13 @@ async def delete_prompt(slug: str):
     filepath = PROMPTS_DIR / f"{slug}.md"
     if filepath.exists():
         filepath.unlink()
+    _prompt_cache.pop(slug, None)
 
-    # Delete backups too
-    for f in BACKUP_DIR.glob(f"{slug}_*.md"):
-        f.unlink()
+    # Delete backups too (only this slug's index; shared objects survive)
+    index = _backup_index_path(slug)
+    if index.exists():
+        index.unlink()
+        _gc_backup_objects()
 
     return {"status": "ok"}
 
@@ -574,6 +941,10 @@ class TTSTextRequest(BaseModel):
     speed: Optional[float] = 1.0
     force: Optional[bool] = False
 
+
+class TTSWarmupRequest(BaseModel):
+    voice: Optional[str] = None
+
 @app.post("/api/generate/web/auth")
 async def web_auth():
     """
@@ -746,6 +1117,9 @@ def _safe_path(rel: str) -> Path:
 # TTS Cache
 TTS_CACHE_DIR = PROJECTS_DIR / "_tts_cache"
 TTS_CACHE_DIR.mkdir(exist_ok=True)
+# Bumped whenever text preparation changes what gets spoken. 2.0: single-pass
+# cleaner (images/HTML handled, different whitespace/punctuation spacing)
+TTS_CACHE_VERSION = "2.0"
 
 def _get_tts_metadata(text: str, voice: str, speed: float) -> dict:
     """Generate metadata for a TTS request to track sync."""
@@ -754,7 +1128,7 @@ def _get_tts_metadata(text: str, voice: str, speed: float) -> dict:
         "hash": content_hash,
         "voice": voice,
         "speed": float(speed),
-        "version": "1.0"
+        "version": TTS_CACHE_VERSION
     }
 
 def _get_tts_paths(rel_path: Optional[str]) -> tuple[Optional[Path], Optional[Path]]:
@@ -768,6 +1142,176 @@ def _get_tts_paths(rel_path: Optional[str]) -> tuple[Optional[Path], Optional[Pa
     cache_json = TTS_CACHE_DIR / p.with_suffix(".json")
     return cache_wav, cache_json
 
+def _load_tts_sidecar(cache_json: Optional[Path]) -> dict:
+    """Read a cache sidecar; returns {} if it is missing or unreadable."""
+    if not cache_json or not cache_json.exists():
+        return {}
+    try:
+        return json.loads(cache_json.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[TTS/Cache] Metadata read failed for {cache_json.name}: {e}")
+        return {}
+
+def _is_tts_cache_fresh(cache_wav: Optional[Path], cache_json: Optional[Path], metadata: dict) -> bool:
+    """True if the cached WAV was rendered from the same text, voice and speed."""
+    if not cache_wav or not cache_wav.exists():
+        return False
+    stored_meta = _load_tts_sidecar(cache_json)
+    return stored_meta.get("hash") == metadata["hash"] and \
+        stored_meta.get("version") == metadata["version"] and \
+        stored_meta.get("voice") == metadata["voice"] and \
+        abs(stored_meta.get("speed", 0) - metadata["speed"]) < 0.01
+
+def _get_tts_timing_path(cache_wav: Path) -> Path:
+    """Read-along timing sidecar stored next to a cached WAV."""
+    return cache_wav.with_name(cache_wav.name + ".timing.json")
+
+def _load_tts_timing(cache_wav: Optional[Path]) -> dict:
+    """Read a timing sidecar; returns {} if it is missing or unreadable."""
+    if not cache_wav:
+        return {}
+    timing_path = _get_tts_timing_path(cache_wav)
+    if not timing_path.exists():
+        return {}
+    try:
+        return json.loads(timing_path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[TTS/Cache] Timing read failed for {timing_path.name}: {e}")
+        return {}
+
+def _write_tts_cache(cache_wav: Path, cache_json: Path, wav_bytes: bytes, metadata: dict, segments: list[int], timing: Optional[dict] = None):
+    """Store rendered audio and its sidecars in the path-mirrored cache."""
+    cache_wav.parent.mkdir(parents=True, exist_ok=True)
+    cache_wav.write_bytes(wav_bytes)
+    # Segment lengths let /api/tts/stream replay the cache chunk by chunk
+    cache_json.write_text(json.dumps({**metadata, "segments": segments}), encoding="utf-8")
+    timing_path = _get_tts_timing_path(cache_wav)
+    if timing:
+        timing_path.write_text(json.dumps(timing, separators=(",", ":")), encoding="utf-8")
+    elif timing_path.exists():
+        timing_path.unlink()
+
+def _tts_frame(payload: bytes) -> bytes:
+    """Length-prefixed frame of the /api/tts/stream protocol."""
+    return len(payload).to_bytes(4, byteorder='big') + payload
+
+def _tts_timing_frame(timing: dict) -> bytes:
+    """Timing frames are JSON (first byte '{'); audio frames are WAV ('RIFF')."""
+    return _tts_frame(json.dumps(timing, separators=(",", ":")).encode("utf-8"))
+
+def _tts_etag(cache_wav: Path, cache_json: Optional[Path]) -> str:
+    """Strong ETag for a cached WAV, derived from its sidecar metadata."""
+    meta = _load_tts_sidecar(cache_json)
+    stat = cache_wav.stat()
+    if meta.get("hash"):
+        basis = {k: meta.get(k) for k in ("hash", "voice", "speed", "version")}
+    else:
+        basis = {"mtime": stat.st_mtime_ns}
+    basis["size"] = stat.st_size
+    digest = hashlib.md5(json.dumps(basis, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _parse_byte_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single ``bytes=start-end`` Range header into an inclusive
+    (start, end) pair. Returns None for anything we don't handle (multiple
+    ranges, other units); raises ValueError if the range is unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not start_s:
+            # Suffix range: last N bytes
+            length = int(end_s)
+            if length <= 0:
+                raise ValueError("Empty suffix range")
+            return max(size - length, 0), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        if start_s.isdigit() or end_s.isdigit():
+            raise
+        return None
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _iter_file_range(path: Path, start: int, length: int, chunk_size: int = 64 * 1024):
+    """Read ``length`` bytes of a file starting at ``start``, one chunk at a time."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _conditional_file_response(request: Request, path: Path, etag: str, media_type: str):
+    """
+    Serve a file with ETag/Last-Modified validators, answering conditional
+    GETs with 304 and single byte-range requests with 206.
+    """
+    stat = path.stat()
+    size = stat.st_size
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        # Only consulted without If-None-Match (RFC 9110 13.2.2)
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(stat.st_mtime) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None  # Validator changed: send the whole file
+
+    byte_range = None
+    if range_header:
+        try:
+            byte_range = _parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    if request.method == "HEAD":
+        # FileResponse skips the body for HEAD by itself; a streamed range doesn't
+        return Response(status_code=206, media_type=media_type, headers=headers)
+    return StreamingResponse(
+        _iter_file_range(path, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
+
 @app.get("/api/fs/select-root")
 def fs_select_root():
     import tkinter as tk
@@ -865,6 +1409,7 @@ async def fs_create_file(request: Request):
         target = _safe_path(rel)
         target.parent.mkdir(parents=True, exist_ok=True)
         target.write_text(content, encoding="utf-8")
+        _queue_tts_prerender(rel)
         return {"ok": True, "path": rel}
     except ValueError:
         return JSONResponse({"error": "Invalid path"}, status_code=400)
@@ -894,6 +1439,7 @@ async def fs_update_file(request: Request):
         if not target.is_file():
             return JSONResponse({"error": "File not found"}, status_code=404)
         target.write_text(content, encoding="utf-8")
+        _queue_tts_prerender(rel)
         return {"ok": True, "path": rel}
     except ValueError:
         return JSONResponse({"error": "Invalid path"}, status_code=400)
@@ -1002,6 +1548,219 @@ async def fs_duplicate(request: Request):
         return JSONResponse({"error": "Invalid path"}, status_code=400)
 
 
+# ---------------------------------------------------------------------------
+# Project archives — move a whole project between machines as one zip
+# ---------------------------------------------------------------------------
+ARCHIVE_FORMAT = 1
+ARCHIVE_MANIFEST = "manifest.json"
+ARCHIVE_CHUNK = 1024 * 1024
+ARCHIVE_MAX_SIZE = 8 * 1024 ** 3        # total uncompressed bytes an import may write
+ARCHIVE_MAX_MANIFEST = 64 * 1024 ** 2   # manifest.json is read into memory
+ARCHIVE_MAX_UPLOAD = ARCHIVE_MAX_SIZE    # compressed bytes accepted by the import endpoint
+# Derived or machine-specific files that are rebuilt on demand
+ARCHIVE_EXCLUDE = {
+    "__pycache__", ".DS_Store", ".notion_blocks.json", ".notion_sync_state.json", ".notion_sync_queue.json",
+}
+# Already compressed; deflating them again only costs CPU
+ARCHIVE_STORED_EXTS = {".wav", ".mp3", ".ogg", ".flac", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".zip", ".gz"}
+
+
+def _archive_files(project_dir: Path, prefix: str):
+    """(archive name, path) for every file worth archiving under project_dir."""
+    for path in sorted(project_dir.rglob("*")):
+        rel = path.relative_to(project_dir)
+        if any(part in ARCHIVE_EXCLUDE or part.endswith(".tmp") for part in rel.parts) or not path.is_file():
+            continue
+        yield f"{prefix}/{rel.as_posix()}", path
+
+
+class _ZipStream:
+    """Write-only sink that zipfile fills and the response drains."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _iter_project_archive(project: str, project_dir: Path, include_audio: bool):
+    """Zip bytes for a project, produced incrementally; the manifest goes last."""
+    sources = list(_archive_files(project_dir, "project"))
+    audio_dir = TTS_CACHE_DIR / project
+    if include_audio and audio_dir.is_dir():
+        sources += list(_archive_files(audio_dir, "_tts_cache"))
+
+    sink = _ZipStream()
+    manifest = {"format": ARCHIVE_FORMAT, "project": project, "created": datetime.now().isoformat(), "files": {}}
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        for arcname, path in sources:
+            stored = path.suffix.lower() in ARCHIVE_STORED_EXTS
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            digest = hashlib.sha256()
+            with open(path, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                while chunk := src.read(ARCHIVE_CHUNK):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    yield sink.drain()
+            manifest["files"][arcname] = {"sha256": digest.hexdigest(), "size": info.file_size}
+            yield sink.drain()
+        zf.writestr(ARCHIVE_MANIFEST, json.dumps(manifest, indent=1))
+    yield sink.drain()
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(ARCHIVE_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check_archive_manifest(manifest) -> dict:
+    """The manifest's files ({arcname: {size, sha256}}); ValueError if malformed."""
+    if not isinstance(manifest, dict):
+        raise ValueError("Invalid manifest")
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported archive format: {manifest.get('format')}")
+    files = manifest.get("files", {})
+    if not isinstance(files, dict):
+        raise ValueError("Invalid manifest: 'files' must be an object")
+    for arcname, meta in files.items():
+        size = meta.get("size") if isinstance(meta, dict) else None
+        digest = meta.get("sha256") if isinstance(meta, dict) else None
+        if type(size) is not int or size < 0:
+            raise ValueError(f"Invalid manifest entry for {arcname}: bad size")
+        if not isinstance(digest, str) or not re.fullmatch(r"[0-9a-f]{64}", digest):
+            raise ValueError(f"Invalid manifest entry for {arcname}: bad sha256")
+    return files
+
+
+def _import_project_archive(archive, name: Optional[str]) -> dict:
+    """Unpack a project archive, skipping files whose content already matches."""
+    with zipfile.ZipFile(archive) as zf:
+        try:
+            if zf.getinfo(ARCHIVE_MANIFEST).file_size > ARCHIVE_MAX_MANIFEST:
+                raise ValueError("Archive manifest is too large")
+            manifest = json.loads(zf.read(ARCHIVE_MANIFEST))
+        except KeyError:
+            raise ValueError("Not a project archive (no manifest.json)")
+        files = _check_archive_manifest(manifest)
+
+        # Refuse zip bombs up front: by what the manifest claims and by what
+        # the zip headers say the entries expand to (zipfile never reads past
+        # an entry's file_size, so the latter bounds what gets written)
+        infos = {info.filename: info for info in zf.infolist()}
+        claimed = sum(meta["size"] for meta in files.values())
+        expanded = sum(infos[arcname].file_size for arcname in files if arcname in infos)
+        if max(claimed, expanded) > ARCHIVE_MAX_SIZE:
+            raise ValueError(f"Archive expands to more than {ARCHIVE_MAX_SIZE // 1024 ** 3} GB")
+        project = name or manifest.get("project") or ""
+        project_dir = _safe_path(project)
+        if project_dir == PROJECTS_DIR.resolve() or project.startswith("_tts_cache"):
+            raise ValueError("Invalid project name")
+        roots = {"project": project_dir, "_tts_cache": (TTS_CACHE_DIR / project).resolve()}
+
+        written, skipped, failed = [], [], []
+        for arcname, meta in files.items():
+            root_name, _, rel = arcname.partition("/")
+            root = roots.get(root_name)
+            target = (root / rel).resolve() if root and rel else None
+            if target is None or not str(target).startswith(str(root) + os.sep):
+                failed.append({"file": arcname, "error": "invalid path"})
+                continue
+            if arcname not in infos:
+                failed.append({"file": arcname, "error": "missing from archive"})
+                continue
+            if infos[arcname].file_size != meta["size"]:
+                failed.append({"file": arcname, "error": "size mismatch"})
+                continue
+            if target.is_file() and target.stat().st_size == meta["size"] and _file_sha256(target) == meta["sha256"]:
+                skipped.append(arcname)
+                continue
+            tmp = target.with_name(target.name + ".tmp")
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                digest = hashlib.sha256()
+                with zf.open(infos[arcname]) as src, open(tmp, "wb") as dst:
+                    while chunk := src.read(ARCHIVE_CHUNK):
+                        digest.update(chunk)
+                        dst.write(chunk)
+                if digest.hexdigest() != meta["sha256"]:
+                    failed.append({"file": arcname, "error": "hash mismatch"})
+                    continue
+                os.replace(tmp, target)
+                written.append(arcname)
+            except Exception as e:
+                failed.append({"file": arcname, "error": str(e)})
+            finally:
+                tmp.unlink(missing_ok=True)
+    return {"ok": not failed, "project": project, "written": len(written), "skipped": len(skipped), "failed": failed}
+
+
+@app.get("/api/projects/export")
+async def export_project(project: str, include_audio: bool = False):
+    """
+    Stream a project folder as a zip (with a manifest of content hashes).
+    TTS audio is only included with include_audio=true.
+    """
+    try:
+        project_dir = _safe_path(project)
+    except ValueError:
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+    if project_dir == PROJECTS_DIR.resolve() or not project_dir.is_dir():
+        return JSONResponse({"error": "Project not found"}, status_code=404)
+    filename = f"{project_dir.name}.novellica.zip"
+    return StreamingResponse(
+        _iter_project_archive(project, project_dir, include_audio),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.post("/api/projects/import")
+async def import_project(request: Request, name: Optional[str] = None):
+    """
+    Import a zip produced by /api/projects/export (raw request body). Every
+    file is verified against the manifest; files already identical are kept.
+    """
+    too_large = JSONResponse(
+        {"error": f"Archive is larger than {ARCHIVE_MAX_UPLOAD // 1024 ** 3} GB"}, status_code=413)
+    try:
+        if int(request.headers.get("content-length") or 0) > ARCHIVE_MAX_UPLOAD:
+            return too_large
+    except ValueError:
+        return JSONResponse({"error": "Invalid Content-Length"}, status_code=400)
+
+    # zipfile needs to seek to the central directory, so spool the upload
+    archive = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > ARCHIVE_MAX_UPLOAD:
+                return too_large
+            archive.write(chunk)
+        archive.seek(0)
+        return await asyncio.to_thread(_import_project_archive, archive, name)
+    except (ValueError, zipfile.BadZipFile) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"error": f"Import failed: {e}"}, status_code=500)
+    finally:
+        archive.close()
+
+
 @app.get("/api/search")
 async def global_search(q: str):
     """Search for text across all project documents."""
@@ -1069,6 +1828,69 @@ async def list_tts_voices():
     }
 
 
+# ---------------------------------------------------------------------------
+# TTS warm-up — load Kokoro before the first Read press
+# ---------------------------------------------------------------------------
+# TTS_WARMUP: "startup" (background load when the server starts), "editor"
+# (when the UI first opens a document) or "never" (load on first Read).
+TTS_WARMUP_POLICIES = ("startup", "editor", "never")
+
+_tts_warmup_task = None
+
+
+def _tts_warmup_policy() -> str:
+    value = (_read_env_var("TTS_WARMUP") or os.getenv("TTS_WARMUP", "")).strip().lower()
+    return value if value in TTS_WARMUP_POLICIES else "editor"
+
+
+def _tts_status() -> dict:
+    # Reporting must not import the TTS stack itself
+    if _is_imported(tts_kokoro):
+        status = tts_kokoro.model_status()
+    else:
+        status = {"state": "cold", "error": None, "load_seconds": None}
+    if status["state"] == "cold" and _tts_warmup_task and not _tts_warmup_task.done():
+        status["state"] = "loading"
+    return {"available": HAS_TTS, "policy": _tts_warmup_policy(), **status}
+
+
+def _start_tts_warmup(voice: str | None = None):
+    """Load the model in the background unless it is loaded or already loading."""
+    global _tts_warmup_task
+    if not HAS_TTS or (_tts_warmup_task and not _tts_warmup_task.done()):
+        return
+    if _tts_status()["state"] in ("loading", "ready"):
+        return
+
+    async def _warmup():
+        try:
+            if isinstance(tts_kokoro, _LazyModule):
+                await asyncio.to_thread(tts_kokoro._load)
+            name = voice or tts_kokoro.DEFAULT_VOICE
+            await tts_kokoro.preload_model(tts_kokoro._get_lang_code(name), name)
+            print(f"[TTS] Model ready ({tts_kokoro.model_status()['load_seconds']} s)")
+        except Exception as exc:
+            print(f"[TTS] Warm-up failed: {exc}")
+
+    _tts_warmup_task = asyncio.create_task(_warmup())
+
+
+@app.get("/api/tts/status")
+async def get_tts_status():
+    """Whether the TTS model is cold, loading, ready or failed to load."""
+    return _tts_status()
+
+
+@app.post("/api/tts/warmup")
+async def warmup_tts(req: TTSWarmupRequest):
+    """Called when the editor opens; loads the model unless TTS_WARMUP=never."""
+    if not HAS_TTS:
+        return JSONResponse({"error": "Kokoro TTS is not installed."}, status_code=500)
+    if _tts_warmup_policy() != "never":
+        _start_tts_warmup(req.voice)
+    return _tts_status()
+
+
 @app.post("/api/tts")
 async def generate_tts(req: TTSTextRequest):
     """
@@ -1078,8 +1900,9 @@ async def generate_tts(req: TTSTextRequest):
     if not HAS_TTS:
         return JSONResponse({"error": "Kokoro TTS is not installed."}, status_code=500)
 
-    text = tts_kokoro.clean_text_for_tts(req.text)
-    if not text:
+    # Clean and chunk once; the prepared text is reused for hashing and synthesis
+    prepared = tts_kokoro.prepare_text_for_tts(req.text)
+    if not prepared.text:
         return JSONResponse({"error": "Text is empty"}, status_code=400)
 
     voice = req.voice or tts_kokoro.DEFAULT_VOICE
@@ -1087,39 +1910,33 @@ async def generate_tts(req: TTSTextRequest):
 
     # Path-based mirrors
     cache_wav, cache_json = _get_tts_paths(req.path)
-    metadata = _get_tts_metadata(text, voice, speed)
+    metadata = _get_tts_metadata(prepared.text, voice, speed)
 
     try:
         # Check cache (only if path provided and not forcing)
-        if cache_wav and cache_wav.exists() and cache_json and cache_json.exists() and not req.force:
-            try:
-                stored_meta = json.loads(cache_json.read_text(encoding="utf-8"))
-                if stored_meta.get("hash") == metadata["hash"] and \
-                   stored_meta.get("voice") == metadata["voice"] and \
-                   abs(stored_meta.get("speed", 0) - metadata["speed"]) < 0.01:
-                    print(f"[TTS/Cache] Serving fresh path-mirrored audio: {req.path}")
-                    return FileResponse(
-                        cache_wav,
-                        media_type="audio/wav",
-                        filename=cache_wav.name
-                    )
-            except Exception as e:
-                print(f"[TTS/Cache] Metadata read failed for {req.path}: {e}")
+        if not req.force and _is_tts_cache_fresh(cache_wav, cache_json, metadata):
+            print(f"[TTS/Cache] Serving fresh path-mirrored audio: {req.path}")
+            return FileResponse(
+                cache_wav,
+                media_type="audio/wav",
+                filename=cache_wav.name
+            )
 
         # Generate fresh
-        wav_bytes = await tts_kokoro.generate_full(text, voice=voice, speed=speed)
+        wav_bytes, segments, timing = await tts_kokoro.generate_full_segmented(prepared, voice=voice, speed=speed)
 
         # Save to mirrored cache if path exists
         if cache_wav and cache_json:
-            cache_wav.parent.mkdir(parents=True, exist_ok=True)
-            cache_wav.write_bytes(wav_bytes)
-            cache_json.write_text(json.dumps(metadata), encoding="utf-8")
+            _write_tts_cache(cache_wav, cache_json, wav_bytes, metadata, segments, timing)
             print(f"[TTS/Cache] Saved fresh path-mirrored audio: {req.path}")
 
-        return StreamingResponse(
-            io.BytesIO(wav_bytes),
+        if cache_wav:
+            return FileResponse(cache_wav, media_type="audio/wav", filename=cache_wav.name)
+
+        return Response(
+            content=wav_bytes,
             media_type="audio/wav",
-            headers={"Content-Disposition": f"inline; filename={cache_wav.name if cache_wav else 'tts.wav'}"},
+            headers={"Content-Disposition": "inline; filename=tts.wav"},
         )
     except Exception as e:
         import traceback
@@ -1127,42 +1944,127 @@ async def generate_tts(req: TTSTextRequest):
         return JSONResponse({"error": f"TTS Error: {str(e)}"}, status_code=500)
 
 
+@app.post("/api/tts/fresh")
+async def check_tts_fresh(req: TTSTextRequest):
+    """
+    Whether a document's cached audio was rendered from this exact text,
+    voice and speed. The player asks before streaming /api/tts/audio, which
+    serves the cache as-is.
+    """
+    if not HAS_TTS:
+        return JSONResponse({"error": "Kokoro TTS is not installed."}, status_code=500)
+    try:
+        _safe_path(req.path or "")
+    except ValueError:
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+    cache_wav, cache_json = _get_tts_paths(req.path)
+    prepared = tts_kokoro.prepare_text_for_tts(req.text)
+    metadata = _get_tts_metadata(prepared.text, req.voice or tts_kokoro.DEFAULT_VOICE, req.speed or 1.0)
+    return {"fresh": bool(prepared.text) and _is_tts_cache_fresh(cache_wav, cache_json, metadata)}
+
+
+@app.get("/api/tts/audio")
+async def get_tts_audio(path: str, request: Request):
+    """
+    Serve previously generated audio for a document straight from the cache.
+    Supports byte ranges and ETag/Last-Modified conditional GETs, so the
+    browser's audio element can seek and resume without a full download.
+    Query: ?path=relative/path/to/doc.md
+    """
+    try:
+        _safe_path(path)
+    except ValueError:
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+
+    cache_wav, cache_json = _get_tts_paths(path)
+    if not cache_wav or not cache_wav.resolve().is_relative_to(TTS_CACHE_DIR.resolve()):
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+    if not cache_wav.is_file():
+        return JSONResponse({"error": "No cached audio for this document"}, status_code=404)
+
+    etag = _tts_etag(cache_wav, cache_json)
+    return _conditional_file_response(request, cache_wav, etag, "audio/wav")
+
+
+@app.get("/api/tts/timing")
+async def get_tts_timing(path: str, request: Request):
+    """
+    Read-along timing for a document's cached audio: sentence and word
+    entries of [start_sample, end_sample, src_start, src_end], where the
+    source offsets index into the document text sent for synthesis.
+    Query: ?path=relative/path/to/doc.md
+    """
+    try:
+        _safe_path(path)
+    except ValueError:
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+
+    cache_wav, cache_json = _get_tts_paths(path)
+    if not cache_wav or not cache_wav.resolve().is_relative_to(TTS_CACHE_DIR.resolve()):
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+    timing_path = _get_tts_timing_path(cache_wav)
+    if not cache_wav.is_file() or not timing_path.is_file():
+        return JSONResponse({"error": "No timing for this document"}, status_code=404)
+
+    etag = _tts_etag(cache_wav, cache_json)[:-1] + '-timing"'
+    return _conditional_file_response(request, timing_path, etag, "application/json")
+
+
 @app.post("/api/tts/stream")
 async def generate_tts_stream(req: TTSTextRequest):
     """
     Stream TTS audio in chunks. Supports path-based cache check.
+    Every frame is a 4-byte big-endian length plus payload: WAV audio, or a
+    JSON timing frame ({"src", "sentences", "words"}) for the WAV after it.
     """
     if not HAS_TTS:
         return JSONResponse({"error": "Kokoro TTS is not installed."}, status_code=500)
 
-    text = tts_kokoro.clean_text_for_tts(req.text)
-    if not text:
+    prepared = tts_kokoro.prepare_text_for_tts(req.text)
+    if not prepared.text:
         return JSONResponse({"error": "Text is empty after cleaning"}, status_code=400)
 
     voice = req.voice or tts_kokoro.DEFAULT_VOICE
     speed = req.speed or 1.0
 
-    # Path-based check
-    cache_wav, _ = _get_tts_paths(req.path)
-    # Note: Stream cached check is limited as it just sends everything at once if cached
-    # In a real stream we'd want to preserve the chunking, but for cache hits we just dump the file.
-    if cache_wav and cache_wav.exists() and not req.force:
+    # Path-based check: only audio rendered from this text, voice and speed
+    # (its timing offsets index into this text)
+    cache_wav, cache_json = _get_tts_paths(req.path)
+    metadata = _get_tts_metadata(prepared.text, voice, speed)
+    if not req.force and _is_tts_cache_fresh(cache_wav, cache_json, metadata):
         print(f"[TTS/Stream/Cache] Serving path-mirrored stream: {req.path}")
-        async def cached_stream():
+        segments = _load_tts_sidecar(cache_json).get("segments")
+        seg_timings = tts_kokoro.split_timing(_load_tts_timing(cache_wav)) if segments else []
+        if len(seg_timings) != len(segments or []):
+            seg_timings = []  # Timing doesn't belong to this audio
+
+        def cached_stream():
+            # Replays the cached WAV with the same framing as live synthesis,
+            # reading one segment at a time so playback can start immediately.
             try:
-                 with open(cache_wav, "rb") as f:
-                     data = f.read()
-                     yield len(data).to_bytes(4, byteorder='big') + data
+                for i, wav_chunk in enumerate(tts_kokoro.iter_cached_segments(cache_wav, segments)):
+                    if i < len(seg_timings):
+                        yield _tts_timing_frame(seg_timings[i])
+                    yield _tts_frame(wav_chunk)
             except Exception as e:
-                 print(f"[TTS/Stream/Cache] Error reading cache: {e}")
-        return StreamingResponse(cached_stream(), media_type="application/octet-stream")
+                print(f"[TTS/Stream/Cache] Error reading cache: {e}")
+
+        return StreamingResponse(
+            cached_stream(),
+            media_type="application/octet-stream",
+            headers={
+                "X-TTS-Sample-Rate": str(tts_kokoro.SAMPLE_RATE),
+                "X-TTS-Voice": voice,
+                "X-TTS-Cache": "hit",
+            },
+        )
 
     async def audio_stream():
         try:
-            async for wav_chunk in tts_kokoro.generate_stream(text, voice=voice, speed=speed):
-                # Send length-prefixed binary chunks
-                length = len(wav_chunk)
-                yield length.to_bytes(4, byteorder='big') + wav_chunk
+            async for wav_chunk, timing in tts_kokoro.generate_stream_timed(prepared, voice=voice, speed=speed):
+                # Send length-prefixed binary chunks, each WAV preceded by its timing
+                yield _tts_timing_frame(timing)
+                yield _tts_frame(wav_chunk)
         except Exception as e:
             print(f"[TTS/Stream] Error: {e}")
 
@@ -1175,44 +2077,285 @@ async def generate_tts_stream(req: TTSTextRequest):
         },
     )
 
+# ---------------------------------------------------------------------------
+# TTS pre-rendering — opt-in (TTS_PRERENDER=1 in .env). Documents saved
+# through the fs endpoints are rendered in the background while idle.
+# ---------------------------------------------------------------------------
+TTS_PRERENDER_DELAY = 30         # seconds a file must stay unchanged before rendering
+TTS_PRERENDER_MAX_CPU = 50.0     # wait while system CPU usage (%) is above this
+TTS_PRERENDER_POLL = 5.0         # seconds between idle checks
+TTS_CPU_SAMPLE = 1.0             # seconds of CPU usage each idle check measures
+TTS_PRERENDER_EXTS = ('.md', '.txt', '.markdown')
+
+_prerender_pending: dict[str, float] = {}   # rel path -> monotonic time of last write
+_prerender_wakeup = asyncio.Event()
+_prerender_task = None
+
+
+def _prerender_enabled() -> bool:
+    value = _read_env_var("TTS_PRERENDER") or os.getenv("TTS_PRERENDER", "")
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _queue_tts_prerender(rel: str):
+    """Mark a document as changed so the background renderer picks it up."""
+    if not HAS_TTS or not _prerender_enabled():
+        return
+    if Path(rel).suffix.lower() not in TTS_PRERENDER_EXTS:
+        return
+    _prerender_pending[rel] = time.monotonic()
+    _prerender_wakeup.set()
+
+
+def _cpu_percent() -> float:
+    """
+    System CPU usage in percent (psutil if available, else load average).
+    psutil reports usage since its previous call (0.0 on the first), so
+    use _sample_cpu_percent for a current reading.
+    """
+    try:
+        import psutil
+        return psutil.cpu_percent(interval=None)
+    except ImportError:
+        pass
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1) * 100
+    except (AttributeError, OSError):
+        return 0.0
+
+
+async def _sample_cpu_percent() -> float:
+    """CPU usage over the last TTS_CPU_SAMPLE seconds, without blocking the loop."""
+    _cpu_percent()  # Start the measurement window
+    await asyncio.sleep(TTS_CPU_SAMPLE)
+    return _cpu_percent()
+
+
+async def _is_tts_idle() -> bool:
+    if tts_kokoro.is_busy():
+        return False
+    return await _sample_cpu_percent() < TTS_PRERENDER_MAX_CPU and not tts_kokoro.is_busy()
+
+
+async def _prerender_document(rel: str):
+    """Render one document into the TTS cache unless it is already up to date."""
+    target = _safe_path(rel)
+    if not target.is_file():
+        return
+    prepared = tts_kokoro.prepare_text_for_tts(target.read_text(encoding="utf-8"))
+    if not prepared.text:
+        return
+
+    cache_wav, cache_json = _get_tts_paths(rel)
+    # Keep whatever voice/speed the document was last rendered with
+    stored_meta = _load_tts_sidecar(cache_json)
+    voice = stored_meta.get("voice") or tts_kokoro.DEFAULT_VOICE
+    speed = stored_meta.get("speed") or 1.0
+    metadata = _get_tts_metadata(prepared.text, voice, speed)
+    if _is_tts_cache_fresh(cache_wav, cache_json, metadata):
+        return
+
+    print(f"[TTS/Prerender] Rendering {rel}")
+    # Background priority: gives the pipeline up between chunks and raises
+    # TTSPreempted as soon as a Read/Generate request is waiting
+    wav_bytes, segments, timing = await tts_kokoro.generate_full_segmented(
+        prepared, voice=voice, speed=speed, background=True
+    )
+    _write_tts_cache(cache_wav, cache_json, wav_bytes, metadata, segments, timing)
+    print(f"[TTS/Prerender] Cached {rel}")
+
+
+async def _prerender_loop():
+    """Drain the pending set, oldest edit first, once files settle and the machine is idle."""
+    while True:
+        await _prerender_wakeup.wait()
+        _prerender_wakeup.clear()
+        while _prerender_pending:
+            now = time.monotonic()
+            rel, edited = min(_prerender_pending.items(), key=lambda item: item[1])
+            settle = TTS_PRERENDER_DELAY - (now - edited)
+            if settle > 0:
+                await asyncio.sleep(settle)
+                continue
+            if not _prerender_enabled():
+                _prerender_pending.clear()
+                break
+            if not await _is_tts_idle():
+                await asyncio.sleep(TTS_PRERENDER_POLL)
+                continue
+            # Drop the entry only if it wasn't edited again in the meantime
+            if _prerender_pending.get(rel) == edited:
+                del _prerender_pending[rel]
+            try:
+                await _prerender_document(rel)
+            except tts_kokoro.TTSPreempted:
+                # Retry once the interactive request is done (a newer edit wins)
+                print(f"[TTS/Prerender] Paused {rel} for an interactive request")
+                _prerender_pending.setdefault(rel, edited)
+            except Exception as exc:
+                print(f"[TTS/Prerender] Failed for {rel}: {exc}")
+
+
+@app.get("/api/tts/cache")
+async def get_tts_cache_info(path: str):
+    """Report whether cached audio exists for a document (e.g. from pre-rendering)."""
+    try:
+        _safe_path(path)
+    except ValueError:
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+    cache_wav, cache_json = _get_tts_paths(path)
+    if not cache_wav or not cache_wav.is_file():
+        return {"exists": False}
+    meta = _load_tts_sidecar(cache_json)
+    return {"exists": True, "voice": meta.get("voice", ""), "speed": meta.get("speed", 1.0)}
+
+
 class BackupRequest(BaseModel):
     description: str = "Manual Backup"
 
+
+# ---------------------------------------------------------------------------
+# Code backups — snapshot folders under Backup/. Files unchanged since the
+# previous snapshot (same size and mtime) are hardlinked to it, so only
+# changed files are copied; Backup/index.json lists the snapshots.
+# ---------------------------------------------------------------------------
+CODE_BACKUP_DIR = Path(__file__).parent / "Backup"
+CODE_BACKUP_INDEX = CODE_BACKUP_DIR / "index.json"
+CODE_BACKUP_MANIFESTS = CODE_BACKUP_DIR / ".manifests"   # name -> {rel: [size, mtime_ns]}
+CODE_BACKUP_IGNORE = {
+    "projects", "Story-Refined", "venv", ".venv", ".venv_tts", ".git", ".gemini", ".gemini_profile",
+    "__pycache__", "node_modules", "tts_models",
+}
+
+
+def _code_backup_ignored(name: str) -> bool:
+    # Ignore anything that looks like a story file or is unnecessary
+    return name in CODE_BACKUP_IGNORE or "Backup" in name
+
+
+def _parse_backup_log(base_dir: Path) -> list[dict]:
+    """Backup entries recorded in project_logs.md (snapshots made before index.json)."""
+    log_file = base_dir / "project_logs.md"
+    if not log_file.exists():
+        return []
+    backups = []
+    for sec in log_file.read_text(encoding="utf-8").split("## "):
+        lines = sec.strip().split("\n")
+        header = lines[0].strip()
+        if not header.startswith("Backup"):
+            continue # Only parse backup sections
+        desc = ""
+        for line in lines[1:]:
+            if line.startswith("**Modifications/Features:**"):
+                desc = line.replace("**Modifications/Features:**", "").strip()
+                break
+        name, _, created = header.partition(" - ")
+        backups.append({"name": name.strip(), "description": desc, "created": created.strip()})
+    return backups
+
+
+def _load_code_backup_index() -> list[dict]:
+    try:
+        return json.loads(CODE_BACKUP_INDEX.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        backups = _parse_backup_log(Path(__file__).parent)
+        if backups:
+            _save_code_backup_index(backups)
+        return backups
+    except Exception:
+        return []
+
+
+def _save_code_backup_index(backups: list[dict]):
+    CODE_BACKUP_DIR.mkdir(exist_ok=True)
+    tmp = CODE_BACKUP_INDEX.with_suffix(".tmp")
+    tmp.write_text(json.dumps(backups, indent=1), encoding="utf-8")
+    os.replace(tmp, CODE_BACKUP_INDEX)
+
+
+def _load_code_manifest(name: str) -> dict:
+    try:
+        return json.loads((CODE_BACKUP_MANIFESTS / f"{name}.json").read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _snapshot_code(base_dir: Path, backup_dir: Path, previous: Path | None, prev_files: dict) -> tuple[dict, int, int]:
+    """Write a snapshot of base_dir; returns (manifest, files copied, files linked)."""
+    files = {}
+    copied = linked = 0
+    for root, dirs, names in os.walk(base_dir):
+        dirs[:] = [d for d in dirs if not _code_backup_ignored(d)]
+        rel_root = Path(root).relative_to(base_dir)
+        (backup_dir / rel_root).mkdir(parents=True, exist_ok=True)
+        for name in names:
+            if _code_backup_ignored(name):
+                continue
+            src = Path(root) / name
+            rel = (rel_root / name).as_posix()
+            st = src.stat()
+            sig = [st.st_size, st.st_mtime_ns]
+            files[rel] = sig
+            if previous is not None and prev_files.get(rel) == sig:
+                try:
+                    os.link(previous / rel, backup_dir / rel)
+                    linked += 1
+                    continue
+                except OSError:
+                    pass  # missing in the old snapshot, or no hardlinks here: copy
+            shutil.copy2(src, backup_dir / rel)
+            copied += 1
+    return files, copied, linked
+
+
+def _create_code_backup(description: str) -> dict:
+    base_dir = Path(__file__).parent
+    now = datetime.now()
+    # Custom format asked by user, or dynamic
+    folder_name = "Backup" + now.strftime("%d%b%Y_%I%M").lstrip("0") + now.strftime("%p").lower()
+    backup_dir = CODE_BACKUP_DIR / folder_name
+    if backup_dir.exists():
+        raise FileExistsError("Backup already exists")
+
+    # Newest snapshot that still has its folder and manifest
+    backups = _load_code_backup_index()
+    previous, prev_files = None, {}
+    for entry in reversed(backups):
+        candidate = CODE_BACKUP_DIR / entry["name"]
+        prev_files = _load_code_manifest(entry["name"]) if candidate.is_dir() else {}
+        if prev_files:
+            previous = candidate
+            break
+
+    try:
+        files, copied, linked = _snapshot_code(base_dir, backup_dir, previous, prev_files)
+    except Exception:
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        raise
+    CODE_BACKUP_MANIFESTS.mkdir(parents=True, exist_ok=True)
+    (CODE_BACKUP_MANIFESTS / f"{folder_name}.json").write_text(json.dumps(files), encoding="utf-8")
+
+    created = now.strftime('%Y-%m-%d %H:%M:%S')
+    backups.append({
+        "name": folder_name, "description": description, "created": created,
+        "files": len(files), "copied": copied, "linked": linked,
+    })
+    _save_code_backup_index(backups)
+
+    # Log to project_logs.md
+    entry = f"## {folder_name} - {created}\n**Modifications/Features:** {description}\n\n"
+    with open(base_dir / "project_logs.md", "a", encoding="utf-8") as f:
+        f.write(entry)
+
+    return {"ok": True, "path": str(backup_dir), "folder_name": folder_name, "copied": copied, "linked": linked}
+
+
 @app.post("/api/backup-code")
 async def create_code_backup(req: BackupRequest):
     try:
-        base_dir = Path(__file__).parent
-        now = datetime.now()
-        # Custom format asked by user, or dynamic
-        folder_name = "Backup" + now.strftime("%d%b%Y_%I%M").lstrip("0") + now.strftime("%p").lower()
-
-        backups_root = base_dir / "Backup"
-        backups_root.mkdir(exist_ok=True)
-        backup_dir = backups_root / folder_name
-
-        if backup_dir.exists():
-            return JSONResponse({"error": "Backup already exists"}, status_code=400)
-
-        def ignore_patterns(d, contents):
-            # Ignore anything that looks like a story file or is unnecessary
-            ign = []
-            for c in contents:
-                if c in ("projects", "Story-Refined", "venv", ".git", ".gemini", "__pycache__", "node_modules"):
-                    ign.append(c)
-                elif "Backup" in c:
-                    ign.append(c)
-            return ign
-
-        shutil.copytree(str(base_dir), str(backup_dir), ignore=ignore_patterns)
-
-        # Log to project_logs.md
-        log_file = base_dir / "project_logs.md"
-        entry = f"## {folder_name} - {now.strftime('%Y-%m-%d %H:%M:%S')}\n**Modifications/Features:** {req.description}\n\n"
-
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(entry)
-
-        return {"ok": True, "path": str(backup_dir), "folder_name": folder_name}
+        return await asyncio.to_thread(_create_code_backup, req.description)
+    except FileExistsError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1221,40 +2364,10 @@ async def create_code_backup(req: BackupRequest):
 @app.get("/api/backups")
 async def get_backups():
     try:
-        base_dir = Path(__file__).parent
-        log_file = base_dir / "project_logs.md"
-        if not log_file.exists():
-            return JSONResponse([])
-
-        content = log_file.read_text(encoding="utf-8")
-        backups = []
-
-        # Super simple parser
-        sections = content.split("## ")
-        for sec in sections:
-            sec = sec.strip()
-            if not sec:
-                continue
-            lines = sec.split("\n")
-            header = lines[0].strip()
-            if not header.startswith("Backup"):
-                continue # Only parse backup sections
-
-            desc = ""
-            for line in lines[1:]:
-                if line.startswith("**Modifications/Features:**"):
-                    desc = line.replace("**Modifications/Features:**", "").strip()
-                    break
-
-            folder_name = header.split(" - ")[0] if " - " in header else header
-            backup_path = str(base_dir / "Backup" / folder_name)
-
-            backups.append({
-                "name": folder_name,
-                "description": desc,
-                "path": backup_path
-            })
-
+        backups = [
+            {"name": b["name"], "description": b.get("description", ""), "path": str(CODE_BACKUP_DIR / b["name"])}
+            for b in _load_code_backup_index()
+        ]
         # Return newest first
         backups.reverse()
         return JSONResponse(backups)
@@ -1290,8 +2403,11 @@ async def save_notion_token(request: Request):
     body = await request.json()
     token = body.get("token", "").strip()
 
+    previous = os.environ.get("NOTION_INTEGRATION_TOKEN")
     os.environ["NOTION_INTEGRATION_TOKEN"] = token
     _write_env("NOTION_INTEGRATION_TOKEN", token)
+    if previous and previous != token:
+        await notion_sync.close_notion_client(previous)
     return {"status": "ok"}
 
 @app.get("/api/notion/mapping")
@@ -1301,12 +2417,20 @@ async def get_notion_mapping(project: str):
 
 @app.post("/api/notion/tree")
 async def post_notion_tree(request: Request):
-    """Fetch recent pages from Notion."""
+    """
+    Page tree for the picker: cursor-paginated, optionally filtered by title,
+    served from a per-token cache. Body: token, query, cursor, limit, refresh.
+    """
     body = await request.json()
     token = body.get("token")
     try:
-        tree = await notion_sync.fetch_notion_tree(api_key=token)
-        return tree
+        return await notion_sync.fetch_notion_tree(
+            api_key=token,
+            query=body.get("query", ""),
+            cursor=body.get("cursor"),
+            limit=body.get("limit", 100),
+            refresh=bool(body.get("refresh")),
+        )
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
@@ -1320,7 +2444,9 @@ async def post_notion_pull(request: Request):
     project_name = body.get("project_name", "default")
 
     try:
-        content = await notion_sync.pull_page_markdown(page_id, api_key=token)
+        content = await notion_sync.pull_page_markdown(
+            page_id, api_key=token, project_name=project_name
+        )
 
         if save_path:
             # Write to disk and register mapping
@@ -1328,6 +2454,7 @@ async def post_notion_pull(request: Request):
             target.parent.mkdir(parents=True, exist_ok=True)
             target.write_text(content, encoding="utf-8")
             notion_sync.set_page_mapping(project_name, save_path, page_id)
+            await notion_sync.mark_synced(project_name, save_path, page_id, content, api_key=token)
             return {"ok": True, "path": save_path, "content": content}
 
         return {"content": content}
@@ -1357,7 +2484,7 @@ async def post_notion_pull_stream(request: Request):
         try:
             print(f"[Notion/Stream] Starting chunked pull for page {page_id}")
             content = await notion_sync.pull_page_markdown_chunked(
-                page_id, api_key=token, on_progress=_on_progress
+                page_id, api_key=token, on_progress=_on_progress, project_name=project_name
             )
             print(f"[Notion/Stream] Pull complete, content length: {len(content)}")
             await progress_queue.put({"status": "complete", "content": content})
@@ -1414,6 +2541,7 @@ async def post_notion_pull_stream(request: Request):
                         "data": json.dumps({
                             "status": "done",
                             "total_blocks": info.get("total_blocks", 0),
+                            "cached": info.get("cached", False),
                         }),
                     }
                 elif status == "complete":
@@ -1424,6 +2552,7 @@ async def post_notion_pull_stream(request: Request):
                         target.parent.mkdir(parents=True, exist_ok=True)
                         target.write_text(content, encoding="utf-8")
                         notion_sync.set_page_mapping(project_name, save_path, page_id)
+                        await notion_sync.mark_synced(project_name, save_path, page_id, content, api_key=token)
 
                     yield {
                         "event": "complete",
@@ -1469,10 +2598,122 @@ async def post_notion_push(request: Request):
         await notion_sync.push_markdown_to_page(page_id, content, api_key=token)
         if file_path:
             notion_sync.set_page_mapping(project_name, file_path, page_id)
+            await notion_sync.mark_synced(project_name, file_path, page_id, content, api_key=token)
         return {"ok": True}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+
+# ---------------------------------------------------------------------------
+# Notion project sync — one background job per project, shared SSE progress
+# ---------------------------------------------------------------------------
+_notion_sync_jobs: dict = {}   # project -> {"task": Task, "subscribers": set[Queue]}
+
+
+def _start_notion_sync(project_name: str, token: str = None, restart: bool = False) -> dict:
+    """Start (or return the running) sync job for a project."""
+    job = _notion_sync_jobs.get(project_name)
+    if job and not job["task"].done():
+        return job
+
+    job = {"subscribers": set()}
+
+    async def _broadcast(info: dict):
+        for q in list(job["subscribers"]):
+            q.put_nowait(info)
+
+    async def _run():
+        try:
+            await notion_sync.sync_project(
+                project_name, _safe_path, api_key=token, on_progress=_broadcast, restart=restart
+            )
+        except Exception as exc:
+            print(f"[Notion/Sync] {project_name} failed: {exc}")
+            await _broadcast({"status": "error", "error": str(exc)})
+
+    job["task"] = asyncio.create_task(_run())
+    _notion_sync_jobs[project_name] = job
+    return job
+
+
+async def _resume_notion_syncs():
+    """Resume project sync queues interrupted by a restart (needs the .env token)."""
+    if not (os.getenv("NOTION_INTEGRATION_TOKEN") or os.getenv("NOTION_TOKEN")):
+        return
+    # Import the Notion stack off the event loop so startup isn't held up
+    if isinstance(notion_sync, _LazyModule):
+        await asyncio.to_thread(notion_sync._load)
+    if not notion_sync.get_notion_client():
+        return
+    for queue_file in notion_sync.PROJECTS_DIR.glob("*/.notion_sync_queue.json"):
+        project_name = queue_file.parent.name
+        queue = notion_sync.load_sync_queue(project_name)
+        if any(i.get("status") == "pending" for i in queue.get("items", [])):
+            print(f"[Notion/Sync] Resuming interrupted sync for {project_name}")
+            _start_notion_sync(project_name)
+
+
+@app.post("/api/notion/sync")
+async def post_notion_sync(request: Request):
+    """
+    Sync every mapped file of a project (pull/push/skip per file) and stream
+    progress via Server-Sent Events. The job keeps running if the client
+    disconnects; posting again re-attaches to it.
+    """
+    body = await request.json()
+    token = body.get("token")
+    project_name = body.get("project_name", "default")
+    restart = bool(body.get("restart"))
+
+    job = _start_notion_sync(project_name, token, restart)
+    progress_queue: asyncio.Queue = asyncio.Queue()
+    job["subscribers"].add(progress_queue)
+
+    async def event_stream():
+        try:
+            yield {
+                "event": "progress",
+                "data": json.dumps({
+                    "status": "attached",
+                    **notion_sync.sync_queue_summary(notion_sync.load_sync_queue(project_name)),
+                }),
+            }
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    info = await asyncio.wait_for(progress_queue.get(), timeout=1.5)
+                except asyncio.TimeoutError:
+                    if job["task"].done() and progress_queue.empty():
+                        break
+                    yield {"event": "ping", "data": json.dumps({"status": "ping"})}
+                    continue
+
+                status = info.get("status")
+                if status == "complete":
+                    yield {"event": "complete", "data": json.dumps(info)}
+                    break
+                if status == "error":
+                    yield {"event": "error", "data": json.dumps(info)}
+                    break
+                yield {"event": "progress", "data": json.dumps(info)}
+        finally:
+            job["subscribers"].discard(progress_queue)
+
+    return EventSourceResponse(event_stream())
+
+
+@app.get("/api/notion/sync/status")
+async def get_notion_sync_status(project: str = "default"):
+    """Queue summary and per-file results of the project's latest sync job."""
+    queue = notion_sync.load_sync_queue(project)
+    job = _notion_sync_jobs.get(project)
+    return {
+        **notion_sync.sync_queue_summary(queue),
+        "running": bool(job and not job["task"].done()),
+        "items": queue.get("items", []),
+    }
+
 # ---------------------------------------------------------------------------
 # Static files — serve the frontend
 # ---------------------------------------------------------------------------
@@ -1485,7 +2726,25 @@ async def index():
     return FileResponse(PUBLIC_DIR / "index.html")
 
 
-app.mount("/projects", StaticFiles(directory=PROJECTS_DIR), name="projects")
+@app.api_route("/projects/{rel:path}", methods=["GET", "HEAD"])
+async def serve_project_file(rel: str, request: Request):
+    """
+    Raw project files (assets, cached audio) with ETag/Last-Modified, so
+    repeat loads are conditional GETs answered with 304. Follows the current
+    PROJECTS_DIR, including after the root folder is changed.
+    """
+    try:
+        path = _safe_path(rel)
+    except ValueError:
+        return JSONResponse({"error": "Invalid path"}, status_code=400)
+    if not path.is_file():
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return _conditional_file_response(request, path, etag, media_type)
+
+
 app.mount("/", StaticFiles(directory="public", html=True), name="public")
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,263 @@
+"""Tests for notion_sync's incremental push planning."""
+import asyncio
+import itertools
+import random
+
+import pytest
+
+import notion_sync as ns
+
+
+def _blocks(*lines):
+    """Converted blocks for Markdown lines, one line at a time."""
+    return [b for line in lines for b in ns._markdown_to_notion_blocks(line)]
+
+
+def _fetched(*lines):
+    """Blocks as they would come back from Notion (with ids)."""
+    return [{**b, "id": f"old{i}", "has_children": False} for i, b in enumerate(_blocks(*lines))]
+
+
+def _replay(old_blocks, new_blocks):
+    """Apply a push plan to an in-memory page the way push_markdown_to_page does."""
+    updates, inserts, deletes = ns._plan_push(old_blocks, new_blocks)
+    page = [dict(b) for b in old_blocks]
+    ids = itertools.count()
+    for anchor, run in inserts:
+        for i in range(0, len(run), ns.PUSH_BATCH_SIZE):
+            created = [{**b, "id": f"new{next(ids)}"} for b in run[i:i + ns.PUSH_BATCH_SIZE]]
+            if anchor is None:
+                pos = len(page)
+            else:
+                pos = next(k for k, b in enumerate(page) if b["id"] == anchor) + 1
+            page[pos:pos] = created
+            if anchor and created:
+                anchor = created[-1]["id"]
+    updated = dict(updates)
+    page = [{**updated[b["id"]], "id": b["id"]} if b["id"] in updated else b for b in page]
+    return [b for b in page if b["id"] not in set(deletes)], deletes
+
+
+def _signatures(blocks):
+    return [ns._block_signature({k: v for k, v in b.items() if k != "id"}) for b in blocks]
+
+
+def test_runs_sharing_an_anchor_keep_document_order():
+    old = _fetched("# H1")
+    new = _blocks("delta1", "# H1", "> q2")
+    page, _ = _replay(old, new)
+    assert _signatures(page) == _signatures(new)
+
+
+@pytest.mark.parametrize("seed", range(3000))
+def test_replayed_plan_matches_target(seed):
+    rng = random.Random(seed)
+    vocab = ["# H1", "## H2", "para a", "para b", "**bold** c", "- item", "1. one",
+             "> quote", "---", "- [ ] todo", "- [x] done", "```py\nx = 1\n```"]
+    old_lines = [rng.choice(vocab) for _ in range(rng.randint(0, 8))]
+    new_lines = [rng.choice(vocab) for _ in range(rng.randint(0, 8))]
+    old, new = _fetched(*old_lines), _blocks(*new_lines)
+    page, _ = _replay(old, new)
+    assert _signatures(page) == _signatures(new)
+
+
+def test_unrepresentable_blocks_are_never_deleted():
+    old = _fetched("intro", "old text")
+    image = {"id": "img", "type": "image", "image": {"type": "external"}, "has_children": False}
+    sub_page = {"id": "sub", "type": "child_page", "child_page": {"title": "Notes"}, "has_children": True}
+    old = [old[0], image, sub_page, old[1]]
+    new = _blocks("new intro", "## Notes", "new text")
+
+    page, deletes = _replay(old, new)
+    assert "img" not in deletes and "sub" not in deletes
+    assert [b["id"] for b in page].count("img") == 1
+    assert [b["id"] for b in page].count("sub") == 1
+    # The sub-page stands in for its pulled "## Notes" heading
+    assert _signatures([b for b in page if b["id"] != "img"]) == _signatures(new)
+
+
+def test_fixed_first_block_takes_head_inserts_after_it():
+    sub_page = {"id": "sub", "type": "child_page", "child_page": {"title": "Notes"}, "has_children": True}
+    old = [{"id": "img", "type": "image", "image": {}, "has_children": False}, sub_page]
+    new = _blocks("first", "## Notes")
+    page, deletes = _replay(old, new)
+    assert deletes == []
+    assert [b["id"] for b in page][0] == "img"
+    assert _signatures(page[1:]) == _signatures(new)
+
+
+
+def _rich(text):
+    return [{"type": "text", "text": {"content": text}, "plain_text": text}]
+
+
+def _pulled_page():
+    """Top-level blocks as a pull leaves them: nested content under "children"."""
+    return [
+        {"id": "h", "type": "heading_1", "heading_1": {"rich_text": _rich("Title")}, "has_children": False},
+        {"id": "sub", "type": "child_page", "child_page": {"title": "Sub"}, "has_children": True,
+         "children": [{"id": "sb", "type": "paragraph", "paragraph": {"rich_text": _rich("Sub body")},
+                       "has_children": False}]},
+        {"id": "tbl", "type": "table", "table": {"table_width": 2, "has_column_header": False},
+         "has_children": True,
+         "children": [{"id": "row", "type": "table_row", "table_row": {"cells": [_rich("a"), _rich("b")]},
+                       "has_children": False}]},
+        {"id": "list", "type": "bulleted_list_item", "bulleted_list_item": {"rich_text": _rich("parent")},
+         "has_children": True,
+         "children": [{"id": "kid", "type": "bulleted_list_item",
+                       "bulleted_list_item": {"rich_text": _rich("child")}, "has_children": False}]},
+        {"id": "cols", "type": "column_list", "column_list": {}, "has_children": True,
+         "children": [{"id": "col", "type": "column", "column": {}, "has_children": True,
+                       "children": [{"id": "cp", "type": "paragraph",
+                                     "paragraph": {"rich_text": _rich("in a column")},
+                                     "has_children": False}]}]},
+        {"id": "end", "type": "paragraph", "paragraph": {"rich_text": _rich("The end")}, "has_children": False},
+    ]
+
+
+def test_pushing_an_unchanged_pull_changes_nothing():
+    old = _pulled_page()
+    new = ns._markdown_to_notion_blocks(ns.blocks_to_markdown(old))
+    assert ns._plan_push(old, new) == ([], [], [])
+
+
+def test_edits_around_nested_blocks_leave_them_alone():
+    old = _pulled_page()
+    md = (ns.blocks_to_markdown(old).replace("The end", "The new end")
+          .replace("- parent", "between\n- parent"))
+    updates, inserts, deletes = ns._plan_push(old, ns._markdown_to_notion_blocks(md))
+    assert [bid for bid, _ in updates] == ["end"]
+    assert [(anchor, _signatures(run)) for anchor, run in inserts] == [("tbl", _signatures(_blocks("between")))]
+    assert deletes == []
+
+
+def test_edited_nested_list_is_replaced():
+    old = _pulled_page()
+    md = ns.blocks_to_markdown(old).replace("  - child", "  - changed child")
+    updates, inserts, deletes = ns._plan_push(old, ns._markdown_to_notion_blocks(md))
+    assert deletes == ["list"]
+    assert [_signatures(run) for _, run in inserts] == [_signatures(_blocks("- parent", "- changed child"))]
+
+
+# Markdown in the form blocks_to_markdown writes it, so a round trip is exact
+_WORDS = ["alpha", "beta", "gamma", "delta", "Echo", "fox", "g7", "hotel"]
+_STYLES = ["{}", "**{}**", "*{}*", "~~{}~~", "`{}`", "***{}***", "**~~{}~~**",
+           "[{}](https://example.com/p?q=1)", "[**{}**](https://example.com/b)"]
+
+
+def _inline(rng, long=False):
+    segments = []
+    for _ in range(rng.randint(1, 5)):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3)))
+        if long and rng.random() < 0.3:
+            words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(300, 900)))
+        segments.append(rng.choice(_STYLES).format(words))
+    return " ".join(segments)
+
+
+def _markdown_doc(rng):
+    lines, last = [], None
+    for _ in range(rng.randint(1, 12)):
+        kind = rng.choice(["h1", "h2", "h3", "p", "bullet", "number", "todo", "done",
+                           "quote", "divider", "code"])
+        if kind == "quote" and last == "quote":
+            kind = "p"  # consecutive quote lines are one block
+        text = _inline(rng, long=kind in ("p", "quote"))
+        if kind == "code":
+            lang = rng.choice(["", "python", "javascript"])
+            body = ["x = **not bold**", "# not a heading", "- [ ] not a todo", "    indented"]
+            if rng.random() < 0.3:
+                body.append("y" * rng.randint(2000, 4500))
+            lines += [f"```{lang}", *rng.sample(body, rng.randint(1, len(body))), "```"]
+        elif kind == "quote":
+            lines += [f"> {_inline(rng)}" for _ in range(rng.randint(0, 2))] + [f"> {text}"]
+        else:
+            lines.append({"h1": "# {}", "h2": "## {}", "h3": "### {}", "p": "{}",
+                          "bullet": "- {}", "number": "1. {}", "todo": "- [ ] {}",
+                          "done": "- [x] {}", "divider": "---"}[kind].format(text))
+        last = kind
+    return "\n".join(lines)
+
+
+def _rich_texts(blocks):
+    return [b[b["type"]].get("rich_text", []) for b in blocks]
+
+
+@pytest.mark.parametrize("seed", range(500))
+def test_markdown_round_trip(seed):
+    md = _markdown_doc(random.Random(seed))
+    blocks = ns._markdown_to_notion_blocks(md)
+    assert ns.blocks_to_markdown(blocks) == md
+    assert _signatures(ns._markdown_to_notion_blocks(ns.blocks_to_markdown(blocks))) == _signatures(blocks)
+    for rich in _rich_texts(blocks):
+        assert len(rich) <= ns.MAX_RICH_TEXT_ITEMS
+        assert all(len(r["text"]["content"]) <= ns.MAX_RICH_TEXT_LEN for r in rich)
+
+
+def test_long_runs_are_split_and_rejoined():
+    md = "**" + "b" * 4500 + "** and " + "`" + "c" * 2001 + "`"
+    [block] = ns._markdown_to_notion_blocks(md)
+    rich = block["paragraph"]["rich_text"]
+    assert [len(r["text"]["content"]) for r in rich] == [2000, 2000, 500, 5, 2000, 1]
+    assert ns.blocks_to_markdown([block]) == md
+
+
+def test_todos_are_not_parsed_as_bullets():
+    blocks = ns._markdown_to_notion_blocks("- [ ] open\n- [x] closed\n- [X] upper\n- [ ]\n- plain [ ]")
+    assert [(b["type"], b[b["type"]].get("checked")) for b in blocks] == [
+        ("to_do", False), ("to_do", True), ("to_do", True), ("to_do", False),
+        ("bulleted_list_item", None),
+    ]
+    assert ns.blocks_to_markdown(blocks[:2]) == "- [ ] open\n- [x] closed"
+
+
+class _FakePages:
+    def __init__(self, edited):
+        self.edited = edited
+
+    async def retrieve(self, page_id):
+        return {"id": page_id, "last_edited_time": self.edited[page_id]}
+
+
+class _FakeNotion:
+    def __init__(self, edited):
+        self.pages = _FakePages(edited)
+
+
+def _cache_with(tmp_path, monkeypatch, project="p"):
+    monkeypatch.setattr(ns, "PROJECTS_DIR", tmp_path)
+    return ns._PullCache(project)
+
+
+def test_cache_is_stale_when_a_nested_child_page_changed(tmp_path, monkeypatch):
+    t0 = "2024-01-01T10:00:00.000Z"
+    sub = {"id": "sub", "type": "child_page", "child_page": {"title": "Notes"}, "has_children": True}
+    toggle = {"id": "tog", "type": "toggle", "toggle": {"rich_text": []}, "has_children": True,
+              "children": [sub]}
+    cache = _cache_with(tmp_path, monkeypatch)
+    cache.record("root", t0, [toggle], "root md", pulled_at=ns._edited_ts(t0) + 120)
+    cache.record("sub", t0, [], "sub md", pulled_at=ns._edited_ts(t0) + 120)
+    assert cache.pages["root"]["subpages"] == ["sub"]
+
+    sem = asyncio.Semaphore(4)
+    notion = _FakeNotion({"sub": t0})
+    assert asyncio.run(cache.fresh(notion, "root", t0, "tok", sem)) is not None
+    notion.pages.edited["sub"] = "2024-01-02T10:00:00.000Z"
+    assert asyncio.run(cache.fresh(notion, "root", t0, "tok", sem)) is None
+
+
+def test_concurrent_pull_caches_merge_on_save(tmp_path, monkeypatch):
+    t0 = "2024-01-01T10:00:00.000Z"
+    a, b = _cache_with(tmp_path, monkeypatch), _cache_with(tmp_path, monkeypatch)
+    a.record("page-a", t0, [], "a", pulled_at=0)
+    b.record("page-b", t0, [], "b", pulled_at=0)
+    a.save()
+    b.save()
+    assert set(ns.load_block_cache("p")) == {"page-a", "page-b"}
+
+
+def test_sync_state_updates_merge(tmp_path, monkeypatch):
+    monkeypatch.setattr(ns, "PROJECTS_DIR", tmp_path)
+    ns.update_sync_state("p", {"manual.md": {"local_hash": "m", "remote_edited": "t1"}})
+    ns.update_sync_state("p", {"job.md": {"local_hash": "j", "remote_edited": "t2"}})
+    assert set(ns.load_sync_state("p")) == {"manual.md", "job.md"}
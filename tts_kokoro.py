@@ -4,10 +4,15 @@ import re
 import asyncio
 import tempfile
 import threading
+import time
 import warnings
+import wave
 import queue as queue_mod
 import numpy as np
+from bisect import bisect_right
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import NamedTuple
 
 # Suppress noisy library warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -92,11 +97,38 @@ DEFAULT_VOICE = "af_heart"
 SAMPLE_RATE = 24000
 MAX_CHUNK_LEN = 1500  # Characters per internal chunk to avoid model lag
 
+# Model weights and voices are pinned to tts_models/ so loads never hit the hub
+# once the files are there (each one is downloaded on first use only).
+REPO_ID = "hexgrad/Kokoro-82M"
+MODEL_DIR = Path(__file__).parent / "tts_models" / "kokoro"
+MODEL_FILES = ("config.json", "kokoro-v1_0.pth")
+
 # ---------------------------------------------------------------------------
 # Module-level state
 # ---------------------------------------------------------------------------
 _pipeline = None
 _pipeline_lock = asyncio.Lock()
+_model_state = {"state": "cold", "error": None, "load_seconds": None}
+_interactive_waiting = 0    # interactive requests queued on _pipeline_lock
+
+
+class TTSPreempted(Exception):
+    """A background render gave way to an interactive request."""
+
+
+@asynccontextmanager
+async def _interactive_lock():
+    """Hold _pipeline_lock for a user request, flagging it to background renders."""
+    global _interactive_waiting
+    _interactive_waiting += 1
+    try:
+        await _pipeline_lock.acquire()
+    finally:
+        _interactive_waiting -= 1
+    try:
+        yield
+    finally:
+        _pipeline_lock.release()
 
 
 def _get_lang_code(voice: str) -> str:
@@ -107,25 +139,163 @@ def _get_lang_code(voice: str) -> str:
     return 'a'
 
 
+# Single-pass markdown/HTML scrubber. The lookahead rejects ordinary text
+# cheaply; the alternatives are tried only where a match can start.
+_CLEAN_RE = re.compile(
+    r'(?=[^\w "$%&\'(),./:;=?@^{}+\])]|_| \s)'
+    r'(?:!\[[^\]]*\]\([^)]+\)'                # image ![alt](url)     -> dropped
+    r'|\[(?P<link>[^\]]+)\]\([^)]+\)'         # link [text](url)      -> text
+    r'|</?[A-Za-z!][^>]*>'                    # HTML tag              -> dropped
+    r'|[#*_~`>|-]+'                           # markdown punctuation  -> dropped
+    r'|(?P<space> \s+|[^\S ]\s*)'             # other whitespace runs -> one space
+    r'|(?P<other>[^\w\s!-~]+))'               # non-ASCII symbols     -> kept if printable
+)
+# A sentence: text up to and including a run of . ! ? (or the trimmed tail).
+_SENTENCE_RE = re.compile(r'(?:[^\s.!?][^.!?]*)?[.!?]+|[^\s.!?](?:[^.!?]*[^\s.!?])?')
+
+
+class TextChunk(NamedTuple):
+    """One piece of cleaned text plus the span it came from in the source."""
+    text: str
+    start: int   # offset of the chunk's first character in the original text
+    end: int     # offset just past the chunk's last character in the original text
+    offset: int  # offset of the chunk within the cleaned text
+
+
+class PreparedText(NamedTuple):
+    """Cleaned text and its model-sized chunks, computed once per request."""
+    text: str
+    chunks: list[TextChunk]
+    clean_at: list[int]  # anchors from _normalize, used by to_source()
+    src_at: list[int]
+
+    def to_source(self, pos: int) -> int:
+        """Map an offset in the cleaned text back to the original text."""
+        return _to_source(pos, self.clean_at, self.src_at)
+
+
+def _normalize(source: str) -> tuple[str, list[int], list[int]]:
+    """
+    Clean ``source`` in one regex pass. Returns the cleaned text and two
+    parallel anchor lists: cleaned offset ``clean_at[i]`` corresponds to
+    source offset ``src_at[i]``, and characters copy 1:1 until the next anchor.
+    """
+    parts = []
+    clean_at = []
+    src_at = []
+    length = 0
+    last_space = True  # swallow leading whitespace
+
+    def emit(piece, src_pos):
+        nonlocal length, last_space
+        if last_space and piece[:1] == " ":
+            piece = piece[1:]
+            src_pos += 1
+        if not piece:
+            return
+        clean_at.append(length)
+        src_at.append(src_pos)
+        parts.append(piece)
+        length += len(piece)
+        last_space = piece[-1] == " "
+
+    def scan(pos, endpos):
+        for m in _CLEAN_RE.finditer(source, pos, endpos):
+            start = m.start()
+            if start > pos:
+                emit(source[pos:start], pos)
+            kind = m.lastgroup
+            if kind == "space":
+                emit(" ", start)
+            elif kind == "link":
+                # Link text may itself contain markdown or odd whitespace
+                scan(m.start("link"), m.end("link"))
+            elif kind == "other":
+                symbols = m.group()
+                if symbols.isprintable():
+                    emit(symbols, start)
+                else:
+                    for i, c in enumerate(symbols, start):
+                        if c.isprintable():
+                            emit(c, i)
+            pos = m.end()
+        if pos < endpos:
+            emit(source[pos:endpos], pos)
+
+    scan(0, len(source))
+    text = "".join(parts)
+    if text.endswith(" "):
+        text = text[:-1]
+    return text, clean_at, src_at
+
+
+def _to_source(pos: int, clean_at: list[int], src_at: list[int]) -> int:
+    """Map an offset in cleaned text back to the original text."""
+    i = bisect_right(clean_at, pos) - 1
+    if i < 0:
+        return 0
+    return src_at[i] + (pos - clean_at[i])
+
+
+def _sentence_spans(text: str) -> list[tuple[int, int]]:
+    """Spans of sentences (text up to and including . ! ?), trimmed of whitespace."""
+    return [m.span() for m in _SENTENCE_RE.finditer(text)]
+
+
+def _chunk_spans(text: str, max_len: int) -> list[tuple[int, int]]:
+    """
+    Group sentence spans into chunks shorter than ``max_len``. A sentence
+    that is too long on its own is hard-split into ``max_len`` slices.
+    """
+    chunks = []
+    cur = None  # (start, end) of the chunk being built
+    for start, end in _sentence_spans(text):
+        size = end - start
+        cur_size = cur[1] - cur[0] if cur else 0
+        if cur_size + size < max_len:
+            cur = (cur[0], end) if cur else (start, end)
+            continue
+        if cur:
+            chunks.append(cur)
+        if size > max_len:
+            chunks.extend((j, min(j + max_len, end)) for j in range(start, end, max_len))
+            cur = None
+        else:
+            cur = (start, end)
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def prepare_text_for_tts(text: str, max_len: int = MAX_CHUNK_LEN) -> PreparedText:
+    """
+    Clean ``text`` and split it into model-sized chunks in one go. Each chunk
+    carries its span in the original text, so audio can be mapped back to the
+    document. Pass the result to generate_full/generate_stream to avoid
+    cleaning the same text again.
+    """
+    if not text:
+        return PreparedText("", [], [], [])
+    cleaned, clean_at, src_at = _normalize(text)
+    chunks = [
+        TextChunk(
+            cleaned[start:end],
+            _to_source(start, clean_at, src_at),
+            _to_source(end - 1, clean_at, src_at) + 1,
+            start,
+        )
+        for start, end in _chunk_spans(cleaned, max_len)
+    ]
+    return PreparedText(cleaned, chunks, clean_at, src_at)
+
+
 def clean_text_for_tts(text: str) -> str:
     """
     Remove markdown, HTML, and garbage. Keep common punctuation.
     """
     if not text:
         return ""
-    # 1. Remove Markdown links [text](url) -> text
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    # 2. Remove Markdown image tags ![alt](url) -> ""
-    text = re.sub(r'!\[[^\]]*\]\([^\)]+\)', '', text)
-    # 3. Remove most Markdown formatting
-    text = re.sub(r'[#*_~`>|-]', '', text)
-    # 4. Remove HTML-like tags
-    text = re.sub(r'<[^>]+>', '', text)
-    # 5. Remove problematic non-printable or control characters
-    text = "".join(c for c in text if c.isprintable() or c in "\n ")
-    # 6. Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    return _normalize(text)[0]
 
 
 def split_text_into_chunks(text: str, max_len: int = MAX_CHUNK_LEN) -> list:
@@ -135,38 +305,28 @@ def split_text_into_chunks(text: str, max_len: int = MAX_CHUNK_LEN) -> list:
     """
     if not text:
         return []
+    return [text[start:end] for start, end in _chunk_spans(text, max_len)]
 
-    # Split by simple punctuation to preserve meaning
-    raw_pieces = re.split(r'([.!?]+)', text)
-    chunks = []
-    current_chunk = ""
 
-    for i in range(0, len(raw_pieces), 2):
-        sentence = raw_pieces[i]
-        punct = raw_pieces[i+1] if i+1 < len(raw_pieces) else ""
-        full_sentence = (sentence + punct).strip()
+def _prepared(text) -> PreparedText:
+    return text if isinstance(text, PreparedText) else prepare_text_for_tts(text)
 
-        if not full_sentence:
-            continue
 
-        if len(current_chunk) + len(full_sentence) < max_len:
-            current_chunk += (" " if current_chunk else "") + full_sentence
-        else:
-            if current_chunk:
-                chunks.append(current_chunk)
+def _local_model_file(name: str) -> str:
+    """Path of a repo file under MODEL_DIR, downloading it there the first time."""
+    path = MODEL_DIR / name
+    if not path.exists():
+        from huggingface_hub import hf_hub_download
+        print(f"[TTS/Kokoro] Downloading {name} to {MODEL_DIR}...")
+        hf_hub_download(repo_id=REPO_ID, filename=name, local_dir=MODEL_DIR)
+    return str(path)
 
-            # If a single sentence is still too long, hard split it
-            if len(full_sentence) > max_len:
-                for j in range(0, len(full_sentence), max_len):
-                    chunks.append(full_sentence[j:j+max_len])
-                current_chunk = ""
-            else:
-                current_chunk = full_sentence
 
-    if current_chunk:
-        chunks.append(current_chunk)
-
-    return chunks
+def _voice_ref(voice: str) -> str:
+    """Local .pt path for a voice id (KPipeline loads paths without the hub)."""
+    if voice.endswith(".pt"):
+        return voice
+    return _local_model_file(f"voices/{voice}.pt")
 
 
 def _init_pipeline_sync(lang_code: str = 'a'):
@@ -175,15 +335,42 @@ def _init_pipeline_sync(lang_code: str = 'a'):
         from kokoro import KPipeline
     if sf is None:
         import soundfile as sf
-    return KPipeline(lang_code=lang_code, repo_id='hexgrad/Kokoro-82M')
+    from kokoro import KModel
+    config, weights = (_local_model_file(name) for name in MODEL_FILES)
+    model = KModel(repo_id=REPO_ID, config=config, model=weights).eval()
+    return KPipeline(lang_code=lang_code, repo_id=REPO_ID, model=model)
 
 
-async def preload_model(lang_code='a'):
-    """Pre-load model without generating anything."""
+async def _load_pipeline(lang_code: str):
+    """Create the pipeline; the caller holds _pipeline_lock."""
     global _pipeline
+    _model_state.update(state="loading", error=None)
+    start = time.perf_counter()
+    try:
+        _pipeline = await asyncio.to_thread(_init_pipeline_sync, lang_code)
+    except Exception as e:
+        _model_state.update(state="error", error=str(e))
+        raise
+    _model_state.update(state="ready", load_seconds=round(time.perf_counter() - start, 2))
+
+
+async def preload_model(lang_code='a', voice: str = DEFAULT_VOICE):
+    """Pre-load model (and one voice) without generating anything."""
     async with _pipeline_lock:
         if _pipeline is None:
-            _pipeline = await asyncio.to_thread(_init_pipeline_sync, lang_code)
+            print(f"[TTS/Kokoro] Warming up model (lang={lang_code})...")
+            await _load_pipeline(lang_code)
+            await asyncio.to_thread(_pipeline.load_voice, _voice_ref(voice))
+
+
+def model_status() -> dict:
+    """Load state of the model: cold, loading, ready or error."""
+    return dict(_model_state)
+
+
+def is_busy() -> bool:
+    """True while a generation (or model load) holds the pipeline."""
+    return _pipeline_lock.locked()
 
 
 def _free_pipeline():
@@ -196,6 +383,7 @@ def _free_pipeline():
         except NameError:
             pass
         _pipeline = None
+        _model_state.update(state="cold", load_seconds=None)
 
         # If torch is available, clear cache
         try:
@@ -206,98 +394,251 @@ def _free_pipeline():
             pass
 
 
-async def generate_full(text: str, voice: str = DEFAULT_VOICE, speed: float = 1.0) -> bytes:
+# ---------------------------------------------------------------------------
+# Read-along timing
+# ---------------------------------------------------------------------------
+# Timing entries are [start_sample, end_sample, src_start, src_end]: an audio
+# range and the span of the *original* (uncleaned) text it speaks.
+ALIGN_WINDOW = 64  # how far past the previous word to look for the next one
+
+
+def _segment_words(result) -> list[tuple[str, float, float]]:
+    """Timed words of one Kokoro result. Only English pipelines provide them."""
+    tokens = getattr(result, "tokens", None) or []
+    return [
+        (t.text, t.start_ts, t.end_ts)
+        for t in tokens
+        if t.start_ts is not None and t.end_ts is not None and any(c.isalnum() for c in t.text)
+    ]
+
+
+def _align_segment(prepared: PreparedText, chunk: TextChunk, graphemes: str, words: list, cursor: int) -> tuple[dict, int]:
     """
-    Full audio generation with on-demand loading and text splitting.
+    Locate one model segment and its words inside ``chunk``, searching from
+    ``cursor`` (an offset into chunk.text). Returns the segment timing, with
+    word samples relative to the segment's own audio, and the new cursor.
     """
-    global _pipeline
-    text = clean_text_for_tts(text)
-    if not text:
-        raise ValueError("No text provided for TTS")
+    text = chunk.text
+    found = text.find(graphemes, cursor) if graphemes else -1
+    seg_start = found if found >= 0 else None
+    seg_end = found + len(graphemes) if found >= 0 else cursor
+
+    def span(start, end):
+        base = chunk.offset
+        return [prepared.to_source(base + start), prepared.to_source(base + end - 1) + 1]
+
+    located = []  # (chunk offset, word entry)
+    pos = seg_start if seg_start is not None else cursor
+    for word, start_ts, end_ts in words:
+        at = text.find(word, pos, pos + len(word) + ALIGN_WINDOW)
+        if at < 0:
+            continue  # the phonemizer rewrote this token; skip it
+        pos = at + len(word)
+        if seg_start is None:
+            seg_start = at
+        seg_end = max(seg_end, pos)
+        located.append((at, [round(start_ts * SAMPLE_RATE), round(end_ts * SAMPLE_RATE), *span(at, pos)]))
+
+    # A sentence runs from its first spoken word to its last one in this segment
+    sentences = []
+    i = 0
+    for start, end in _sentence_spans(text):
+        while i < len(located) and located[i][0] < start:
+            i += 1
+        j = i
+        while j < len(located) and located[j][0] < end:
+            j += 1
+        if j > i:
+            sentences.append([located[i][1][0], located[j - 1][1][1], *span(start, end)])
+        i = j
+
+    if seg_start is None:
+        seg_start = cursor
+    if seg_end > seg_start:
+        src = span(seg_start, seg_end)
+    else:
+        src = [prepared.to_source(chunk.offset + seg_start)] * 2
+    timing = {"src": src, "sentences": sentences, "words": [entry for _, entry in located]}
+    return timing, seg_end
+
+
+def _build_timing(seg_timings: list, seg_lengths: list) -> dict:
+    """Join per-segment timings into one track with absolute sample offsets."""
+    segments = []
+    sentences = []
+    words = []
+    base = 0
+    for timing, n in zip(seg_timings, seg_lengths):
+        segments.append([base, base + n, *timing["src"]])
+        sentences.extend([base + s, base + e, a, b] for s, e, a, b in timing["sentences"])
+        words.extend([base + s, base + e, a, b] for s, e, a, b in timing["words"])
+        base += n
+    if not sentences:
+        sentences = [list(seg) for seg in segments]  # No word timestamps (non-English voice)
+    return {
+        "sample_rate": SAMPLE_RATE,
+        "segments": segments,
+        "sentences": sentences,
+        "words": words,
+    }
+
+
+def split_timing(timing: dict) -> list[dict]:
+    """Per-segment view of a timing track, with samples relative to each segment."""
+    segments = timing.get("segments", [])
+    out = [{"src": [a, b], "sentences": [], "words": []} for _, _, a, b in segments]
+    for key in ("sentences", "words"):
+        entries = timing.get(key, [])
+        i = 0
+        for seg, (start, end, _, _) in zip(out, segments):
+            while i < len(entries) and entries[i][0] < end:
+                s, e, a, b = entries[i]
+                seg[key].append([s - start, e - start, a, b])
+                i += 1
+    return out
 
-    async with _pipeline_lock:
-        try:
-            if _pipeline is None:
-                lang = _get_lang_code(voice)
-                print(f"[TTS/Kokoro] Loading model (lang={lang}) for document ({len(text.split())} words)...")
-                _pipeline = await asyncio.to_thread(_init_pipeline_sync, lang)
 
-            # Split into chunks of sentences
-            text_chunks = split_text_into_chunks(text)
-            audio_chunks = []
+# ---------------------------------------------------------------------------
+# Generation
+# ---------------------------------------------------------------------------
+async def generate_full(text: "str | PreparedText", voice: str = DEFAULT_VOICE, speed: float = 1.0) -> bytes:
+    """
+    Full audio generation with on-demand loading and text splitting.
+    """
+    wav_bytes, _, _ = await generate_full_segmented(text, voice=voice, speed=speed)
+    return wav_bytes
 
-            for i, chunk in enumerate(text_chunks):
-                print(f"[TTS/Kokoro] Processing chunk {i+1}/{len(text_chunks)}")
-                audio = await asyncio.to_thread(_generate_single_chunk_sync, chunk, voice, speed)
-                if audio is not None and len(audio) > 0:
-                    audio_chunks.append(audio)
 
-            if not audio_chunks:
-                raise RuntimeError("No audio generated from chunks")
+async def generate_full_segmented(text: "str | PreparedText", voice: str = DEFAULT_VOICE, speed: float = 1.0,
+                                  background: bool = False) -> tuple[bytes, list[int], dict]:
+    """
+    Same as generate_full, but also returns the length (in samples) of every
+    audio segment the model produced, so a cached WAV can later be replayed
+    with the same chunking as a live stream, and the read-along timing track.
 
-            full_audio = np.concatenate(audio_chunks)
-            buf = io.BytesIO()
-            sf.write(buf, full_audio, SAMPLE_RATE, format='WAV')
-            buf.seek(0)
-            return buf.read()
-        except Exception as e:
-            print(f"[TTS/Kokoro] Generate error: {e}")
-            raise
+    With background=True the pipeline lock is taken per chunk rather than for
+    the whole document, and TTSPreempted is raised as soon as an interactive
+    request is waiting for it.
+    """
+    prepared = _prepared(text)
+    if not prepared.text:
+        raise ValueError("No text provided for TTS")
 
+    audio_chunks = []
+    seg_timings = []
 
-def _generate_single_chunk_sync(chunk: str, voice: str, speed: float):
-    """Internal synchronous helper for one piece of text."""
+    async def render(i: int, chunk: TextChunk):
+        global _pipeline
+        if _pipeline is None:
+            lang = _get_lang_code(voice)
+            print(f"[TTS/Kokoro] Loading model (lang={lang}) for document ({prepared.text.count(' ') + 1} words)...")
+            await _load_pipeline(lang)
+        print(f"[TTS/Kokoro] Processing chunk {i+1}/{len(prepared.chunks)}")
+        cursor = 0
+        for audio, graphemes, words in await asyncio.to_thread(_generate_single_chunk_sync, chunk.text, voice, speed):
+            timing, cursor = _align_segment(prepared, chunk, graphemes, words, cursor)
+            audio_chunks.append(audio)
+            seg_timings.append(timing)
+
+    try:
+        # Chunks of sentences, already split by prepare_text_for_tts
+        if background:
+            for i, chunk in enumerate(prepared.chunks):
+                if _interactive_waiting:
+                    raise TTSPreempted()
+                async with _pipeline_lock:
+                    if _interactive_waiting:
+                        raise TTSPreempted()
+                    await render(i, chunk)
+        else:
+            async with _interactive_lock():
+                for i, chunk in enumerate(prepared.chunks):
+                    await render(i, chunk)
+
+        if not audio_chunks:
+            raise RuntimeError("No audio generated from chunks")
+
+        seg_lengths = [len(a) for a in audio_chunks]
+        full_audio = np.concatenate(audio_chunks)
+        buf = io.BytesIO()
+        sf.write(buf, full_audio, SAMPLE_RATE, format='WAV')
+        buf.seek(0)
+        return buf.read(), seg_lengths, _build_timing(seg_timings, seg_lengths)
+    except TTSPreempted:
+        raise
+    except Exception as e:
+        print(f"[TTS/Kokoro] Generate error: {e}")
+        raise
+
+
+def _generate_single_chunk_sync(chunk: str, voice: str, speed: float) -> list:
+    """
+    Internal synchronous helper for one piece of text.
+    Returns (audio, graphemes, timed words) for every segment the model produced.
+    """
     global _pipeline
     if _pipeline is None:
-        return None
+        return []
 
     generator = _pipeline(
         chunk,
-        voice=voice,
+        voice=_voice_ref(voice),
         speed=speed,
         split_pattern=r'\n+'
     )
 
     sub_chunks = []
-    for _, (_, _, audio) in enumerate(generator):
+    for result in generator:
+        graphemes, _, audio = result
         if audio is not None and len(audio) > 0:
-            sub_chunks.append(audio)
+            sub_chunks.append((audio, graphemes, _segment_words(result)))
 
-    return np.concatenate(sub_chunks) if sub_chunks else None
+    return sub_chunks
 
 
-async def generate_stream(text: str, voice: str = DEFAULT_VOICE, speed: float = 1.0):
+async def generate_stream(text: "str | PreparedText", voice: str = DEFAULT_VOICE, speed: float = 1.0):
     """
     Streaming generation with splitting for stability and on-demand model lifecycle.
     """
+    async for wav_bytes, _ in generate_stream_timed(text, voice=voice, speed=speed):
+        yield wav_bytes
+
+
+async def generate_stream_timed(text: "str | PreparedText", voice: str = DEFAULT_VOICE, speed: float = 1.0):
+    """
+    Like generate_stream, but yields (wav_bytes, timing) pairs, where timing
+    holds the segment's source span and word entries relative to its audio.
+    """
     global _pipeline
-    text = clean_text_for_tts(text)
-    if not text:
+    prepared = _prepared(text)
+    if not prepared.text:
         return
 
-    async with _pipeline_lock:
+    async with _interactive_lock():
         try:
             if _pipeline is None:
                 lang = _get_lang_code(voice)
                 print(f"[TTS/Kokoro] Opening stream (lang={lang}) for document...")
-                _pipeline = await asyncio.to_thread(_init_pipeline_sync, lang)
+                await _load_pipeline(lang)
+            voice = await asyncio.to_thread(_voice_ref, voice)
 
-            text_chunks = split_text_into_chunks(text)
-
-            for i, chunk in enumerate(text_chunks):
+            for chunk in prepared.chunks:
                 generator = _pipeline(
-                    chunk,
-                    voice=voice,
+                    chunk.text,
+                    voice=_voice_ref(voice),
                     speed=speed,
                     split_pattern=r'\n+'
                 )
 
-                for _, (_, _, audio) in enumerate(generator):
+                cursor = 0
+                for result in generator:
+                    graphemes, _, audio = result
                     if audio is not None and len(audio) > 0:
+                        timing, cursor = _align_segment(prepared, chunk, graphemes, _segment_words(result), cursor)
                         buf = io.BytesIO()
                         sf.write(buf, audio, SAMPLE_RATE, format='WAV')
                         buf.seek(0)
-                        yield buf.read()
+                        yield buf.read(), timing
 
                 # Minimal sleep between chunks to stay responsive
                 await asyncio.sleep(0.01)
@@ -305,5 +646,29 @@ async def generate_stream(text: str, voice: str = DEFAULT_VOICE, speed: float =
             print(f"[TTS/Kokoro] Stream error: {e}")
 
 
+def iter_cached_segments(wav_path, segments: list | None = None, fallback_len: int = SAMPLE_RATE * 10):
+    """
+    Replay a cached WAV as a sequence of small, self-contained WAV files.
+    Frames are read from disk incrementally, one segment at a time, using the
+    stored segment lengths (in samples). Older caches without boundaries are
+    cut into fixed ``fallback_len`` pieces instead.
+    """
+    with wave.open(str(wav_path), "rb") as src:
+        params = src.getparams()
+        remaining = src.getnframes()
+        lengths = iter(segments or [])
+        while remaining > 0:
+            n = min(max(int(next(lengths, fallback_len)), 1), remaining)
+            frames = src.readframes(n)
+            if not frames:
+                break
+            buf = io.BytesIO()
+            with wave.open(buf, "wb") as dst:
+                dst.setparams(params)
+                dst.writeframes(frames)
+            remaining -= n
+            yield buf.getvalue()
+
+
 def get_voices() -> dict:
     return VOICES
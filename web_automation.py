@@ -1,5 +1,9 @@
 import asyncio
+import json
 import os
+import urllib.request
+from collections import deque
+from contextlib import asynccontextmanager
 from playwright.async_api import async_playwright, Page, BrowserContext
 
 import subprocess
@@ -7,113 +11,430 @@ import subprocess
 # Path for the persistent browser profile
 USER_DATA_DIR = os.path.join(os.getcwd(), ".gemini_profile")
 
+CDP_PORT = 9222
+# Use 127.0.0.1 instead of localhost to prevent IPv6 (::1) ECONNREFUSED errors
+CDP_URL = f"http://127.0.0.1:{CDP_PORT}"
+CDP_READY_TIMEOUT = 30       # seconds for a freshly launched Chrome to open the port
+CDP_PROBE_DELAY = 0.05       # first probe interval, doubled up to CDP_PROBE_MAX_DELAY
+CDP_PROBE_MAX_DELAY = 1.0
+
 _playwright = None
 _browser = None
 _page: Page = None
-_is_initializing = False
+_init_lock = asyncio.Lock()
+
+
+def _probe_cdp() -> dict | None:
+    """DevTools /json/version of a browser listening on CDP_PORT, or None."""
+    try:
+        with urllib.request.urlopen(f"{CDP_URL}/json/version", timeout=1) as resp:
+            return json.loads(resp.read())
+    except (OSError, ValueError):
+        return None
+
+
+async def _wait_for_cdp(timeout: float) -> dict:
+    """Probe the DevTools endpoint with exponential backoff until it answers."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = CDP_PROBE_DELAY
+    while True:
+        info = await asyncio.to_thread(_probe_cdp)
+        if info:
+            return info
+        if loop.time() + delay > deadline:
+            raise Exception(f"Chrome did not open the debugging port {CDP_PORT} within {timeout:g} s.")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, CDP_PROBE_MAX_DELAY)
+
+
+def _find_chrome() -> str:
+    paths = [
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        os.path.expandvars(r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe")
+    ]
+    for p in paths:
+        if os.path.exists(p):
+            return p
+    raise Exception("Chrome not found on this system.")
+
+
+def _kill_orphaned_chrome():
+    print("[WebAutomation] Cleaning up orphaned Chrome processes...")
+    if os.name == 'nt':
+        try:
+            subprocess.run(
+                ["powershell", "-Command", "Get-CimInstance Win32_Process | Where-Object { $_.Name -match 'chrome.exe' -and $_.CommandLine -match 'gemini_profile' } | Invoke-CimMethod -MethodName Terminate"],
+                capture_output=True, timeout=5
+            )
+        except:
+            pass
+
+
+def _on_browser_disconnected(browser):
+    global _browser, _page
+    if browser is _browser:
+        print("[WebAutomation] Browser disconnected.")
+        _browser = None
+        _page = None
+
 
 async def get_or_create_page() -> Page:
-    global _playwright, _browser, _page, _is_initializing
+    global _playwright, _browser, _page
 
     if _page and not _page.is_closed():
         return _page
 
-    if _is_initializing:
-        # Wait a bit if it's currently initializing
-        while _is_initializing:
-            await asyncio.sleep(0.5)
+    # One initializer at a time; later callers wait here and reuse its result
+    async with _init_lock:
         if _page and not _page.is_closed():
             return _page
 
-    _is_initializing = True
-    try:
-        print("[WebAutomation] Cleaning up orphaned Chrome processes...")
-        if os.name == 'nt':
-            try:
-                subprocess.run(
-                    ["powershell", "-Command", "Get-CimInstance Win32_Process | Where-Object { $_.Name -match 'chrome.exe' -and $_.CommandLine -match 'gemini_profile' } | Invoke-CimMethod -MethodName Terminate"],
-                    capture_output=True, timeout=5
-                )
-            except:
-                pass
-
-        if not _playwright:
-            _playwright = await async_playwright().start()
-
-        # Find Chrome path
-        paths = [
-            r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-            r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-            os.path.expandvars(r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe")
-        ]
-        chrome_path = None
-        for p in paths:
-            if os.path.exists(p):
-                chrome_path = p
-                break
-
-        if not chrome_path:
-            raise Exception("Chrome not found on this system.")
-
-        print("[WebAutomation] Launching real Chrome process natively...")
-        # Launch Chrome via subprocess to completely bypass Playwright's launch constraints
-        subprocess.Popen([
-            chrome_path,
-            f"--user-data-dir={USER_DATA_DIR}",
-            "--remote-debugging-port=9222",
-            "--no-first-run",
-            "--no-default-browser-check",
-            "https://gemini.google.com/app"
-        ])
-
-        # Wait for the browser to start and open the debugging port
-        print("[WebAutomation] Connecting Playwright to Chrome via CDP...")
-
-        max_retries = 10
-        for i in range(max_retries):
-            try:
-                # Use 127.0.0.1 instead of localhost to prevent IPv6 (::1) ECONNREFUSED errors
-                _browser = await _playwright.chromium.connect_over_cdp("http://127.0.0.1:9222")
-                break
-            except Exception as e:
-                if i == max_retries - 1:
-                    raise Exception(f"Failed to connect to Chrome CDP after {max_retries} retries: {str(e)}")
-                print(f"[WebAutomation] CDP not ready yet, retrying ({i+1}/{max_retries})...")
-                await asyncio.sleep(1.5)
+        if _browser is None or not _browser.is_connected():
+            info = await asyncio.to_thread(_probe_cdp)
+            if info:
+                print(f"[WebAutomation] Reusing debug browser on port {CDP_PORT} ({info.get('Browser', 'unknown')}).")
+            else:
+                await asyncio.to_thread(_kill_orphaned_chrome)
+                chrome_path = _find_chrome()
+
+                print("[WebAutomation] Launching real Chrome process natively...")
+                # Launch Chrome via subprocess to completely bypass Playwright's launch constraints
+                subprocess.Popen([
+                    chrome_path,
+                    f"--user-data-dir={USER_DATA_DIR}",
+                    f"--remote-debugging-port={CDP_PORT}",
+                    "--no-first-run",
+                    "--no-default-browser-check",
+                    # Pooled tabs stream in the background; don't throttle them
+                    "--disable-background-timer-throttling",
+                    "--disable-backgrounding-occluded-windows",
+                    "--disable-renderer-backgrounding",
+                    "https://gemini.google.com/app"
+                ])
+                info = await _wait_for_cdp(CDP_READY_TIMEOUT)
+
+            if not _playwright:
+                _playwright = await async_playwright().start()
+
+            print("[WebAutomation] Connecting Playwright to Chrome via CDP...")
+            _browser = await _playwright.chromium.connect_over_cdp(info.get("webSocketDebuggerUrl") or CDP_URL)
+            _browser.on("disconnected", _on_browser_disconnected)
 
         context = _browser.contexts[0]
-        pages = context.pages
-        if pages:
-            _page = pages[0]
-        else:
-            _page = await context.new_page()
+        pages = [p for p in context.pages if not p.is_closed()]
+        _page = pages[0] if pages else await context.new_page()
 
         print("[WebAutomation] Browser ready.")
         return _page
+
+
+# ---------------------------------------------------------------------------
+# Tab pool — each generation leases its own Gemini tab so concurrent requests
+# never type into the same textbox.
+# ---------------------------------------------------------------------------
+GEMINI_URL = "https://gemini.google.com/app"
+POOL_SIZE = max(1, int(os.getenv("WEB_AUTOMATION_TABS", "3")))
+MAX_WAITING = 8              # queued requests beyond this are rejected
+HEALTH_CHECK_TIMEOUT = 5     # seconds for a tab to answer between uses
+
+
+class WebAutomationBusy(Exception):
+    pass
+
+
+class _PagePool:
+    """Up to POOL_SIZE tabs in the CDP context, leased first come, first served."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._pages: list[Page] = []
+        self._idle: list[Page] = []
+        self._opening = 0    # slots reserved for tabs being opened
+        self._dirty: set[Page] = set()   # tabs to reset on release (see mark_dirty)
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> Page:
+        while True:
+            if self._idle:
+                page = self._idle.pop()
+            elif len(self._pages) + self._opening < self.size:
+                self._opening += 1
+                page = await self._open_reserved()
+            else:
+                page = await self._wait()
+                if page is None:
+                    page = await self._open_reserved()
+            try:
+                healthy = await self._healthy(page)
+            except BaseException:
+                self._discard(page)
+                self._hand_over(None)
+                raise
+            if healthy:
+                return page
+            self._discard(page)
+
+    def mark_dirty(self, page: Page):
+        """The tab's state is unknown (e.g. Gemini may still answer); reset it on release."""
+        self._dirty.add(page)
+
+    def release(self, page: Page, clean: bool = True):
+        """Return a tab; one left mid-generation (clean=False) is reset first."""
+        if page in self._dirty:
+            self._dirty.discard(page)
+            clean = False
+        if not clean and not page.is_closed():
+            asyncio.create_task(self._reset(page))
+            return
+        if page.is_closed():
+            self._discard(page)
+            page = None
+        self._hand_over(page)
+
+    async def _reset(self, page: Page):
+        """Navigate away from an abandoned generation so Gemini stops writing into the tab."""
+        try:
+            await asyncio.wait_for(page.goto(GEMINI_URL), HEALTH_CHECK_TIMEOUT * 3)
+        except Exception as e:
+            print(f"[WebAutomation] Dropping tab that could not be reset: {e}")
+            self._discard(page)
+            self._hand_over(None)
+            return
+        self.release(page)
+
+    async def _wait(self) -> Page | None:
+        """Queue for a tab; None means a slot was freed and reserved for us."""
+        if len(self._waiters) >= MAX_WAITING:
+            raise WebAutomationBusy(
+                f"All {self.size} browser tabs are busy and {MAX_WAITING} requests are already waiting."
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed over just as we were cancelled: pass it on
+                page = waiter.result()
+                if page is None:
+                    self._opening -= 1
+                self._hand_over(page)
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _hand_over(self, page: Page | None):
+        """Give a tab (or, for None, a freed slot) to the longest waiter."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                if page is None:
+                    self._opening += 1
+                waiter.set_result(page)
+                return
+        if page is not None:
+            self._idle.append(page)
+
+    async def _open_reserved(self) -> Page:
+        try:
+            page = await self._open_page()
+        except BaseException:
+            # The reserved slot is free again; let the next waiter try
+            self._opening -= 1
+            self._hand_over(None)
+            raise
+        self._opening -= 1
+        return page
+
+    async def _open_page(self) -> Page:
+        first = await get_or_create_page()
+        if first not in self._pages:
+            await _keep_page_active(first)
+            self._pages.append(first)
+            return first
+        page = await first.context.new_page()
+        try:
+            await _keep_page_active(page)
+            await page.goto(GEMINI_URL)
+        except BaseException:
+            asyncio.create_task(page.close())
+            raise
+        self._pages.append(page)
+        return page
+
+    async def _healthy(self, page: Page) -> bool:
+        if page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("() => document.readyState"), HEALTH_CHECK_TIMEOUT)
+            if not page.url.startswith(GEMINI_URL.rsplit("/", 1)[0]):
+                await page.goto(GEMINI_URL)
+            return True
+        except Exception as e:
+            print(f"[WebAutomation] Dropping unresponsive tab: {e}")
+            return False
+
+    def _discard(self, page: Page):
+        if page in self._pages:
+            self._pages.remove(page)
+        if not page.is_closed():
+            asyncio.create_task(page.close())
+
+
+_pool = _PagePool(POOL_SIZE)
+
+
+@asynccontextmanager
+async def lease_page():
+    """Exclusive use of one Gemini tab for the duration of the block."""
+    page = await _pool.acquire()
+    clean = False
+    try:
+        yield page
+        clean = True
     finally:
-        _is_initializing = False
+        # Left early (error, client gone): Gemini may still be generating
+        _pool.release(page, clean)
+
+
+# ---------------------------------------------------------------------------
+# Response streaming — a MutationObserver in the page pushes text deltas to
+# Python through an exposed binding instead of Python polling innerText.
+# ---------------------------------------------------------------------------
+STREAM_BINDING = "__novellicaStream"
+EDITOR_SELECTOR = "div[contenteditable='true'][role='textbox']"
+SEND_BUTTON_SELECTOR = "button[aria-label*='Send']:not([disabled]):not([aria-disabled='true'])"
+RESPONSE_SELECTOR = "message-content"
+# Gemini swaps the send button for a stop button while it is generating
+STOP_BUTTON_SELECTOR = "button[aria-label*='Stop']"
+
+FLUSH_MS = 50                # coalesce DOM mutations into at most one delta per interval
+FINISH_SETTLE_MS = 200       # wait before the final re-read once the stop button goes away
+START_TIMEOUT = 30           # seconds to wait for the response to begin
+GENERATING_IDLE_TIMEOUT = 60 # seconds without a delta while Gemini says it is generating
+FALLBACK_IDLE_TIMEOUT = 5    # idle end-of-response when no stop button was ever seen
+
+_streams: dict[str, asyncio.Queue] = {}
+_bound_contexts: list[BrowserContext] = []
+
+# No timers in here: Chrome throttles setTimeout in background tabs to about
+# once a second, and pooled tabs are mostly in the background. Deltas are
+# flushed from the observer callback itself once FLUSH_MS has elapsed, and
+# the end of a response is settled from Python (_FINISH_JS).
+_OBSERVER_JS = """
+({ id, binding, baseline, responseSel, stopSel, flushMs }) => {
+    const send = window[binding];
+    let sent = 0, sawStop = false, ended = false, finished = false, lastFlush = 0;
+
+    const responseNode = () => {
+        const nodes = document.querySelectorAll(responseSel);
+        return nodes.length > baseline ? nodes[nodes.length - 1] : null;
+    };
+    const takeDelta = () => {
+        const node = responseNode();
+        const text = node ? node.innerText : '';
+        const delta = text.length > sent ? text.slice(sent) : '';
+        sent = Math.max(sent, text.length);
+        return { node, delta };
+    };
+    const stop = () => {
+        finished = true;
+        observer.disconnect();
+        delete window.__novellicaStreams[id];
+    };
+    const finish = () => {
+        if (finished) return '';
+        const { delta } = takeDelta();
+        stop();
+        return delta;
+    };
+    const onMutation = () => {
+        if (finished || ended) return;
+        const generating = !!document.querySelector(stopSel);
+        const changed = generating !== sawStop;
+        const now = performance.now();
+        if (!changed && now - lastFlush < flushMs) return;
+        lastFlush = now;
+
+        const { node, delta } = takeDelta();
+        if (delta) send(id, 'delta', delta);
+        if (generating && !sawStop) {
+            sawStop = true;
+            send(id, 'generating', '');
+        } else if (!generating && sawStop && node) {
+            // Generation finished; Python re-reads the last render via finish()
+            ended = true;
+            send(id, 'ended', '');
+        }
+    };
+
+    const observer = new MutationObserver(onMutation);
+    observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+    window.__novellicaStreams = window.__novellicaStreams || {};
+    window.__novellicaStreams[id] = { stop, finish };
+    onMutation();
+}
+"""
+
+_FINISH_JS = "(id) => { const s = (window.__novellicaStreams || {})[id]; return s ? s.finish() : ''; }"
+_STOP_JS = "(id) => { const s = (window.__novellicaStreams || {})[id]; if (s) s.stop(); }"
+
+
+async def _keep_page_active(page: Page):
+    """Have Chrome treat a pooled tab as focused even while it is in the background."""
+    try:
+        session = await page.context.new_cdp_session(page)
+        await session.send("Emulation.setFocusEmulationEnabled", {"enabled": True})
+        await session.send("Page.setWebLifecycleState", {"state": "active"})
+    except Exception as e:
+        print(f"[WebAutomation] Could not keep tab active: {e}")
+
+
+def _on_stream_event(source, stream_id: str, kind: str, text: str):
+    queue = _streams.get(stream_id)
+    if queue is not None:
+        queue.put_nowait((kind, text))
+
+
+async def _ensure_stream_binding(page: Page):
+    """Expose the delta binding once per browser context (covers all its tabs)."""
+    context = page.context
+    if context not in _bound_contexts:
+        await context.expose_binding(STREAM_BINDING, _on_stream_event)
+        _bound_contexts.append(context)
+
 
 async def stream_gemini_response(prompt: str):
     """
     Sends a prompt to Gemini and streams the response back.
     Yields chunks of text.
     """
-    page = await get_or_create_page()
+    async with lease_page() as page:
+        async for chunk in _stream_on_page(page, prompt):
+            yield chunk
+
+
+async def _stream_on_page(page: Page, prompt: str):
+    await _ensure_stream_binding(page)
 
     # Target the rich text editor
     # Gemini uses a contenteditable div inside a complex structure
-    editor_selector = "div[contenteditable='true'][role='textbox']"
-
     print(f"[WebAutomation] Waiting for textbox...")
     try:
-        await page.wait_for_selector(editor_selector, timeout=10000)
+        await page.wait_for_selector(EDITOR_SELECTOR, timeout=10000)
     except Exception as e:
+        _pool.mark_dirty(page)
         yield f"Error: Could not find the chat input box. Are you logged in? Please check the browser window.\n"
         return
 
+    # Responses already on the page; ours is the first one past these
+    baseline = await page.evaluate("(selector) => document.querySelectorAll(selector).length", RESPONSE_SELECTOR)
+
     print(f"[WebAutomation] Typing prompt...")
     # Fill the prompt
-    await page.fill(editor_selector, "") # Clear first
+    await page.fill(EDITOR_SELECTOR, "") # Clear first
 
     # We use evaluate to set the text content to handle newlines easily
     await page.evaluate(f"""(selector, text) => {{
@@ -121,79 +442,69 @@ async def stream_gemini_response(prompt: str):
         el.innerText = text;
         // Trigger input event to enable the send button
         el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-    }}""", editor_selector, prompt)
-
-    # Press Enter to send
-    # Note: Sometimes Gemini requires Ctrl+Enter or a button click.
-    # Let's try pressing Enter. If it has newlines, maybe we need to click the send button.
-    # The send button usually has aria-label="Send message" or similar.
-    send_btn_selector = "button[aria-label*='Send']"
-
-    await asyncio.sleep(0.5) # Small delay to let React update state
+    }}""", EDITOR_SELECTOR, prompt)
 
+    stream_id = os.urandom(8).hex()
+    queue: asyncio.Queue = asyncio.Queue()
+    _streams[stream_id] = queue
     try:
-        # Check if the send button is available and click it
-        send_btn = await page.wait_for_selector(send_btn_selector, timeout=2000, state="visible")
-        if send_btn:
+        # Watch the DOM before sending so no early tokens are missed
+        await page.evaluate(_OBSERVER_JS, {
+            "id": stream_id, "binding": STREAM_BINDING, "baseline": baseline,
+            "responseSel": RESPONSE_SELECTOR, "stopSel": STOP_BUTTON_SELECTOR,
+            "flushMs": FLUSH_MS,
+        })
+
+        try:
+            # The send button is enabled once React has picked up the input
+            send_btn = await page.wait_for_selector(SEND_BUTTON_SELECTOR, timeout=2000, state="visible")
             await send_btn.click()
             print("[WebAutomation] Clicked Send button.")
-        else:
+        except Exception:
             await page.keyboard.press("Enter")
-            print("[WebAutomation] Pressed Enter.")
-    except:
-        # Fallback to Enter
-        await page.keyboard.press("Enter")
-        print("[WebAutomation] Pressed Enter (fallback).")
-
-    print("[WebAutomation] Waiting for response to start streaming...")
-
-    # Wait for the response container to appear
-    # Gemini usually creates a new response stream containing 'message-content'
-    # We'll monitor the DOM for new text.
-
-    # Wait a moment for the user message to disappear from input
-    await asyncio.sleep(2.0)
-
-    # Find all response blocks, the last one is ours
-    response_selector = "message-content"
-
-    try:
-        # Wait for at least one message-content to be visible
-        await page.wait_for_selector(response_selector, timeout=30000)
-    except Exception:
-        yield "Error: Timed out waiting for Gemini to respond."
-        return
-
-    # Now we stream the text
-    # We poll the last message-content element and yield the diff
-    last_text = ""
-    is_done = False
-    timeout_counter = 0
-    max_idle_polls = 60 # 60 * 0.5s = 30s idle timeout
-
-    while not is_done:
-        await asyncio.sleep(0.5)
-
-        # Get the text of the LAST message-content
-        current_text = await page.evaluate(f"""(selector) => {{
-            const nodes = document.querySelectorAll(selector);
-            if (nodes.length === 0) return "";
-            return nodes[nodes.length - 1].innerText;
-        }}""", response_selector)
-
-        if current_text != last_text:
-            # Found new text
-            new_chunk = current_text[len(last_text):]
-            yield new_chunk
-            last_text = current_text
-            timeout_counter = 0
-        else:
-            timeout_counter += 1
-
-        # Check if generation is complete.
-        # Gemini usually hides the "Generating..." indicator or shows specific buttons when done.
-        # We can also check if the text hasn't changed for a while (e.g. 5 seconds).
-        if timeout_counter >= 10: # 5 seconds of no new text
-            is_done = True
+            print("[WebAutomation] Pressed Enter (fallback).")
+
+        print("[WebAutomation] Waiting for response to start streaming...")
+        received = False
+        generating = False
+        while True:
+            if generating:
+                timeout = GENERATING_IDLE_TIMEOUT
+            else:
+                timeout = FALLBACK_IDLE_TIMEOUT if received else START_TIMEOUT
+            try:
+                kind, text = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if not received:
+                    # Gemini may still answer; don't hand that reply to the next lease
+                    _pool.mark_dirty(page)
+                    yield "Error: Timed out waiting for Gemini to respond."
+                    break
+                kind, text = "idle", ""
+            if kind == "delta":
+                received = True
+                yield text
+            elif kind == "generating":
+                generating = True
+            elif kind in ("ended", "idle"):
+                if kind == "ended":
+                    await asyncio.sleep(FINISH_SETTLE_MS / 1000)
+                elif generating:
+                    # Stalled while Gemini still shows its stop button
+                    _pool.mark_dirty(page)
+                tail = await page.evaluate(_FINISH_JS, stream_id)
+                while not queue.empty():
+                    kind, text = queue.get_nowait()
+                    if kind == "delta":
+                        yield text
+                if tail:
+                    yield tail
+                break
+    finally:
+        _streams.pop(stream_id, None)
+        try:
+            await page.evaluate(_STOP_JS, stream_id)
+        except Exception:
+            pass
 
     print("[WebAutomation] Streaming complete.")